@@ -0,0 +1,239 @@
+"""
+서빙용 ONNX 변형 모델 생성 + 정확도/지연시간 비교 리포트.
+
+생성 파일 (FastAPI/onnx/):
+    model_fp32.onnx  : float32 export (양자화 입력용, convert_to_onnx 재사용)
+    model_opt.onnx   : onnxruntime.transformers optimizer로 그래프 최적화 (Attention / LayerNorm / Gelu fusion)
+    model_int8.onnx  : model_opt.onnx를 INT8 dynamic quantization
+    model_int8.ort   : model_int8.onnx를 ORT 포맷으로 저장 (로드 시 그래프 최적화 생략)
+
+serving에서는 환경변수 ONNX_MODEL_VARIANT로 선택 (변형 이름 / 파일 이름은 app.core.onnx_variants에서 공유).
+
+실행 (FastAPI 디렉토리에서):
+    python Classifier_Model/build_variants.py --eval-file data/emotion_eval.csv
+    python Classifier_Model/build_variants.py --skip-export --eval-file data/emotion_eval.jsonl
+
+평가 파일은 text, label 컬럼을 가진 csv 또는 jsonl (label은 "기쁨" 같은 감정 이름 또는 0~5 정수).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import onnxruntime as ort
+from tokenizers import Tokenizer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FASTAPI_DIR = os.path.dirname(BASE_DIR)
+sys.path.append(FASTAPI_DIR)
+
+from app.core.text_normalizer import clean  # noqa: E402
+# model_loader.py와 같은 변형 이름 / 파일 이름 사용
+from app.core.onnx_variants import ONNX_DIR, ONNX_VARIANTS, variant_path  # noqa: E402
+
+id2label = {0: "기쁨", 1: "당황", 2: "분노", 3: "불안", 4: "상처", 5: "슬픔"}
+label2id = {v: k for k, v in id2label.items()}
+
+# emotion_classify와 같은 점수 공식 (평균 확률이 점수에 주는 영향 비교용)
+emotion_weights = [3.0, -0.7, -0.7, -1.2, -1.4, -1.7]
+
+
+# ---------------- 변환 ----------------
+
+def export_fp32():
+    import torch
+    from convert_to_onnx import convert_to_onnx
+
+    convert_to_onnx(output_path=variant_path("fp32"), dtype=torch.float32)
+    if not os.path.exists(variant_path("fp32")):
+        raise RuntimeError("fp32 export 실패")
+
+
+def optimize_graph(num_heads: int, hidden_size: int):
+    from onnxruntime.transformers import optimizer
+
+    # ELECTRA는 BERT와 같은 encoder 구조라 model_type="bert" fusion이 그대로 적용됨
+    # opt_level=0: python fusion만 적용 (ORT 기본 그래프 최적화는 세션 생성 / .ort 저장 시 적용)
+    model = optimizer.optimize_model(
+        variant_path("fp32"),
+        model_type="bert",
+        num_heads=num_heads,
+        hidden_size=hidden_size,
+        opt_level=0,
+        use_gpu=False,
+    )
+    model.save_model_to_file(variant_path("opt"))
+    print(f"✅ 그래프 최적화 완료: {variant_path('opt')}")
+    print(f"   fused ops: {model.get_fused_operator_statistics()}")
+
+
+def quantize_int8(per_channel: bool):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        variant_path("opt"),
+        variant_path("int8"),
+        weight_type=QuantType.QInt8,
+        per_channel=per_channel,
+    )
+    print(f"✅ INT8 dynamic quantization 완료: {variant_path('int8')}")
+
+
+def save_ort_format():
+    # 세션 생성 시 최적화된 그래프를 ORT 포맷으로 저장 -> 서빙 시에는 최적화 단계 없이 바로 로드
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    sess_options.optimized_model_filepath = variant_path("int8_ort")
+    sess_options.add_session_config_entry("session.save_model_format", "ORT")
+    ort.InferenceSession(variant_path("int8"), sess_options, providers=["CPUExecutionProvider"])
+    print(f"✅ ORT 포맷 저장 완료: {variant_path('int8_ort')}")
+
+
+# ---------------- 평가 ----------------
+
+def load_eval_set(path: str):
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    texts, labels = [], []
+    for row in rows:
+        label = str(row["label"]).strip()
+        texts.append(clean(row["text"]))
+        labels.append(label2id[label] if label in label2id else int(label))
+    return texts, np.array(labels)
+
+
+def load_tokenizer(pad_id: int) -> Tokenizer:
+    tokenizer = Tokenizer.from_file(os.path.join(BASE_DIR, "tokenizer.json"))
+    # tokenizer.json에 저장된 고정 길이 padding(64)은 끄고, 배치마다 가장 긴 문장에 맞춰 padding
+    tokenizer.no_truncation()
+    tokenizer.enable_padding(pad_id=pad_id, pad_token="[PAD]")
+    return tokenizer
+
+
+def run_batches(session, tokenizer: Tokenizer, texts: list[str], batch_size: int) -> np.ndarray:
+    probs = np.zeros((len(texts), len(id2label)), dtype=np.float32)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        encoded = tokenizer.encode_batch([texts[i] for i in bucket])
+        logits = session.run(["logits"], {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encoded], dtype=np.int64),
+        })[0].astype(np.float32)
+        e_x = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        probs[bucket] = e_x / e_x.sum(axis=-1, keepdims=True)
+    return probs
+
+
+def measure_latency(session, tokenizer: Tokenizer, texts: list[str], batch_size: int, repeat: int) -> dict:
+    samples = texts[:repeat]
+    single = []
+    for text in samples:
+        start = time.perf_counter()
+        run_batches(session, tokenizer, [text], 1)
+        single.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    run_batches(session, tokenizer, texts, batch_size)
+    batched_sec = time.perf_counter() - start
+
+    return {
+        "single_p50_ms": round(float(np.percentile(single, 50)), 3),
+        "single_p95_ms": round(float(np.percentile(single, 95)), 3),
+        "batched_sentences_per_sec": round(len(texts) / batched_sec, 1),
+    }
+
+
+def macro_f1(labels: np.ndarray, preds: np.ndarray) -> float:
+    scores = []
+    for c in range(len(id2label)):
+        tp = int(((preds == c) & (labels == c)).sum())
+        fp = int(((preds == c) & (labels != c)).sum())
+        fn = int(((preds != c) & (labels == c)).sum())
+        if tp + fp + fn == 0:
+            continue
+        scores.append(2 * tp / (2 * tp + fp + fn))
+    return float(np.mean(scores)) if scores else 0.0
+
+
+def build_report(variants: list[str], eval_file: str, batch_size: int, repeat: int, pad_id: int) -> dict:
+    texts, labels = load_eval_set(eval_file)
+    tokenizer = load_tokenizer(pad_id)
+    weights = np.array(emotion_weights)
+
+    results = {}
+    reference = None
+    for variant in variants:
+        path = variant_path(variant)
+        if not os.path.exists(path):
+            print(f"⚠️ {variant} 없음, 건너뜀: {path}")
+            continue
+
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        run_batches(session, tokenizer, texts[:batch_size], batch_size)  # warm-up
+        probs = run_batches(session, tokenizer, texts, batch_size)
+        preds = probs.argmax(axis=-1)
+
+        # 첫 번째로 평가한 변형(기본 fp32)을 기준으로 예측 일치율 / 확률 차이 비교
+        if reference is None:
+            reference = (variant, probs, preds)
+        ref_name, ref_probs, ref_preds = reference
+
+        results[variant] = {
+            "file": os.path.basename(path),
+            "size_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+            "accuracy": round(float((preds == labels).mean()), 4),
+            "macro_f1": round(macro_f1(labels, preds), 4),
+            "agreement_vs_" + ref_name: round(float((preds == ref_preds).mean()), 4),
+            "max_abs_prob_diff": round(float(np.abs(probs - ref_probs).max()), 5),
+            "mean_abs_prob_diff": round(float(np.abs(probs - ref_probs).mean()), 5),
+            # emotionClassifying 점수 공식(70 + 가중합 * 30)에서 문장 하나당 점수 차이
+            "mean_abs_score_diff": round(float(np.abs((probs - ref_probs) @ weights).mean() * 30), 4),
+            **measure_latency(session, tokenizer, texts, batch_size, repeat),
+        }
+        print(f"📊 {variant}: {results[variant]}")
+
+    return {"eval_file": eval_file, "num_samples": len(texts), "variants": results}
+
+
+def print_table(report: dict):
+    cols = ["size_mb", "accuracy", "macro_f1", "max_abs_prob_diff", "single_p50_ms", "single_p95_ms", "batched_sentences_per_sec"]
+    print(f"\n{'variant':<10}" + "".join(f"{c:>26}" for c in cols))
+    for variant, row in report["variants"].items():
+        print(f"{variant:<10}" + "".join(f"{row[c]:>26}" for c in cols))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eval-file", help="text,label 평가 데이터 (csv / jsonl). 없으면 변환만 수행")
+    parser.add_argument("--skip-export", action="store_true", help="이미 있는 model_fp32.onnx 사용")
+    parser.add_argument("--per-channel", action="store_true", help="INT8 per-channel 양자화")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=200, help="batch 1 지연시간 측정 문장 수")
+    parser.add_argument("--report", default=os.path.join(ONNX_DIR, "variants_report.json"))
+    parser.add_argument("--variants", default="fp32,fp,opt,int8,int8_ort", help="리포트에 포함할 변형 (첫 번째가 비교 기준)")
+    args = parser.parse_args()
+
+    with open(os.path.join(BASE_DIR, "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    if not args.skip_export:
+        export_fp32()
+    optimize_graph(config["num_attention_heads"], config["hidden_size"])
+    quantize_int8(args.per_channel)
+    save_ort_format()
+
+    if args.eval_file:
+        report = build_report(args.variants.split(","), args.eval_file, args.batch_size, args.repeat, config["pad_token_id"])
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print_table(report)
+        print(f"\n리포트 저장: {args.report}")
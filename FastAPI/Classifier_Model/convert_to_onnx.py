@@ -2,20 +2,22 @@ import torch
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import os
 
-def convert_to_onnx():
+def convert_to_onnx(output_path=None, dtype=torch.float16):
     # Get the directory where this script is located
     base_path = os.path.dirname(os.path.abspath(__file__))
     
     # Define paths
     model_path = base_path
-    output_path = os.path.join(r"G:\SSAFY\About_Code\S13P31A106\ai\FastAPI\onnx", "model.onnx")
+    if output_path is None:
+        output_path = os.path.join(base_path, "..", "onnx", "model.onnx")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
     print(f"Loading model from {model_path}...")
     
     # Load model and tokenizer
     try:
         # Load model on CPU for conversion
-        model = AutoModelForSequenceClassification.from_pretrained(model_path, dtype=torch.float16, device_map="cpu")
+        model = AutoModelForSequenceClassification.from_pretrained(model_path, dtype=dtype, device_map="cpu")
         tokenizer = AutoTokenizer.from_pretrained(model_path)
         model.eval()
     except Exception as e:
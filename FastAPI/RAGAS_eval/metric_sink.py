@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from mlflow import MlflowClient
+from mlflow.entities import Metric, RunTag
+
+# 파일 경로 맞추기
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))     # ai/RAGAS_eval
+AI_DIR = os.path.dirname(CURRENT_DIR)                        # ai
+MLFLOW_DIR = os.path.join(AI_DIR, "mlruns")
+
+MLFLOW_EXPERIMENT = os.getenv("MLFLOW_EXPERIMENT", "Advice_eval")
+# 메모리 대기열 최대 크기. 가득 차면 요청 처리를 막지 않고 버림
+METRIC_SINK_QUEUE_SIZE = int(os.getenv("METRIC_SINK_QUEUE_SIZE", "1000"))
+# 백그라운드 flush 주기(초)와 한 번에 기록할 최대 평가 수
+METRIC_SINK_FLUSH_INTERVAL = float(os.getenv("METRIC_SINK_FLUSH_INTERVAL", "5.0"))
+METRIC_SINK_MAX_BATCH = int(os.getenv("METRIC_SINK_MAX_BATCH", "100"))
+
+
+class MlflowMetricSink:
+    """
+    평가 결과를 MLflow에 비동기로 기록하는 sink.
+    - submit()은 메모리 대기열에 넣기만 하고 바로 리턴 (이벤트 루프에서 파일 쓰기 없음)
+    - 백그라운드 task가 flush_interval마다 대기열을 비우면서 평가 1건당 run 1개를 log_batch로 기록
+    - 대기열이 가득 차면 새 결과는 버리고 dropped 카운트만 올림
+    """
+
+    def __init__(self, tracking_uri: str, experiment: str, queue_size: int, flush_interval: float, max_batch: int):
+        self.tracking_uri = tracking_uri
+        self.experiment = experiment
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._client = None
+        self._experiment_id = None
+        # stop() 신호 (진행 중인 flush는 끊지 않고 끝난 뒤 루프 종료), flush 동시 실행 방지
+        self._stopping = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            if self._queue is None:
+                self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+            print(f"[MLFLOW SINK] 시작 (queue={self.queue_size}, interval={self.flush_interval}s)")
+
+    async def stop(self):
+        """종료 시 남아있는 결과까지 모두 기록"""
+        if self._task is not None:
+            # cancel하면 to_thread로 기록 중인 batch가 집계되지 않고 다음 flush와 동시에 기록될 수 있으므로
+            # 종료 신호만 보내고 진행 중인 flush가 끝나기를 기다림
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        print(f"[MLFLOW SINK] 종료 (written={self.written}, dropped={self.dropped}, failed={self.failed})")
+
+    def submit(self, metrics: dict, tags: dict | None = None) -> bool:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        # lifespan 밖에서 쓰는 경우를 위해 지연 시작
+        if self._task is None or self._task.done():
+            try:
+                asyncio.get_running_loop()
+                self._stopping.clear()
+                self._task = asyncio.create_task(self._run())
+            except RuntimeError:
+                pass
+
+        record = {
+            "metrics": {k: float(v) for k, v in metrics.items()},
+            "tags": dict(tags or {}),
+            "timestamp": int(time.time() * 1000),
+        }
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def flush(self):
+        if self._queue is None:
+            return
+
+        async with self._flush_lock:
+            while not self._queue.empty():
+                batch = []
+                while not self._queue.empty() and len(batch) < self.max_batch:
+                    batch.append(self._queue.get_nowait())
+                try:
+                    written = await asyncio.to_thread(self._write, batch)
+                except Exception as e:
+                    # MLflow 연결 / experiment 준비 실패 -> batch 전체 실패
+                    written = 0
+                    print(f"⚠️ MLflow 기록 중 에러 발생. 에러 내용 : {e}")
+                self.written += written
+                self.failed += len(batch) - written
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ MLflow flush 실패: {e}")
+
+    def _write(self, batch: list[dict]) -> int:
+        """기록에 성공한 평가 수 반환 (실패한 평가는 건너뛰고 나머지는 계속 기록)"""
+        if self._client is None:
+            self._client = MlflowClient(tracking_uri=self.tracking_uri)
+        if self._experiment_id is None:
+            exp = self._client.get_experiment_by_name(self.experiment)
+            self._experiment_id = exp.experiment_id if exp else self._client.create_experiment(self.experiment)
+
+        written = 0
+        for record in batch:
+            try:
+                run = self._client.create_run(self._experiment_id, start_time=record["timestamp"])
+                run_id = run.info.run_id
+                self._client.log_batch(
+                    run_id,
+                    metrics=[Metric(k, v, record["timestamp"], 0) for k, v in record["metrics"].items()],
+                    tags=[RunTag(k, str(v)) for k, v in record["tags"].items()],
+                )
+                self._client.set_terminated(run_id)
+                written += 1
+            except Exception as e:
+                print(f"⚠️ MLflow 평가 기록 실패: {e}")
+        return written
+
+
+metric_sink = MlflowMetricSink(
+    tracking_uri=f"file:{MLFLOW_DIR}",
+    experiment=MLFLOW_EXPERIMENT,
+    queue_size=METRIC_SINK_QUEUE_SIZE,
+    flush_interval=METRIC_SINK_FLUSH_INTERVAL,
+    max_batch=METRIC_SINK_MAX_BATCH,
+)
@@ -1,28 +1,23 @@
 import os
 import json
-import httpx
-import mlflow
 import re
 import asyncio
 from fastapi import HTTPException
 from dotenv import load_dotenv
+from app.core import gms_client
+from RAGAS_eval.metric_sink import metric_sink
 
 load_dotenv()
 
 GMS_KEY = os.getenv("GMS_KEY")
 EVAL_URL = os.getenv("EVAL_URL")
 EVAL_MODEL = os.getenv("EVAL_MODEL")   # 4.1 나노로 판정할것.
-
-# 파일 경로 맞추기
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))     # ai/RAGAS_eval
-AI_DIR = os.path.dirname(CURRENT_DIR)                        # ai
-MLFLOW_DIR = os.path.join(AI_DIR, "mlruns")
-
-mlflow_lock = asyncio.Lock()
+# parallel : metric별 판정 호출 7개를 동시에 실행 / fused : 한 번의 호출로 모든 metric을 JSON으로 받음
+EVAL_MODE = os.getenv("EVAL_MODE", "parallel").lower()
 
 
 # 1. GMS 공통 호출 함수
-async def call_gms(prompt: str, system_role: str):
+async def call_gms(prompt: str, system_role: str, max_tokens: int = 300):
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {GMS_KEY}",
@@ -34,17 +29,14 @@ async def call_gms(prompt: str, system_role: str):
             {"role": "system", "content": system_role},
             {"role": "user", "content": prompt},
         ],
-        "max_tokens": 300,
+        "max_tokens": max_tokens,
         "temperature": 0.1,
     }
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30.0) as cli:
-            resp = await cli.post(EVAL_URL, headers=headers, json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            return content
+        data = await gms_client.post(EVAL_URL, headers=headers, json=payload, timeout=30.0)
+        content = data["choices"][0]["message"]["content"].strip()
+        return content
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GMS 요청 실패: {e}")
@@ -238,7 +230,90 @@ class AresEvaluator:
         return raw_json
 
 
-# 5. 통합 평가 + MLflow 기록
+# 평가 metric 목록 (MLflow 기록 순서)
+METRIC_KEYS = [
+    "answer_relevancy",
+    "faithfulness",
+    "context_relevancy",
+    "empathy",
+    "safety",
+    "actionability",
+    "ares_helpfulness",
+    "ares_coherence",
+    "ares_groundedness",
+    "ares_safety",
+    "ares_readability",
+    "ares_style",
+    "ares_overall",
+]
+
+KOREAN_METRIC_NAMES = {
+    "answer_relevancy": "답변 관련성",
+    "faithfulness": "사실성/왜곡 없음",
+    "context_relevancy": "문맥 적합도",
+
+    "empathy": "공감도",
+    "safety": "상담 안전성",
+    "actionability": "실행 가능성",
+
+    "ares_helpfulness": "ARES - 도움 정도",
+    "ares_coherence": "ARES - 일관성",
+    "ares_groundedness": "ARES - 근거 기반성",
+    "ares_safety": "ARES - 안전성",
+    "ares_readability": "ARES - 가독성",
+    "ares_style": "ARES - 스타일",
+    "ares_overall": "ARES - 종합 점수",
+}
+
+
+# 5. 단일 프롬프트 통합 평가 (EVAL_MODE=fused)
+class FusedJudgeEvaluator:
+    """
+    7번의 판정 호출 대신 한 번의 호출로 모든 metric을 JSON으로 받아오는 저비용 모드.
+    JSON 파싱에 실패하면 예외를 올려서 호출하는 쪽이 개별 판정 모드로 돌아가도록 함.
+    """
+
+    async def evaluate(self, summary: str, report: str, advice: str) -> dict:
+        prompt = f"""
+        다음은 사용자의 요약(summary), 주간 보고서(report), 모델의 조언(advice)입니다.
+
+        [Summary]
+        {summary}
+
+        [Report]
+        {report}
+
+        [Advice]
+        {advice}
+
+        아래 항목을 각각 0~1 사이 float로 평가하세요.
+        - answer_relevancy : 조언이 summary의 고민/상황과 직접 관련 있는가
+        - faithfulness : 조언이 report 내용을 왜곡하거나 없는 내용을 단정하지 않는가
+        - context_relevancy : 조언이 report의 감정, 사건, 패턴을 참고하고 있는가
+        - empathy : 사용자의 감정을 이해하고 지지하는 표현이 있는가
+        - safety : 위험 행동 조장, 단정적 압박, 전문가 행세, 비난 표현이 없는가
+        - actionability : 현실적으로 실행 가능한 구체적 행동이 제시되어 있는가
+        - ares_helpfulness, ares_coherence, ares_groundedness, ares_safety,
+          ares_readability, ares_style, ares_overall : ARES 기준 평가
+
+        위 13개 key를 모두 포함한 JSON 하나만 출력하세요.
+        """
+
+        raw = await call_gms(
+            prompt,
+            "당신은 상담 조언 품질 평가자입니다. 반드시 유효한 JSON만 출력하세요.",
+            max_tokens=400,
+        )
+        raw_json = AresEvaluator.safe_json_loads(raw)
+
+        missing = [k for k in METRIC_KEYS if k not in raw_json]
+        if missing:
+            raise ValueError(f"통합 평가 결과에 누락된 metric: {missing}")
+
+        return {k: float(raw_json[k]) for k in METRIC_KEYS}
+
+
+# 6. 통합 평가 + MLflow 기록
 class AdviceQualityEvaluator:
     def __init__(self):
         self.summary = ""
@@ -261,6 +336,49 @@ class AdviceQualityEvaluator:
         vals = [result.get(k, 0.0) for k in keys]
         return sum(vals) / len(vals) if len(vals) > 0 else 0.0
 
+    async def _evaluate_parallel(self, summary: str, report: str, advice: str) -> dict:
+        """판정 호출 7개를 동시에 보내고 결과를 합침"""
+        ragas_like = RagasLikeEvaluator()
+        custom = CustomEvaluator()
+
+        (
+            answer_rel,
+            faithful,
+            context_rel,
+            empathy,
+            safety,
+            actionability,
+            ares,
+        ) = await asyncio.gather(
+            # GMS 기반 RAGAS 유사 metric
+            ragas_like.answer_relevancy(summary, advice),
+            ragas_like.faithfulness(report, advice),
+            ragas_like.context_relevancy(report, advice),
+            # Custom metric
+            custom.empathy(summary, advice),
+            custom.safety(advice),
+            custom.actionability(advice),
+            # ARES
+            AresEvaluator().evaluate(summary, report, advice),
+        )
+
+        # 전체 결과 합치기
+        return {
+            "answer_relevancy": answer_rel,
+            "faithfulness": faithful,
+            "context_relevancy": context_rel,
+            "empathy": empathy,
+            "safety": safety,
+            "actionability": actionability,
+            "ares_helpfulness": ares.get("helpfulness", 0.0),
+            "ares_coherence": ares.get("coherence", 0.0),
+            "ares_groundedness": ares.get("groundedness", 0.0),
+            "ares_safety": ares.get("safety", 0.0),
+            "ares_readability": ares.get("readability", 0.0),
+            "ares_style": ares.get("style", 0.0),
+            "ares_overall": ares.get("overall", 0.0),
+        }
+
     async def evaluate(self, summary: str, report: str, advice: str, mlflow_log: bool = True) -> dict:
         """
         전체 평가를 수행하고, 필요시 MLflow에 기록.
@@ -269,82 +387,27 @@ class AdviceQualityEvaluator:
         self.summary = summary
         self.advice = advice
 
-        # mlflow 세팅
-        mlflow.set_tracking_uri(f"file:{MLFLOW_DIR}")
-        mlflow.set_experiment("Advice_eval")
-
         result: dict = {}
-        eval_score = 0.0
-        eval_cnt = 0
-
-        async with mlflow_lock:
-            mlflow.start_run()
-
-            try:
-                # GMS 기반 RAGAS 유사 metric
-                ragas_like = RagasLikeEvaluator()
-                answer_rel = await ragas_like.answer_relevancy(summary, advice)
-                faithful = await ragas_like.faithfulness(report, advice)
-                context_rel = await ragas_like.context_relevancy(report, advice)
-
-                # Custom metric
-                custom = CustomEvaluator()
-                empathy = await custom.empathy(summary, advice)
-                safety = await custom.safety(advice)
-                actionability = await custom.actionability(advice)
-
-                # ARES
-                ares = await AresEvaluator().evaluate(summary, report, advice)
-
-                # 전체 결과 합치기
-                result = {
-                    "answer_relevancy": answer_rel,
-                    "faithfulness": faithful,
-                    "context_relevancy": context_rel,
-                    "empathy": empathy,
-                    "safety": safety,
-                    "actionability": actionability,
-                    "ares_helpfulness": ares.get("helpfulness", 0.0),
-                    "ares_coherence": ares.get("coherence", 0.0),
-                    "ares_groundedness": ares.get("groundedness", 0.0),
-                    "ares_safety": ares.get("safety", 0.0),
-                    "ares_readability": ares.get("readability", 0.0),
-                    "ares_style": ares.get("style", 0.0),
-                    "ares_overall": ares.get("overall", 0.0),
-                }
-
-                korean_mlflow = {
-                    "answer_relevancy": "답변 관련성",
-                    "faithfulness": "사실성/왜곡 없음",
-                    "context_relevancy": "문맥 적합도",
-
-                    "empathy": "공감도",
-                    "safety": "상담 안전성",
-                    "actionability": "실행 가능성",
-
-                    "ares_helpfulness": "ARES - 도움 정도",
-                    "ares_coherence": "ARES - 일관성",
-                    "ares_groundedness": "ARES - 근거 기반성",
-                    "ares_safety": "ARES - 안전성",
-                    "ares_readability": "ARES - 가독성",
-                    "ares_style": "ARES - 스타일",
-                    "ares_overall": "ARES - 종합 점수",
-                }
-
-                if mlflow_log:
-                    for k, v in result.items():
-                        mlflow.log_metric(k, float(v))
-                        eval_score += float(v)
-                        eval_cnt += 1
-
-                    # 한글 태그 기록
-                    for key, kor in korean_mlflow.items():
-                        mlflow.set_tag(f"{key}_korean", kor)
-
-            except Exception as e:
-                print(f"⚠️ 평가 중 에러 발생. 에러 내용 : {e}")
-            finally:
-                mlflow.end_run()
+
+        # 판정 호출은 동시에 진행 (요청끼리도 서로 기다리지 않음)
+        try:
+            if EVAL_MODE == "fused":
+                try:
+                    result = await FusedJudgeEvaluator().evaluate(summary, report, advice)
+                except Exception as e:
+                    print(f"⚠️ 통합 평가 실패, 개별 평가로 전환. 에러 내용 : {e}")
+                    result = await self._evaluate_parallel(summary, report, advice)
+            else:
+                result = await self._evaluate_parallel(summary, report, advice)
+
+        except Exception as e:
+            print(f"⚠️ 평가 중 에러 발생. 에러 내용 : {e}")
+
+        # MLflow 기록은 sink 대기열에 넣기만 하고 실제 쓰기는 백그라운드에서 진행
+        if mlflow_log and result:
+            tags = {f"{key}_korean": kor for key, kor in KOREAN_METRIC_NAMES.items()}
+            if not metric_sink.submit(result, tags):
+                print("⚠️ MLflow 기록 대기열이 가득 차서 이번 평가 결과는 기록하지 않음")
 
         # 내부적으로 final_score 계산해서 필요하면 로그에 쓰거나,
         # route 쪽에서는 calc_final_score(result)로 다시 계산해서 사용
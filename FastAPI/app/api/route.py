@@ -1,37 +1,49 @@
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models.schemas import DiaryOutput, DiaryInput, ManageAdviceInput, ManageAdviceOutput, PersonalAdviceOutput, PersonalAdviceInput, ReportInput, ReportOutput
-from app.services.emotion_classify import emotionClassifying
+from app.models.schemas import ManageAdviceJobInput, PersonalAdviceJobInput, JobSubmitOutput, JobStatusOutput
+from app.services.emotion_classify import emotionClassifyingBatched, classify_batcher, prob_cache, prob_store
 from app.services.report import create_report
-from app.services.summary import longSummarize, shortSummarize
-from app.services.advice import daily_advice
+from app.services.summary import summarizeDiary
+from app.services.advice import build_advice_context
 from app.services.advice import manager_advice as generate_manager_advice
 from app.services.advice import private_advice as generate_private_advice
-from app.core.vector_embedding import embed
-import os
-import weaviate
+from app.services.advice_selection import ADVICE_SCORE_THRESHOLD, ADVICE_BASE_TEMPERATURE
+from app.services.weekly_advice import manager_weekly_advice, personal_weekly_advice, store_counsel_case
+from app.core.inference_executor import inference_executor, InferenceQueueFull
+from app.core.job_queue import job_queue, ActiveJobConflict
+from app.core.webhook import webhook_url_allowed
+from app.core.local_retriever import local_retriever
+from app.core.response_cache import response_cache
+from model_loader import session_config
 from RAGAS_eval.ragas import AdviceQualityEvaluator
 import asyncio
+import json
 
 router = APIRouter()
 
-# Weaviate 세팅
-WEAVIATE_HOST = os.getenv("WEAVIATE_HOST", "hand-weaviate")
-def get_client():
-    return weaviate.connect_to_custom(
-        http_host=WEAVIATE_HOST,
-        http_port=8080,
-        grpc_host=WEAVIATE_HOST,
-        grpc_port=50051,
-        http_secure=False,
-        grpc_secure=False,
-    )
-
 @router.get("/ai-server/health", response_model=str)
 async def health():
     """서버의 상태를 확인합니다."""
     return "OK"
 
+@router.get("/ai-server/metrics")
+async def metrics():
+    """감정 분석 추론 관련 지표 (executor 대기열, micro-batch 채움 비율, 문장 / GMS 응답 캐시, ONNX 세션 설정)"""
+    return {
+        "inference_executor": inference_executor.stats,
+        "micro_batch": classify_batcher.stats,
+        "emotion_cache": {
+            "memory": prob_cache.stats,
+            "sqlite": prob_store.stats if prob_store is not None else None,
+        },
+        "gms_cache": response_cache.stats,
+        "onnx_session": session_config,
+        "jobs": job_queue.stats,
+        "local_retriever": local_retriever.stats,
+    }
+
 # 사용자의 다이어리 문장들을 받아와 오늘의 감정 점수 + 일간 요약(짧은 요약, 긴 요약)을 반환
 @router.post("/diary/summary", response_model=DiaryOutput)
 async def diary_classification(input_data: DiaryInput):
@@ -44,14 +56,14 @@ async def diary_classification(input_data: DiaryInput):
         if not texts:
             raise ValueError("입력된 일기 텍스트가 없습니다.")
 
-        # 감정 분석은 CPU/GPU 연산이므로 별도 스레드로 실행
-        classify_task = emotionClassifying(text_list)
-        short_task = shortSummarize(texts)
-        long_task = longSummarize(texts)
-        short_advice = daily_advice(texts)
+        # 감정 분석은 CPU 연산이므로 추론 executor(별도 스레드)에서 실행하고 GMS 호출과 겹쳐서 진행
+        # 동시에 들어온 다른 요청의 문장과 묶어서 한 번에 추론 (micro-batch)
+        classify_task = emotionClassifyingBatched(text_list)
+        # 짧은 요약 / 긴 요약 / 일간 조언 (SUMMARY_MODE=fused면 GMS 호출 한 번)
+        summary_task = summarizeDiary(texts)
 
-        short_summary, long_summary, short_advice = await asyncio.gather(
-            short_task, long_task, short_advice
+        classify_task, (short_summary, long_summary, short_advice) = await asyncio.gather(
+            classify_task, summary_task
         )
 
         if "error" in classify_task:
@@ -68,7 +80,10 @@ async def diary_classification(input_data: DiaryInput):
             },
         }
         return result
-    
+
+    except InferenceQueueFull as e:
+        print(f"❌ diary_summary 추론 대기열 초과: {e}")
+        raise HTTPException(status_code=503, detail=f"요청이 많아 잠시 후 다시 시도해주세요. {e}")
     except Exception as e:
         print(f"❌ diary_summary 오류: {e}")
         raise HTTPException(status_code=500, detail=f"오류 코드는 {e}")
@@ -77,76 +92,7 @@ async def diary_classification(input_data: DiaryInput):
 @router.post("/manager/advice", response_model = ManageAdviceOutput)
 async def group_advice(input_data: ManageAdviceInput):
     try:
-        user_id = input_data.user_id
-        diaries = input_data.diaries
-        biodata = input_data.biometrics
-        user_info = input_data.user_info
-        total_summary = input_data.total_summary
-
-        # 1) 보고서 생성
-        report = await create_report(
-            diary=diaries,
-            biodata=biodata,
-            total_summary=total_summary
-        )
-
-        evaluator = AdviceQualityEvaluator()
-
-        # 2) 조언 생성 + 평가 반복
-        MAX_RETRY = 3
-        best_advice = None
-        best_score = 0
-
-        for attempt in range(MAX_RETRY):
-            advice = await generate_manager_advice(report=report, summary=total_summary, info=user_info)
-
-            # 평가
-            eval_result = await evaluator.evaluate(
-                summary=total_summary,
-                report=report,
-                advice=advice
-            )
-
-            final_score = evaluator.calc_final_score(eval_result)
-            print(f"👉 Attempt {attempt+1} Score: {final_score}")
-
-            # 최고 점수 기록
-            if final_score > best_score:
-                best_score = final_score
-                best_advice = advice
-
-            # 기준 통과하면 즉시 종료
-            if final_score >= 0.85:
-                break
-
-        # 3) 최종 조언 결정 및 임베딩
-        advice = best_advice
-
-        # 최종 조언을 Weaviate에 집어넣어서 나중에 쓸 수 있도록.
-        data_object = {
-        "input": total_summary,
-        "output": advice,
-        }
-
-        if best_score >= 0.85:
-            embedding_advice = embed(total_summary)
-            client = get_client()
-            try:
-                col = client.collections.get("SingleCounsel")
-                uuid = col.data.insert(properties=data_object, vector=embedding_advice)
-            finally:
-                client.close()
-
-            print(f"벡터 DB에 새로운 상담 데이터 저장. UUID : {uuid}, 백터는 : {embedding_advice[:5]}")
-            print(f"평가 점수는 : {best_score}, 평가된 조언은 : {best_advice}, 상세 점수는 : {eval_result}")
-        else:
-            print(f"평가 점수가 낮아 Weaviate에 저장은 하지 않음. 점수 : {best_score}")
-
-        return ManageAdviceOutput(
-            user_id=user_id,
-            report=report,
-            advice=advice
-        )
+        return ManageAdviceOutput(**await manager_weekly_advice(input_data))
 
     except Exception as e:
         print(f"❌ manager_advice 오류: {e}")
@@ -156,68 +102,150 @@ async def group_advice(input_data: ManageAdviceInput):
 @router.post("/individual-users/report", response_model = PersonalAdviceOutput)
 async def personal_advice(data: PersonalAdviceInput):
     try:
-        user_id = data.user_id
-        diary = data.diaries
-        biodata = data.biometrics
-        user_info = data.user_info
-        total_summary = data.total_summary
-
-        report = await create_report(
-            diary=diary,
-            biodata=biodata,
-            total_summary=total_summary
-        )
+        return PersonalAdviceOutput(**await personal_weekly_advice(data))
 
-        evaluator = AdviceQualityEvaluator()
-        MAX_RETRY = 3
-        best_advice = None
-        best_score = 0
+    except Exception as e:
+        print(f"❌ personal_advice 오류: {e}")
+        raise HTTPException(status_code=500, detail=f"개인 조언 생성 중 오류: {e}")
 
-        for attempt in range(MAX_RETRY):
-            advice = await generate_private_advice(report=report, summary=total_summary, info=user_info)
 
-            eval_result = await evaluator.evaluate(
-                summary=total_summary,
-                report=report,
-                advice=advice
-            )
+# ---------------- SSE(stream) 버전 ----------------
+# 보고서 / 조언을 GMS에서 생성되는 대로 바로 전달해서 첫 응답까지의 시간을 줄임
+# 이벤트 순서: report(조각) ... -> report_done -> advice(조각) ... -> advice_done -> evaluation -> done
+# 실패 시 error 이벤트 후 종료
+# 이미 전달한 조언은 되돌릴 수 없으므로 재시도 / best-of-N 없이 조언 하나를 생성하고 평가 점수만 마지막에 전달
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def stream_report_and_advice(user_id, diaries, biodata, user_info, total_summary, generate_advice, tag: str = ""):
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pipeline():
+        # 보고서 생성(stream) + 유사 상담 검색/리랭크 동시 실행
+        report, context = await asyncio.gather(
+            create_report(
+                diary=diaries,
+                biodata=biodata,
+                total_summary=total_summary,
+                on_token=lambda delta: queue.put_nowait(("report", {"delta": delta})),
+            ),
+            build_advice_context(total_summary, user_info),
+        )
+        queue.put_nowait(("report_done", {"report": report}))
 
-            final_score = evaluator.calc_final_score(eval_result)
-            print(f"👉 [IND] Attempt {attempt+1} Score: {final_score}")
+        advice = await generate_advice(
+            report=report,
+            summary=total_summary,
+            info=user_info,
+            context=context,
+            temperature=ADVICE_BASE_TEMPERATURE,
+            on_token=lambda delta: queue.put_nowait(("advice", {"delta": delta})),
+        )
+        queue.put_nowait(("advice_done", {"advice": advice}))
 
-            if final_score > best_score:
-                best_score = final_score
-                best_advice = advice
+        evaluator = AdviceQualityEvaluator()
+        eval_result = await evaluator.evaluate(summary=total_summary, report=report, advice=advice)
+        score = evaluator.calc_final_score(eval_result)
+        print(f"👉 {tag}Stream Score: {score}")
 
-            if final_score >= 0.85:
-                break
+        await store_counsel_case(total_summary, advice, score)
 
-        advice = best_advice
+        queue.put_nowait(("evaluation", {"score": score, "passed": score >= ADVICE_SCORE_THRESHOLD, "detail": eval_result}))
 
-        # 최종 조언을 Weaviate에 집어넣어서 나중에 쓸 수 있도록.
-        data_object = {
-        "input": total_summary,
-        "output": advice,
-        }
-        if best_score >= 0.85:
-            embedding_advice = embed(total_summary)
-            client = get_client()
-            try:
-                col = client.collections.get("SingleCounsel")
-                uuid = col.data.insert(properties=data_object, vector=embedding_advice)
-            finally:
-                client.close()
-
-            print(f"벡터 DB에 새로운 상담 데이터 저장. UUID : {uuid}, 백터는 : {embedding_advice[:5]}")
-        else:
-            print(f"평가 점수가 낮아 Weaviate에 저장은 하지 않음. 점수 : {best_score}")
+    task = asyncio.create_task(pipeline())
+    task.add_done_callback(lambda _: queue.put_nowait(None))
 
-        return PersonalAdviceOutput(
-            user_id=user_id,
-            report=report,
-            advice=advice
-        )
+    try:
+        while (item := await queue.get()) is not None:
+            yield sse_event(*item)
+
+        if task.exception() is not None:
+            print(f"❌ {tag}stream 오류: {task.exception()}")
+            yield sse_event("error", {"detail": str(task.exception())})
+        else:
+            yield sse_event("done", {"user_id": user_id})
+    finally:
+        # 클라이언트 연결이 끊기면 남은 GMS 호출도 중단
+        if not task.done():
+            task.cancel()
+
+def sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
+@router.post("/manager/advice/stream")
+async def group_advice_stream(input_data: ManageAdviceInput):
+    return sse_response(stream_report_and_advice(
+        input_data.user_id,
+        input_data.diaries,
+        input_data.biometrics,
+        input_data.user_info,
+        input_data.total_summary,
+        generate_manager_advice,
+    ))
+
+@router.post("/individual-users/report/stream")
+async def personal_advice_stream(data: PersonalAdviceInput):
+    return sse_response(stream_report_and_advice(
+        data.user_id,
+        data.diaries,
+        data.biometrics,
+        data.user_info,
+        data.total_summary,
+        generate_private_advice,
+        tag="[IND] ",
+    ))
+
+
+# ---------------- 비동기 작업(job) 버전 ----------------
+# 주말에 사용자별로 한꺼번에 들어오는 주간 보고서 요청을 30~90초 동안 붙잡지 않고 job id를 바로 반환
+# 결과는 GET /jobs/{job_id}로 조회하거나 webhook_url로 전달받음
+# 같은 입력으로 진행 중이거나 최근 완료된 작업이 있으면 그 id를 반환
+# 같은 사용자의 같은 종류 작업이 다른 입력으로 진행 중이면 409 (detail에 진행 중인 job id)
+
+async def run_manager_advice_job(payload: dict) -> dict:
+    return await manager_weekly_advice(ManageAdviceInput(**payload))
+
+async def run_personal_advice_job(payload: dict) -> dict:
+    return await personal_weekly_advice(PersonalAdviceInput(**payload))
+
+job_queue.register("manager_advice", run_manager_advice_job)
+job_queue.register("personal_advice", run_personal_advice_job)
+
+async def submit_job(kind: str, data) -> dict:
+    payload = data.model_dump(exclude={"webhook_url"})
+    webhook_url = str(data.webhook_url) if data.webhook_url else None
+    # 허용 목록에 없는 주소(내부망 등)로 결과를 보내지 않도록 등록 전에 거절
+    if webhook_url is not None and not webhook_url_allowed(webhook_url):
+        raise HTTPException(status_code=422, detail=f"허용되지 않은 webhook 주소입니다: {webhook_url}")
+    try:
+        return await job_queue.submit(kind, data.user_id, payload, webhook_url=webhook_url)
+    except ActiveJobConflict as e:
+        # 다른 입력으로 진행 중인 작업이 있음 -> 진행 중인 job id를 알려주고, 끝난 뒤 다시 제출하도록
+        raise HTTPException(status_code=409, detail={
+            "message": "같은 사용자의 작업이 다른 입력으로 진행 중입니다. 완료 후 다시 제출하세요.",
+            "job_id": e.job_id,
+            "status": e.status,
+        })
     except Exception as e:
-        print(f"❌ personal_advice 오류: {e}")
-        raise HTTPException(status_code=500, detail=f"개인 조언 생성 중 오류: {e}")
+        print(f"❌ {kind} 작업 등록 오류: {e}")
+        raise HTTPException(status_code=500, detail=f"작업 등록 중 오류: {e}")
+
+@router.post("/manager/advice/jobs", response_model=JobSubmitOutput, status_code=202)
+async def group_advice_job(input_data: ManageAdviceJobInput):
+    return await submit_job("manager_advice", input_data)
+
+@router.post("/individual-users/report/jobs", response_model=JobSubmitOutput, status_code=202)
+async def personal_advice_job(data: PersonalAdviceJobInput):
+    return await submit_job("personal_advice", data)
+
+@router.get("/jobs/{job_id}", response_model=JobStatusOutput)
+async def job_status(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"작업을 찾을 수 없습니다: {job_id}")
+    return JobStatusOutput(job_id=job.pop("id"), **job)
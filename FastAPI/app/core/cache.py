@@ -0,0 +1,166 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    크기 제한(LRU) + 만료 시간(TTL)이 있는 프로세스 내 캐시.
+    - max_size를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+    - ttl(초)이 지난 항목은 조회 시점에 제거
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def stats(self) -> dict:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class InFlight:
+    """
+    같은 key로 동시에 들어온 요청을 upstream 호출 하나로 합침.
+    먼저 들어온 요청이 호출을 시작하고, 나머지는 같은 결과를 기다림.
+    """
+
+    def __init__(self):
+        self._tasks: dict = {}
+
+    async def run(self, key, fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        # 기다리던 요청 하나가 취소되어도 공유 중인 호출은 취소되지 않도록 shield
+        return await asyncio.shield(task)
+
+
+class SQLiteStore:
+    """
+    여러 프로세스(uvicorn 워커)가 같이 쓰는 key-value 저장소 (SQLite 파일 하나, 테이블 하나).
+    - WAL 모드라 한 워커가 쓰는 동안에도 다른 워커가 읽을 수 있음
+    - 스레드마다 연결을 따로 열어서 executor 스레드에서도 그대로 호출 가능
+    - ttl(초)이 지난 항목은 조회되지 않음 (0이면 만료 없음)
+    - max_rows를 넘으면 오래된 항목부터 정리 (0이면 제한 없음)
+    """
+
+    def __init__(self, path: str, table: str, ttl: float = 0, max_rows: int = 0):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key BLOB PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys: list) -> dict:
+        if not keys:
+            return {}
+        min_created = time.time() - self.ttl if self.ttl > 0 else 0
+        found = {}
+        # SQLite 변수 개수 제한(999)을 넘지 않도록 나눠서 조회
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn().execute(
+                f"SELECT key, value FROM {self.table} WHERE created_at >= ? "
+                f"AND key IN ({','.join('?' * len(chunk))})",
+                [min_created, *chunk],
+            ).fetchall()
+            found.update(rows)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+            [(k, v, now) for k, v in items.items()],
+        )
+        conn.commit()
+
+        # 정리는 가끔만 (매번 COUNT를 하면 쓰기가 느려짐)
+        self._writes += 1
+        if self.max_rows > 0 and self._writes % 100 == 0:
+            self.trim()
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def trim(self):
+        conn = self._conn()
+        if self.ttl > 0:
+            conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl,))
+        if self.max_rows > 0:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+        conn.commit()
+
+    @property
+    def stats(self) -> dict:
+        return {"path": self.path, "table": self.table, "hits": self.hits, "misses": self.misses}
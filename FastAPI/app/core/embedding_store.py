@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+# 임베딩 결과를 디스크에 보관하는 저장소 (임베딩 모델별 디렉토리 하나)
+#   vectors.f32   : float32 행렬 (행 = 고유 텍스트 하나), np.memmap으로 읽음
+#   index.jsonl   : 객체 하나당 한 줄 {"id", "collection", "text_hash", "offset", "properties"}
+#   manifest.json : 모델 / 차원 / 행 수 / 컬렉션별 객체 수와 내용 해시
+# 적재 스크립트(vector_db_settings/db_setting.py)가 쓰고, 복원 / 모델 비교 / 로컬 검색이 읽음
+EMBEDDING_STORE_FORMAT = 1
+
+
+def model_slug(model: str) -> str:
+    return re.sub(r"[^0-9A-Za-z._-]+", "_", model or "unknown")
+
+
+def text_hash(text: str) -> str:
+    # 임베딩은 입력 텍스트가 정확히 같을 때만 재사용 (정규화하지 않음)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    memmap float32 임베딩 저장소.
+    - 같은 텍스트의 벡터는 한 번만 저장 (text_hash -> 행 번호), 객체(id)는 index.jsonl에서 행 번호를 가리킴
+    - 쓰기는 append만 (벡터 먼저, index 나중) -> 중간에 죽어도 다시 열 때 index 기준으로 벡터 파일을 잘라서 맞춤
+    - 같은 id가 여러 번 기록되면 마지막 기록을 사용
+    - 읽기 전용으로 열면 matrix()가 파일을 memmap으로 바로 매핑 (전체를 메모리로 읽지 않음)
+    """
+
+    def __init__(self, root: str, model: str, readonly: bool = False):
+        self.model = model
+        self.path = os.path.join(root, model_slug(model))
+        self.readonly = readonly
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.index_path = os.path.join(self.path, "index.jsonl")
+        self.manifest_path = os.path.join(self.path, "manifest.json")
+
+        self.manifest = {}
+        self.dim = None
+        self.rows = 0
+        self.offsets: dict[str, int] = {}   # text_hash -> 행 번호
+        self.objects: dict[str, dict] = {}  # id -> index 항목
+        self._vectors_file = None
+        self._index_file = None
+        self._matrix = None
+
+        if readonly and not os.path.exists(self.manifest_path):
+            raise FileNotFoundError(f"임베딩 저장소가 없습니다: {self.path}")
+        if not readonly:
+            os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            if self.manifest.get("model") not in (None, self.model):
+                raise ValueError(f"저장소 모델({self.manifest['model']})과 요청한 모델({self.model})이 다릅니다.")
+            self.dim = self.manifest.get("dim")
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 마지막 줄을 쓰는 도중에 죽은 경우
+                        break
+                    self.objects[entry["id"]] = entry
+                    self.offsets[entry["text_hash"]] = entry["offset"]
+                    self.rows = max(self.rows, entry["offset"] + 1)
+
+        # index에 기록되지 않은 벡터(쓰기 도중 중단)는 버림
+        if self.dim and os.path.exists(self.vectors_path):
+            expected = self.rows * self.dim * 4
+            if os.path.getsize(self.vectors_path) > expected:
+                if self.readonly:
+                    print(f"⚠️ [EMB_STORE] index보다 벡터가 많음, 앞 {self.rows}행만 사용: {self.path}")
+                else:
+                    with open(self.vectors_path, "r+b") as f:
+                        f.truncate(expected)
+
+    # ---------------- 읽기 ----------------
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def matrix(self) -> np.ndarray:
+        """(rows, dim) float32 memmap"""
+        if self.rows == 0 or not self.dim:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self._matrix is None or self._matrix.shape[0] != self.rows:
+            self._flush()
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self.dim))
+        return self._matrix
+
+    def get(self, text_hash_: str):
+        offset = self.offsets.get(text_hash_)
+        if offset is None:
+            return None
+        return self.matrix()[offset]
+
+    def iter_objects(self, collection: str | None = None):
+        """(id, properties, vector) 반환"""
+        matrix = self.matrix()
+        for object_id, entry in self.objects.items():
+            if collection is None or entry["collection"] == collection:
+                yield object_id, entry["properties"], matrix[entry["offset"]]
+
+    def collection_entries(self, collection: str) -> list[dict]:
+        return [entry for entry in self.objects.values() if entry["collection"] == collection]
+
+    # ---------------- 쓰기 ----------------
+
+    def _open_files(self):
+        if self.readonly:
+            raise PermissionError("읽기 전용 저장소입니다.")
+        if self._vectors_file is None:
+            self._vectors_file = open(self.vectors_path, "ab")
+            self._index_file = open(self.index_path, "a", encoding="utf-8")
+
+    def _flush(self):
+        if self._vectors_file is not None:
+            self._vectors_file.flush()
+            self._index_file.flush()
+
+    def add_vectors(self, hashes: list[str], vectors) -> None:
+        """새로 받은 임베딩 저장 (이미 있는 text_hash는 건너뜀)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(hashes):
+            raise ValueError("hashes와 vectors 개수가 다릅니다.")
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"임베딩 차원 불일치: {vectors.shape[1]} != {self.dim}")
+
+        self._open_files()
+        for h, vector in zip(hashes, vectors):
+            if h in self.offsets:
+                continue
+            self._vectors_file.write(vector.tobytes())
+            self.offsets[h] = self.rows
+            self.rows += 1
+
+    def add_object(self, object_id: str, collection: str, text_hash_: str, properties: dict) -> None:
+        """객체 -> 벡터 행 연결 기록 (add_vectors로 벡터를 먼저 저장해야 함)"""
+        offset = self.offsets.get(text_hash_)
+        if offset is None:
+            raise KeyError(f"저장되지 않은 벡터입니다: {text_hash_}")
+        entry = {"id": object_id, "collection": collection, "text_hash": text_hash_, "offset": offset, "properties": properties}
+        previous = self.objects.get(object_id)
+        if previous is not None and previous["offset"] == offset and previous["properties"] == properties:
+            return
+
+        self._open_files()
+        # 벡터가 index보다 먼저 디스크에 있어야 다시 열 때 잘리지 않음
+        self._vectors_file.flush()
+        self._index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.objects[object_id] = entry
+
+    def save_manifest(self):
+        if self.readonly:
+            return
+        self._flush()
+        collections = {}
+        for entry in self.objects.values():
+            collections.setdefault(entry["collection"], []).append(entry["id"])
+
+        now = time.time()
+        self.manifest = {
+            "format": EMBEDDING_STORE_FORMAT,
+            "model": self.model,
+            "dim": self.dim,
+            "rows": self.rows,
+            "objects": len(self.objects),
+            "created_at": self.manifest.get("created_at", now),
+            "updated_at": now,
+            # 컬렉션별 객체 수 + 객체 id(내용 해시 기반 uuid) 목록의 해시 -> Weaviate 컬렉션과 같은 내용인지 비교
+            "collections": {
+                name: {
+                    "count": len(ids),
+                    "content_hash": hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest(),
+                }
+                for name, ids in sorted(collections.items())
+            },
+        }
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def close(self):
+        self.save_manifest()
+        if self._vectors_file is not None:
+            self._vectors_file.close()
+            self._index_file.close()
+            self._vectors_file = self._index_file = None
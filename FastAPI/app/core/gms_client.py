@@ -0,0 +1,135 @@
+import asyncio
+import json as _json
+import os
+import httpx
+from dotenv import load_dotenv
+load_dotenv()
+
+# 커넥션 풀 설정 (GMS 호출 전체가 하나의 AsyncClient를 공유)
+GMS_HTTP2 = os.getenv("GMS_HTTP2", "true").lower() == "true"
+GMS_MAX_CONNECTIONS = int(os.getenv("GMS_MAX_CONNECTIONS", "100"))
+GMS_MAX_KEEPALIVE = int(os.getenv("GMS_MAX_KEEPALIVE", "20"))
+GMS_KEEPALIVE_EXPIRY = float(os.getenv("GMS_KEEPALIVE_EXPIRY", "60"))
+# 호스트 하나에 동시에 보낼 수 있는 최대 요청 수
+GMS_PER_HOST_LIMIT = int(os.getenv("GMS_PER_HOST_LIMIT", "32"))
+GMS_CONNECT_TIMEOUT = float(os.getenv("GMS_CONNECT_TIMEOUT", "5.0"))
+GMS_DEFAULT_TIMEOUT = float(os.getenv("GMS_DEFAULT_TIMEOUT", "30.0"))
+
+_client: httpx.AsyncClient | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = GMS_HTTP2 and _http2_available()
+    if GMS_HTTP2 and not http2:
+        print("[GMS] h2 패키지가 없어 HTTP/1.1 keep-alive로 동작합니다.")
+
+    return httpx.AsyncClient(
+        verify=False,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=GMS_MAX_CONNECTIONS,
+            max_keepalive_connections=GMS_MAX_KEEPALIVE,
+            keepalive_expiry=GMS_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(GMS_DEFAULT_TIMEOUT, connect=GMS_CONNECT_TIMEOUT),
+    )
+
+
+async def init_client():
+    """FastAPI lifespan 시작 시 호출. 공용 AsyncClient 생성"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+        print(f"[GMS] 공용 HTTP 클라이언트 생성 (http2={GMS_HTTP2}, max_connections={GMS_MAX_CONNECTIONS})")
+
+
+async def close_client():
+    """FastAPI lifespan 종료 시 호출. 풀에 남아있는 커넥션 정리"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        print("[GMS] 공용 HTTP 클라이언트 종료")
+
+
+def get_client() -> httpx.AsyncClient:
+    # lifespan 밖(스크립트, 평가 단독 실행 등)에서 호출되면 지연 생성
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+def _host_slot(url: str) -> asyncio.Semaphore:
+    host = httpx.URL(url).host
+    if host not in _host_slots:
+        _host_slots[host] = asyncio.Semaphore(GMS_PER_HOST_LIMIT)
+    return _host_slots[host]
+
+
+async def post(url: str, headers: dict, json: dict, timeout: float | None = None) -> dict:
+    """
+    공용 클라이언트로 POST 요청 후 JSON 응답을 반환.
+    - timeout: 호출별 읽기/쓰기 타임아웃(초). 연결 타임아웃은 GMS_CONNECT_TIMEOUT 공통
+    - 실패 시 httpx 예외를 그대로 올려서 호출하는 쪽의 기존 에러 처리를 유지
+    """
+    request_timeout = httpx.Timeout(timeout or GMS_DEFAULT_TIMEOUT, connect=GMS_CONNECT_TIMEOUT)
+
+    async with _host_slot(url):
+        response = await get_client().post(url, headers=headers, json=json, timeout=request_timeout)
+        response.raise_for_status()
+        return response.json()
+
+
+async def stream(url: str, headers: dict, json: dict, timeout: float | None = None):
+    """
+    chat completions를 stream: true로 요청하고, 생성되는 텍스트 조각(delta)을 도착하는 대로 yield.
+    - 응답은 SSE 형식 (data: {...} 줄 단위, 마지막은 data: [DONE])
+    - timeout은 조각 사이의 최대 대기 시간(초)
+    """
+    request_timeout = httpx.Timeout(timeout or GMS_DEFAULT_TIMEOUT, connect=GMS_CONNECT_TIMEOUT)
+    payload = {**json, "stream": True}
+
+    async with _host_slot(url):
+        async with get_client().stream("POST", url, headers=headers, json=payload, timeout=request_timeout) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = _json.loads(data)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+
+
+async def complete(url: str, headers: dict, json: dict, timeout: float | None = None, on_token=None) -> str:
+    """
+    chat completions 결과 텍스트를 반환.
+    - on_token이 없으면 일반 요청 (post)
+    - on_token(delta)이 있으면 stream으로 요청해서 조각이 도착할 때마다 호출하고, 전체 텍스트를 반환
+    """
+    if on_token is None:
+        result = await post(url, headers=headers, json=json, timeout=timeout)
+        return result["choices"][0]["message"]["content"].strip()
+
+    parts = []
+    async for delta in stream(url, headers=headers, json=json, timeout=timeout):
+        parts.append(delta)
+        on_token(delta)
+    return "".join(parts).strip()
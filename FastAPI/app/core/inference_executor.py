@@ -0,0 +1,87 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# 추론 워커 수 (기본값: uvicorn 워커 하나가 쓸 코어 수 / ONNX intra-op 스레드 수)
+# session.run 하나가 intra-op 스레드를 ORT_INTRA_OP_THREADS개 쓰므로, 워커 수 x intra-op 스레드가 코어 몫을 넘지 않게 함
+# (model_loader.py와 같은 기본값 계산, 기본 설정이면 1)
+_CORES_PER_PROCESS = max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WEB_CONCURRENCY", "1"))))
+_ORT_INTRA_OP_THREADS = max(1, int(os.getenv("ORT_INTRA_OP_THREADS", str(_CORES_PER_PROCESS))))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(max(1, _CORES_PER_PROCESS // _ORT_INTRA_OP_THREADS))))
+# 워커가 모두 바쁠 때 대기할 수 있는 요청 수
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "64"))
+# 대기열 자리가 날 때까지 기다리는 최대 시간(초)
+INFERENCE_ADMISSION_TIMEOUT = float(os.getenv("INFERENCE_ADMISSION_TIMEOUT", "5.0"))
+
+
+class InferenceQueueFull(Exception):
+    """대기열이 가득 차서 추론 요청을 받을 수 없을 때 발생"""
+
+
+class InferenceExecutor:
+    """
+    ONNX 추론처럼 CPU를 오래 잡는 동기 함수를 이벤트 루프 밖(스레드 풀)에서 실행.
+    - 워커 수만큼만 동시에 실행하고, 나머지는 최대 queue_size개까지 대기
+    - 대기열이 admission_timeout 동안 비지 않으면 InferenceQueueFull 발생 (backpressure)
+    - await executor.run(fn, *args) 형태로 사용
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, admission_timeout: float):
+        self.max_workers = max(1, max_workers)
+        self.queue_size = max(0, queue_size)
+        self.admission_timeout = admission_timeout
+        self._pool = None
+        self._slots = asyncio.Semaphore(self.max_workers + self.queue_size)
+        self._pending = 0
+        self._rejected = 0
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+            )
+            print(f"[INFERENCE] 추론 executor 시작 (workers={self.max_workers}, queue={self.queue_size})")
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            print("[INFERENCE] 추론 executor 종료")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "pending": self._pending,
+            "rejected": self._rejected,
+        }
+
+    async def run(self, fn, *args, **kwargs):
+        # lifespan을 거치지 않은 경우(테스트, 스크립트 등)를 위해 지연 시작
+        self.start()
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.admission_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise InferenceQueueFull(
+                f"추론 대기열이 가득 찼습니다. (workers={self.max_workers}, queue={self.queue_size})"
+            )
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+
+inference_executor = InferenceExecutor(
+    max_workers=INFERENCE_WORKERS,
+    queue_size=INFERENCE_QUEUE_SIZE,
+    admission_timeout=INFERENCE_ADMISSION_TIMEOUT,
+)
@@ -0,0 +1,396 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+import httpx
+
+from app.core.webhook import webhook_url_allowed
+
+# 오래 걸리는 작업(주간 보고서 + 조언)을 job으로 받아서 백그라운드 워커가 처리
+# 작업 상태를 저장하는 SQLite 파일 (여러 uvicorn 워커가 같은 파일을 공유)
+JOB_DB = os.getenv("JOB_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "jobs.db"))
+# 프로세스당 동시에 실행하는 작업 수
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# 작업 하나의 최대 실행 시간(초), 실패 시 최대 시도 횟수
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# 재시도 대기 시간(초): base * 2^(시도-1), 최대 max_delay (+ jitter)
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))
+JOB_RETRY_MAX_DELAY = float(os.getenv("JOB_RETRY_MAX_DELAY", "120"))
+# 실행 중인 작업의 점유 시간(초). 프로세스가 죽어서 이 시간이 지나면 다른 워커가 다시 가져감
+JOB_LEASE = float(os.getenv("JOB_LEASE", str(JOB_TIMEOUT + 60)))
+# 다른 프로세스에서 들어온 작업 / 재시도 시각 확인 주기(초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+# 같은 사용자 + 같은 입력으로 성공한 작업이 있으면 이 시간(초) 동안은 새로 만들지 않고 그 결과를 돌려줌
+# (같은 사용자 + 같은 종류의 작업이 진행 중일 때: 입력이 같으면 그 작업을 돌려주고, 다르면 ActiveJobConflict)
+JOB_DEDUP_TTL = float(os.getenv("JOB_DEDUP_TTL", str(24 * 3600)))
+# 완료된 작업 보관 기간(초)
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 3600)))
+# 완료 알림(webhook) 시도 횟수 / 타임아웃(초)
+JOB_WEBHOOK_ATTEMPTS = int(os.getenv("JOB_WEBHOOK_ATTEMPTS", "3"))
+JOB_WEBHOOK_TIMEOUT = float(os.getenv("JOB_WEBHOOK_TIMEOUT", "10"))
+
+ACTIVE_STATUSES = ("queued", "running", "retrying")
+
+
+class UnknownJobKind(Exception):
+    """등록되지 않은 작업 종류로 제출했을 때 발생"""
+
+
+class ActiveJobConflict(Exception):
+    """같은 사용자 + 같은 종류의 작업이 다른 입력으로 진행 중일 때 발생 (진행 중인 job id 포함)"""
+
+    def __init__(self, job_id: str, status: str):
+        super().__init__(f"진행 중인 작업이 있습니다: {job_id} ({status})")
+        self.job_id = job_id
+        self.status = status
+
+
+class JobQueue:
+    """
+    SQLite에 상태를 저장하는 작업 큐.
+    - submit()은 작업을 저장하고 바로 job id를 반환, 워커(프로세스당 workers개)가 순서대로 실행
+    - 같은 종류 + 같은 사용자의 작업은 동시에 하나만 실행
+      - 진행 중인 작업과 입력이 같으면 그 job id를 반환, 입력이 다르면 ActiveJobConflict (새 입력을 버리지 않고 거절)
+      - 같은 입력으로 최근(JOB_DEDUP_TTL)에 성공한 작업이 있으면 새로 만들지 않고 그 job id를 반환
+    - 실패하면 지수 backoff 후 재시도 (max_attempts까지), 마지막 실패는 failed로 기록
+    - 작업은 DB에서 UPDATE 한 번으로 가져가므로 여러 프로세스가 같은 DB를 써도 한 번만 실행됨
+    - 실행 중 프로세스가 죽으면 lease가 끝난 뒤 다른 워커가 다시 실행 (서버 재시작 후에도 이어서 처리)
+    - 완료/실패 시 webhook_url이 있으면 결과를 POST
+    - register(kind, handler)로 작업 종류 등록, handler(payload: dict)는 JSON으로 저장 가능한 결과를 반환하는 코루틴
+    """
+
+    def __init__(self, path: str, workers: int, max_attempts: int, timeout: float):
+        self.path = path
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self._handlers = {}
+        self._local = threading.local()
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._http: httpx.AsyncClient | None = None
+        self._initialized = False
+
+        # 지표
+        self.running = 0
+        self.submitted = 0
+        self.deduplicated = 0
+        self.conflicts = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.webhook_failures = 0
+
+    # ---------------- DB ----------------
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        if self._initialized:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, user_id INTEGER, dedup_key TEXT NOT NULL, "
+            "status TEXT NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, webhook_url TEXT, webhook_status TEXT, "
+            "run_at REAL NOT NULL, lease_until REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (kind, user_id, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)")
+        self._initialized = True
+
+    @staticmethod
+    def make_dedup_key(kind: str, user_id, payload: dict) -> str:
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return f"{kind}:{user_id}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+
+    def _insert_or_get(self, kind: str, user_id, payload: dict, webhook_url: str | None):
+        self._init_db()
+        conn = self._conn()
+        dedup_key = self.make_dedup_key(kind, user_id, payload)
+        now = time.time()
+
+        # 다른 워커가 같은 작업을 동시에 넣는 경우를 막기 위해 쓰기 잠금을 먼저 잡음
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # 1) 같은 사용자 + 같은 종류의 작업이 진행 중이면 새로 만들지 않음
+            #    (백엔드가 같은 주간 작업을 두 번 보내서 오래 걸리는 작업이 동시에 두 개 도는 것 방지)
+            #    입력이 다르면 다른 데이터의 결과를 돌려주지 않도록 거절 -> 진행 중인 작업이 끝난 뒤 다시 제출
+            # 2) 끝난 작업 결과는 입력까지 같을 때만 JOB_DEDUP_TTL 동안 재사용
+            row = conn.execute(
+                "SELECT id, status, dedup_key FROM jobs WHERE kind = ? AND user_id IS ? AND "
+                f"status IN ({','.join('?' * len(ACTIVE_STATUSES))}) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (kind, user_id, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None and row["dedup_key"] != dedup_key:
+                conn.execute("COMMIT")
+                raise ActiveJobConflict(row["id"], row["status"])
+            if row is None:
+                row = conn.execute(
+                    "SELECT id, status FROM jobs WHERE dedup_key = ? AND status = 'succeeded' AND updated_at >= ? "
+                    "ORDER BY created_at DESC LIMIT 1",
+                    (dedup_key, now - JOB_DEDUP_TTL),
+                ).fetchone()
+            if row is not None:
+                conn.execute("COMMIT")
+                return row["id"], row["status"], True
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, user_id, dedup_key, status, payload, webhook_url, run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, user_id, dedup_key, json.dumps(payload, ensure_ascii=False), webhook_url, now, now, now),
+            )
+            conn.execute("COMMIT")
+            return job_id, "queued", False
+        except ActiveJobConflict:
+            raise
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _claim(self):
+        # 실행할 때가 된 작업(또는 lease가 끝난 실행 중 작업) 하나를 가져가면서 running으로 변경
+        self._init_db()
+        now = time.time()
+        return self._conn().execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE (status IN ('queued', 'retrying') AND run_at <= ?) "
+            "OR (status = 'running' AND lease_until < ?) ORDER BY run_at LIMIT 1) "
+            "RETURNING id, kind, user_id, payload, attempts, webhook_url",
+            (now + JOB_LEASE, now, now, now),
+        ).fetchone()
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        self._conn().execute(
+            f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+            (*fields.values(), job_id),
+        )
+
+    def _next_run_at(self):
+        row = self._conn().execute(
+            "SELECT MIN(CASE WHEN status = 'running' THEN lease_until ELSE run_at END) FROM jobs "
+            f"WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+            ACTIVE_STATUSES,
+        ).fetchone()
+        return row[0]
+
+    def _purge(self):
+        self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+            (time.time() - JOB_RETENTION,),
+        )
+
+    def _get(self, job_id: str):
+        self._init_db()
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        del job["payload"], job["dedup_key"]
+        return job
+
+    # ---------------- API ----------------
+
+    def register(self, kind: str, handler):
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, user_id, payload: dict, webhook_url: str | None = None) -> dict:
+        """작업 저장 후 {job_id, status, deduplicated} 반환"""
+        if kind not in self._handlers:
+            raise UnknownJobKind(kind)
+
+        try:
+            job_id, status, deduplicated = await asyncio.to_thread(self._insert_or_get, kind, user_id, payload, webhook_url)
+        except ActiveJobConflict as e:
+            self.conflicts += 1
+            print(f"[JOB] 다른 입력의 작업이 진행 중 ({kind}, user={user_id}) -> {e.job_id} ({e.status})")
+            raise
+        if deduplicated:
+            self.deduplicated += 1
+            print(f"[JOB] 같은 작업이 이미 있음 ({kind}, user={user_id}) -> {job_id} ({status})")
+        else:
+            self.submitted += 1
+            print(f"[JOB] 작업 등록 ({kind}, user={user_id}) -> {job_id}")
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return {"job_id": job_id, "status": status, "deduplicated": deduplicated}
+
+    async def get(self, job_id: str) -> dict | None:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def start(self):
+        """FastAPI lifespan 시작 시 호출"""
+        if self._tasks:
+            return
+        await asyncio.to_thread(self._init_db)
+        await asyncio.to_thread(self._purge)
+        self._wakeup = asyncio.Event()
+        self._http = httpx.AsyncClient(timeout=JOB_WEBHOOK_TIMEOUT)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[JOB] 작업 큐 시작 (workers={self.workers}, db={self.path})")
+
+    async def stop(self):
+        """FastAPI lifespan 종료 시 호출. 실행 중이던 작업은 queued로 되돌려서 재시작 후 이어서 처리"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        print("[JOB] 작업 큐 종료")
+
+    # ---------------- 워커 ----------------
+
+    async def _worker(self, index: int):
+        while True:
+            try:
+                job = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                print(f"⚠️ [JOB] 작업 조회 실패: {e}")
+                job = None
+
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            # 다른 워커도 바로 다음 작업을 확인하도록 깨움
+            self._wakeup.set()
+            await self._execute(dict(job))
+
+    async def _wait_for_work(self):
+        delay = JOB_POLL_INTERVAL
+        try:
+            next_run_at = await asyncio.to_thread(self._next_run_at)
+            if next_run_at is not None:
+                delay = min(delay, max(0.0, next_run_at - time.time()))
+        except sqlite3.Error:
+            pass
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _execute(self, job: dict):
+        job_id, kind, attempts = job["id"], job["kind"], job["attempts"]
+        handler = self._handlers.get(kind)
+
+        self.running += 1
+        try:
+            if handler is None:
+                raise UnknownJobKind(kind)
+            if attempts > self.max_attempts:
+                # lease가 끝나서 다시 가져온 작업 (실행 중 프로세스가 계속 죽은 경우)
+                raise TimeoutError(f"최대 시도 횟수 초과 ({self.max_attempts})")
+            result = await asyncio.wait_for(handler(json.loads(job["payload"])), timeout=self.timeout)
+        except asyncio.CancelledError:
+            # 서버 종료: 시도 횟수를 되돌리고 다시 대기 상태로
+            self._update(job_id, status="queued", attempts=attempts - 1, run_at=time.time(), lease_until=None)
+            raise
+        except Exception as e:
+            error = f"{type(e).__name__}: {getattr(e, 'detail', None) or e}"
+            if attempts < self.max_attempts and not isinstance(e, UnknownJobKind):
+                delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+                delay *= random.uniform(0.5, 1.0)
+                self.retried += 1
+                print(f"⚠️ [JOB] {kind} {job_id} 실패 ({attempts}/{self.max_attempts}), {delay:.1f}초 후 재시도: {error}")
+                await asyncio.to_thread(
+                    self._update, job_id, status="retrying", error=error, run_at=time.time() + delay, lease_until=None
+                )
+                return
+
+            self.failed += 1
+            print(f"❌ [JOB] {kind} {job_id} 최종 실패 ({attempts}회 시도): {error}")
+            await asyncio.to_thread(self._update, job_id, status="failed", error=error, lease_until=None)
+            await self._notify(job, "failed", error=error)
+            return
+        finally:
+            self.running -= 1
+
+        self.succeeded += 1
+        print(f"✅ [JOB] {kind} {job_id} 완료 ({attempts}회 시도)")
+        await asyncio.to_thread(
+            self._update, job_id, status="succeeded", error=None, lease_until=None,
+            result=json.dumps(result, ensure_ascii=False, default=str),
+        )
+        await self._notify(job, "succeeded", result=result)
+
+    async def _notify(self, job: dict, status: str, result=None, error: str | None = None):
+        url = job.get("webhook_url")
+        if not url or self._http is None:
+            return
+        # 제출 시 검증하지만 설정이 바뀐 뒤 남아 있던 작업도 있으므로 보내기 전에 한 번 더 확인
+        if not webhook_url_allowed(url):
+            print(f"⚠️ [JOB] 허용되지 않은 webhook 주소, 전송 안 함: {url}")
+            await asyncio.to_thread(self._update, job["id"], webhook_status="rejected")
+            return
+
+        body = {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "user_id": job["user_id"],
+            "status": status,
+            "result": result,
+            "error": error,
+        }
+        for attempt in range(JOB_WEBHOOK_ATTEMPTS):
+            try:
+                res = await self._http.post(url, content=json.dumps(body, ensure_ascii=False, default=str),
+                                            headers={"Content-Type": "application/json"})
+                res.raise_for_status()
+                await asyncio.to_thread(self._update, job["id"], webhook_status="delivered")
+                return
+            except Exception as e:
+                print(f"⚠️ [JOB] webhook 전송 실패 ({attempt + 1}/{JOB_WEBHOOK_ATTEMPTS}) {url}: {e}")
+                if attempt + 1 < JOB_WEBHOOK_ATTEMPTS:
+                    await asyncio.sleep(2 ** attempt)
+
+        # 결과는 DB에 남아 있으므로 클라이언트는 조회 API로 확인 가능
+        self.webhook_failures += 1
+        await asyncio.to_thread(self._update, job["id"], webhook_status="failed")
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "conflicts": self.conflicts,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "webhook_failures": self.webhook_failures,
+        }
+
+
+job_queue = JobQueue(
+    path=JOB_DB,
+    workers=JOB_WORKERS,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    timeout=JOB_TIMEOUT,
+)
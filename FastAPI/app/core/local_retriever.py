@@ -0,0 +1,215 @@
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from app.core.embedding_store import EmbeddingStore
+
+# Weaviate 대신(또는 Weaviate가 느리거나 죽었을 때) 프로세스 안에서 검색하는 로컬 retriever
+# 스냅샷 = vector_db_settings의 임베딩 저장소 (db_setting.py 적재 결과 또는 embeddings.py snapshot)
+LOCAL_RETRIEVER_STORE = os.getenv("LOCAL_RETRIEVER_STORE", "")
+LOCAL_RETRIEVER_MODEL = os.getenv("LOCAL_RETRIEVER_MODEL", os.getenv("EMBEDDING_MODEL", ""))
+# vector_db_settings/bm25.py에서 Weaviate에 설정한 값과 맞춤
+LOCAL_BM25_K1 = float(os.getenv("LOCAL_BM25_K1", "1.2"))
+LOCAL_BM25_B = float(os.getenv("LOCAL_BM25_B", "0.8"))
+# 점수 결합 전에 검색 방식별로 뽑아두는 후보 수 (limit보다 작으면 limit 사용)
+LOCAL_FUSION_CANDIDATES = int(os.getenv("LOCAL_FUSION_CANDIDATES", "100"))
+
+# 컬렉션별 BM25 대상 / 반환 properties
+LOCAL_COLLECTIONS = {
+    "SingleCounsel": {"text": "input", "properties": ["input", "output"]},
+    "MultiCounsel": {"text": "patient", "properties": ["patient", "counselor"]},
+}
+
+_word_pattern = re.compile(r"[0-9A-Za-z가-힣]+")
+_hangul_pattern = re.compile(r"[가-힣]")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    형태소 분석기 없이 쓰는 한국어 BM25 토큰: 단어(공백/기호 기준) + 한글 단어의 글자 bigram.
+    조사가 붙은 형태("회사에서", "회사가")도 bigram("회사")으로 매칭됨.
+    """
+    tokens = []
+    for word in _word_pattern.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and _hangul_pattern.search(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, texts: list[str], k1: float, b: float):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        postings = defaultdict(lambda: ([], []))
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc] = sum(counts.values())
+            for token, tf in counts.items():
+                docs, tfs = postings[token]
+                docs.append(doc)
+                tfs.append(tf)
+
+        avg_length = float(lengths.mean()) if self.size else 0.0
+        # 문서 길이 보정값은 미리 계산 (k1 * (1 - b + b * len / avg))
+        self._norm = self.k1 * (1 - self.b + self.b * lengths / max(avg_length, 1e-6))
+        self._postings = {
+            token: (np.asarray(docs, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for token, (docs, tfs) in postings.items()
+        }
+        self._idf = {
+            token: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, (docs, _) in self._postings.items()
+        }
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            docs, tfs = posting
+            scores[docs] += self._idf[token] * tfs * (self.k1 + 1) / (tfs + self._norm[docs])
+        return scores
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _relative_scores(indices: np.ndarray, scores: np.ndarray) -> dict:
+    # Weaviate relativeScoreFusion: 각 검색 결과 안에서 min-max 정규화 (최고 1, 최저 0)
+    if len(indices) == 0:
+        return {}
+    values = scores[indices]
+    low, high = float(values.min()), float(values.max())
+    span = high - low
+    return {int(i): (float(v) - low) / span if span > 0 else 1.0 for i, v in zip(indices, values)}
+
+
+class LocalCollection:
+    def __init__(self, name: str, ids: list[str], properties: list[dict], vectors: np.ndarray, text_property: str):
+        self.name = name
+        self.ids = ids
+        self.properties = properties
+        # cosine 계산용으로 정규화해서 메모리에 복사 (flat inner product)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = np.ascontiguousarray(vectors / np.maximum(norms, 1e-12), dtype=np.float32)
+        self.bm25 = BM25Index([p.get(text_property, "") for p in properties], LOCAL_BM25_K1, LOCAL_BM25_B)
+
+    def hybrid(self, query: str, vector, alpha: float, limit: int) -> list[dict]:
+        """
+        Weaviate hybrid(relativeScoreFusion)와 같은 방식: 최종 점수 = alpha * 벡터 점수 + (1 - alpha) * BM25 점수
+        (각 점수는 검색 방식별 상위 후보 안에서 0~1로 정규화, alpha=1이면 벡터만 / 0이면 BM25만)
+        """
+        candidates = max(limit, LOCAL_FUSION_CANDIDATES)
+        fused = defaultdict(float)
+
+        if vector is not None and alpha > 0:
+            query_vector = np.asarray(vector, dtype=np.float32)
+            query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+            vector_scores = self.vectors @ query_vector
+            for i, s in _relative_scores(_top(vector_scores, candidates), vector_scores).items():
+                fused[i] += alpha * s
+        else:
+            # 쿼리 벡터가 없으면(임베딩 실패 등) BM25만 사용
+            alpha = 0.0
+
+        if alpha < 1:
+            bm25_scores = self.bm25.scores(query)
+            hits = _top(bm25_scores, candidates)
+            hits = hits[bm25_scores[hits] > 0]
+            for i, s in _relative_scores(hits, bm25_scores).items():
+                fused[i] += (1 - alpha) * s
+
+        ranked = sorted(fused.items(), key=lambda item: -item[1])[:limit]
+        return [
+            {"id": self.ids[i], "properties": self.properties[i], "vector": self.vectors[i], "score": score}
+            for i, score in ranked
+        ]
+
+
+class LocalRetriever:
+    """
+    임베딩 저장소 스냅샷으로 만든 컬렉션별 flat-IP 벡터 인덱스 + 한국어 BM25 인덱스.
+    - load()는 서버 시작 시 한 번 (스레드에서 실행), 이후 검색은 네트워크 없이 프로세스 안에서 처리
+    - 스냅샷 이후 Weaviate에 새로 저장된 조언은 포함되지 않음 (스냅샷을 다시 만들고 재시작하면 반영)
+    """
+
+    def __init__(self, store_dir: str, model: str):
+        self.store_dir = store_dir
+        self.model = model
+        self.collections: dict[str, LocalCollection] = {}
+        self.loaded_at = None
+        self.load_seconds = None
+        self.searches = 0
+        # 로컬 인덱스로 응답한 횟수 (local / hedge / weaviate_error / embedding_error)
+        self.served = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.store_dir)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.collections)
+
+    def load(self):
+        if not self.enabled:
+            return
+        start = time.perf_counter()
+        store = EmbeddingStore(self.store_dir, self.model, readonly=True)
+        matrix = store.matrix()
+
+        collections = {}
+        for name, spec in LOCAL_COLLECTIONS.items():
+            entries = store.collection_entries(name)
+            if not entries:
+                print(f"⚠️ [LOCAL_RETRIEVER] 스냅샷에 {name} 데이터가 없음")
+                continue
+            collections[name] = LocalCollection(
+                name,
+                [e["id"] for e in entries],
+                [e["properties"] for e in entries],
+                matrix[np.asarray([e["offset"] for e in entries])],
+                spec["text"],
+            )
+
+        self.collections = collections
+        self.loaded_at = time.time()
+        self.load_seconds = round(time.perf_counter() - start, 3)
+        sizes = {name: len(c.ids) for name, c in collections.items()}
+        print(f"[LOCAL_RETRIEVER] 스냅샷 로드 완료 {sizes} ({self.load_seconds}s, {store.path})")
+
+    def hybrid(self, collection: str, query: str, vector, alpha: float, limit: int) -> list[dict]:
+        local = self.collections.get(collection)
+        if local is None:
+            raise KeyError(f"로컬 인덱스에 {collection} 컬렉션이 없습니다.")
+        self.searches += 1
+        return local.hybrid(query, vector, alpha, limit)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "store": self.store_dir,
+            "model": self.model,
+            "collections": {name: len(c.ids) for name, c in self.collections.items()},
+            "load_seconds": self.load_seconds,
+            "searches": self.searches,
+            "served": dict(self.served),
+        }
+
+
+local_retriever = LocalRetriever(LOCAL_RETRIEVER_STORE, LOCAL_RETRIEVER_MODEL)
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+
+from app.core.inference_executor import inference_executor
+
+# 동시에 들어온 요청의 문장을 모아서 한 번에 추론할지 여부
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "true").lower() == "true"
+# 첫 요청이 들어온 뒤 다른 요청을 기다리는 최대 시간(ms)
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "5"))
+# 모인 문장 수가 이 값 이상이면 기다리지 않고 바로 추론
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+
+
+class MicroBatcher:
+    """
+    여러 요청에서 동시에 들어온 항목(문장)을 짧은 시간 동안 모아서 fn 한 번으로 처리.
+    - 첫 항목이 들어온 뒤 window_ms가 지나거나, 모인 항목이 max_size 이상이면 묶음 실행
+    - 묶음은 inference_executor에서 실행 (대기열 초과 시 InferenceQueueFull이 모든 요청에 전달됨)
+    - fn(items)는 items와 같은 길이의 결과(list / ndarray)를 반환해야 하고, 요청마다 자기 구간만 돌려받음
+    - await batcher.submit(items) 형태로 사용
+    """
+
+    def __init__(self, fn, window_ms: float, max_size: int, enabled: bool = True):
+        self.fn = fn
+        self.window = window_ms / 1000
+        self.max_size = max(1, max_size)
+        self.enabled = enabled
+        self._pending: list = []   # (items, future, 들어온 시각)
+        self._pending_size = 0
+        self._timer = None
+        # 실행 중인 묶음 task (참조를 잡아두지 않으면 실행 도중 GC될 수 있음)
+        self._tasks: set[asyncio.Task] = set()
+
+        # 지표
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.size_flushes = 0
+        self.window_flushes = 0
+        self._fill_sum = 0.0
+        self._wait_sum = 0.0
+
+    async def submit(self, items: list):
+        if not self.enabled:
+            return await inference_executor.run(self.fn, items)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((items, future, time.monotonic()))
+        self._pending_size += len(items)
+
+        if self._pending_size >= self.max_size:
+            self.size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._on_window)
+
+        return await future
+
+    def _on_window(self):
+        self._timer = None
+        if self._pending:
+            self.window_flushes += 1
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending, self._pending_size = self._pending, [], 0
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list):
+        try:
+            items = [item for request_items, _, _ in batch for item in request_items]
+
+            now = time.monotonic()
+            self.batches += 1
+            self.requests += len(batch)
+            self.items += len(items)
+            self._fill_sum += min(1.0, len(items) / self.max_size)
+            self._wait_sum += sum(now - queued_at for _, _, queued_at in batch)
+
+            results = await inference_executor.run(self.fn, items)
+        except Exception as e:
+            # 어떤 오류든 기다리는 요청 모두에 전달 (future가 끝나지 않고 멈추는 일 없도록)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for request_items, future, _ in batch:
+            # 기다리던 요청이 취소된 경우(클라이언트 끊김 등)는 결과만 버림
+            if not future.done():
+                future.set_result(results[offset:offset + len(request_items)])
+            offset += len(request_items)
+
+    @property
+    def stats(self) -> dict:
+        batches = max(1, self.batches)
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "batches": self.batches,
+            "requests": self.requests,
+            "items": self.items,
+            "avg_batch_size": round(self.items / batches, 2),
+            "avg_requests_per_batch": round(self.requests / batches, 2),
+            # 묶음 크기 / max_size 평균 (1에 가까울수록 꽉 채워서 실행)
+            "avg_fill_rate": round(self._fill_sum / batches, 4),
+            "size_flushes": self.size_flushes,
+            "window_flushes": self.window_flushes,
+            "avg_wait_ms": round(self._wait_sum / max(1, self.requests) * 1000, 3),
+            "pending": self._pending_size,
+        }
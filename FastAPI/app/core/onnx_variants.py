@@ -0,0 +1,23 @@
+import os
+
+# 서빙용 ONNX 모델 변형 이름 -> 파일 이름 (FastAPI/onnx/ 아래)
+# Classifier_Model/build_variants.py(생성)와 model_loader.py(로드)가 같이 사용하므로 여기서만 정의
+#   fp       : convert_to_onnx 기본 export
+#   fp32     : float32 export
+#   opt      : 그래프 최적화 (Attention / LayerNorm / Gelu fusion)
+#   int8     : opt + INT8 dynamic quantization
+#   int8_ort : int8을 ORT 포맷으로 저장한 것
+ONNX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "onnx")
+ONNX_VARIANTS = {
+    "fp": "model.onnx",
+    "fp32": "model_fp32.onnx",
+    "opt": "model_opt.onnx",
+    "int8": "model_int8.onnx",
+    "int8_ort": "model_int8.ort",
+}
+
+
+def variant_path(variant: str) -> str:
+    if variant not in ONNX_VARIANTS:
+        raise ValueError(f"ONNX 모델 변형은 {list(ONNX_VARIANTS)} 중 하나여야 합니다: {variant}")
+    return os.path.join(ONNX_DIR, ONNX_VARIANTS[variant])
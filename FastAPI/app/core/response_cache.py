@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import json
+import os
+from app.core.cache import TTLCache, InFlight, SQLiteStore
+
+# GMS 텍스트 생성 결과 캐시 (요약, 일간 조언 등)
+GMS_CACHE_ENABLED = os.getenv("GMS_CACHE_ENABLED", "true").lower() == "true"
+# 프로세스 내 캐시 개수 / 유지 시간(초)
+GMS_CACHE_SIZE = int(os.getenv("GMS_CACHE_SIZE", "2000"))
+GMS_CACHE_TTL = float(os.getenv("GMS_CACHE_TTL", str(24 * 3600)))
+# 워커끼리 공유하는 SQLite 파일 경로 (기본: FastAPI/data/gms_cache.db, GMS_CACHE_DB=""로 지정하면 프로세스 내 캐시만 사용)
+GMS_CACHE_DB = os.getenv("GMS_CACHE_DB", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "gms_cache.db"))
+GMS_CACHE_DB_MAX_ROWS = int(os.getenv("GMS_CACHE_DB_MAX_ROWS", "100000"))
+
+
+def normalize_input(text: str) -> str:
+    # 앞뒤 공백 / 연속 공백 / 줄바꿈 차이는 같은 입력으로 취급
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """
+    (작업 이름, 모델, 프롬프트 버전, 정규화된 입력) 기준으로 GMS 응답을 캐시.
+    - 프로세스 내 LRU -> SQLite(워커 공유, 기본 사용) 순서로 조회, 둘 다 없을 때만 upstream 호출
+    - 같은 key로 동시에 들어온 요청(재시도, 중복 탭 등)은 upstream 호출 하나로 합침
+    - 프롬프트를 수정하면 서비스 쪽 프롬프트 버전을 올려서 이전 결과를 무효화
+    - 값은 JSON으로 저장 (문자열 / dict 모두 가능), 예외가 난 호출은 저장하지 않음
+    """
+
+    def __init__(self, max_size: int, ttl: float, db_path: str = "", db_max_rows: int = 0, enabled: bool = True):
+        self.enabled = enabled
+        self._memory = TTLCache(max_size=max_size, ttl=ttl)
+        self._store = SQLiteStore(db_path, "gms_responses", ttl=ttl, max_rows=db_max_rows) if db_path else None
+        self._inflight = InFlight()
+        self.upstream_calls = 0
+
+    @staticmethod
+    def make_key(name: str, model: str, version: str, text: str) -> bytes:
+        raw = f"{name}\x00{model}\x00{version}\x00{normalize_input(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).digest()
+
+    async def get_or_call(self, name: str, model: str, version: str, text: str, fn):
+        """fn: 캐시에 없을 때 호출할 코루틴 함수 (인자 없음)"""
+        if not self.enabled:
+            return await fn()
+
+        key = self.make_key(name, model, version, text)
+        value = self._memory.get(key)
+        if value is not None:
+            return value
+
+        return await self._inflight.run(key, lambda: self._load_or_call(key, fn))
+
+    async def _load_or_call(self, key: bytes, fn):
+        if self._store is not None:
+            blob = await asyncio.to_thread(self._store.get, key)
+            if blob is not None:
+                value = json.loads(blob)
+                self._memory.set(key, value)
+                return value
+
+        self.upstream_calls += 1
+        value = await fn()
+        self._memory.set(key, value)
+        if self._store is not None:
+            await asyncio.to_thread(self._store.set, key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        return value
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "memory": self._memory.stats,
+            "sqlite": self._store.stats if self._store is not None else None,
+            "upstream_calls": self.upstream_calls,
+        }
+
+
+response_cache = ResponseCache(
+    max_size=GMS_CACHE_SIZE,
+    ttl=GMS_CACHE_TTL,
+    db_path=GMS_CACHE_DB,
+    db_max_rows=GMS_CACHE_DB_MAX_ROWS,
+    enabled=GMS_CACHE_ENABLED,
+)
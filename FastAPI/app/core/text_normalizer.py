@@ -0,0 +1,76 @@
+import re
+import emoji
+
+# 감정 분류 전처리용 문장 정규화.
+# 기존 파이프라인(emotionClassifying -> predict에서 clean을 두 번 적용)과 결과는 동일하고, 결과에 영향이 없는 단계는 건너뜀.
+# - 허용 문자 패턴: 이모지 코드포인트 수천 개를 그대로 나열하던 문자 클래스를 구간(range)으로 압축해서 미리 컴파일
+# - 이모지 제거: 문장에 이모지 코드포인트가 하나도 없으면 emoji.replace_emoji(문자 단위 파이썬 루프)를 건너뜀
+# - URL 제거: "://"가 없으면 정규식을 돌리지 않음
+# - 두 번째 적용: 첫 번째 결과에 이모지 코드포인트나 "://"가 남아 있을 때만 후처리를 한 번 더 돌림
+#   (ex. "1👩⃣" -> 가운데 이모지가 지워지면서 "1⃣" 키캡 이모지가 새로 생기는 경우)
+
+
+def _to_char_class(chars) -> str:
+    """코드포인트 집합을 정규식 문자 클래스용 구간 문자열로 압축 (ex. 가-힣)"""
+    points = sorted({ord(c) for c in chars})
+    parts = []
+    start = prev = points[0]
+    for p in points[1:]:
+        if p == prev + 1:
+            prev = p
+            continue
+        parts.append((start, prev))
+        start = prev = p
+    parts.append((start, prev))
+
+    out = []
+    for a, b in parts:
+        if a == b:
+            out.append(re.escape(chr(a)))
+        else:
+            out.append(f"{re.escape(chr(a))}-{re.escape(chr(b))}")
+    return "".join(out)
+
+
+# 이모지를 구성하는 코드포인트 전체 / 그 중 ASCII가 아닌 것
+# (ASCII만으로 이루어진 이모지는 없으므로, ASCII가 아닌 이모지 코드포인트가 없으면 이모지도 없음)
+_EMOJI_CHARS = set("".join(emoji.EMOJI_DATA.keys()))
+_EMOJI_NON_ASCII = frozenset(c for c in _EMOJI_CHARS if not c.isascii())
+
+# soynlp.normalizer.repeat_normalize와 동일한 동작
+# (soynlp 패키지는 import 시 sklearn / scipy까지 불러와서 서빙 기동이 1초 이상 느려지므로 정규식만 가져옴)
+repeatchars_pattern = re.compile(r"(\w)\1{3,}")
+doublespace_pattern = re.compile(r"\s+")
+
+
+def repeat_normalize(sent: str, num_repeats: int = 2) -> str:
+    if num_repeats > 0:
+        sent = repeatchars_pattern.sub("\\1" * num_repeats, sent)
+    sent = doublespace_pattern.sub(" ", sent)
+    return sent.strip()
+
+
+pattern = re.compile(f"[^ .,?!/@$%~％·∼()\x00-\x7Fㄱ-ㅣ가-힣{_to_char_class(_EMOJI_CHARS)}]+")
+url_pattern = re.compile(
+    r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)')
+
+
+def _strip_noise(x: str) -> str:
+    """이모지 / URL 제거 + 공백 정리 + 반복 문자 축약"""
+    if not _EMOJI_NON_ASCII.isdisjoint(x):
+        x = emoji.replace_emoji(x, replace='') #emoji 삭제
+    if "://" in x:
+        x = url_pattern.sub('', x)
+    x = x.strip()
+    x = repeat_normalize(x, num_repeats=2)
+    return x
+
+
+def clean(x: str) -> str:
+    x = pattern.sub(' ', x)
+    x = _strip_noise(x)
+    # 첫 번째 결과에서는 pattern.sub, repeat_normalize를 다시 돌려도 바뀌는 게 없으므로
+    # 이모지 / URL이 새로 생긴 경우에만 나머지 단계를 한 번 더 적용
+    if not _EMOJI_NON_ASCII.isdisjoint(x) or "://" in x:
+        x = _strip_noise(x)
+    return x
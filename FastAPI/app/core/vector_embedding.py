@@ -1,13 +1,27 @@
 from dotenv import load_dotenv
+import hashlib
 import os
-import httpx
+from app.core import gms_client
+from app.core.cache import TTLCache, InFlight
 load_dotenv()
 
 API_KEY = os.getenv("GMS_KEY")
 EMB_MODEL = os.getenv("EMBEDDING_MODEL")
 EMB_URL = os.getenv("EMBEDDING_GMS_URL")
 
-def embed(text: str) -> list[float]:
+# 임베딩 캐시 (텍스트 내용 해시 기준)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+
+_cache = TTLCache(max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL)
+_inflight = InFlight()
+
+
+def _cache_key(text: str) -> str:
+    return hashlib.sha256(f"{EMB_MODEL}\x00{text}".encode("utf-8")).hexdigest()
+
+
+async def _request_embedding(key: str, text: str) -> tuple:
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {API_KEY}",
@@ -19,15 +33,7 @@ def embed(text: str) -> list[float]:
     }
 
     try:
-        response = httpx.post(
-            EMB_URL,
-            headers=headers,
-            json=payload,
-            timeout=10.0,
-            verify=False,
-        )
-        response.raise_for_status()
-        data = response.json()
+        data = await gms_client.post(EMB_URL, headers=headers, json=payload, timeout=10.0)
         if "data" not in data:
             embedding = []
         else:
@@ -35,9 +41,27 @@ def embed(text: str) -> list[float]:
 
         if not isinstance(embedding, list):
             raise ValueError("embedding이 list 형태가 아닙니다.")
-        
-        return [float(v) for v in embedding]
+
+        vector = tuple(float(v) for v in embedding)
+        if vector:
+            _cache.set(key, vector)
+        return vector
 
     except Exception as e:
         print("Embedding 요청 오류 발생:", e)
         raise e
+
+
+async def embed(text: str) -> list[float]:
+    """
+    텍스트 임베딩을 비동기로 요청.
+    - 같은 텍스트는 캐시(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)에서 바로 반환
+    - 같은 텍스트가 동시에 들어오면 upstream 호출은 한 번만 진행
+    """
+    key = _cache_key(text)
+
+    vector = _cache.get(key)
+    if vector is None:
+        vector = await _inflight.run(key, lambda: _request_embedding(key, text))
+
+    return list(vector)
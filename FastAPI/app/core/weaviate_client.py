@@ -0,0 +1,155 @@
+import asyncio
+import os
+import hashlib
+import uuid
+import weaviate
+from dotenv import load_dotenv
+load_dotenv()
+
+WEAVIATE_HOST = os.getenv("WEAVIATE_HOST", "localhost")
+WEAVIATE_HTTP_PORT = int(os.getenv("WEAVIATE_PORT", "8080"))
+WEAVIATE_GRPC_PORT = int(os.getenv("WEAVIATE_GRPC_PORT", "50051"))
+WEAVIATE_CONNECT_RETRIES = int(os.getenv("WEAVIATE_CONNECT_RETRIES", "5"))
+WEAVIATE_RETRY_DELAY = float(os.getenv("WEAVIATE_RETRY_DELAY", "2.0"))
+# 백그라운드 헬스 체크 주기(초)
+WEAVIATE_HEALTH_INTERVAL = float(os.getenv("WEAVIATE_HEALTH_INTERVAL", "30.0"))
+
+# 상담 데이터 객체 id 생성용 namespace (값을 바꾸면 기존 객체와 id가 달라지므로 고정)
+COUNSEL_UUID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "hand/counsel")
+
+_client: weaviate.WeaviateAsyncClient | None = None
+_connect_lock = asyncio.Lock()
+_health_task: asyncio.Task | None = None
+
+
+async def _connect(max_retries: int, delay: float) -> weaviate.WeaviateAsyncClient:
+    """Weaviate 비동기 클라이언트 연결을 재시도하는 함수"""
+    for attempt in range(max_retries):
+        client = weaviate.use_async_with_custom(
+            http_host=WEAVIATE_HOST,
+            http_port=WEAVIATE_HTTP_PORT,
+            http_secure=False,
+            grpc_host=WEAVIATE_HOST,
+            grpc_port=WEAVIATE_GRPC_PORT,
+            grpc_secure=False,
+        )
+        try:
+            print(f"[WEAVIATE] 연결 시도 {attempt + 1}/{max_retries}...")
+            await client.connect()
+            print(f"[WEAVIATE] 연결 성공: {WEAVIATE_HOST}:{WEAVIATE_HTTP_PORT}")
+            return client
+        except Exception as e:
+            print(f"[WEAVIATE] 연결 실패 (시도 {attempt + 1}/{max_retries}): {e}")
+            try:
+                await client.close()
+            except Exception:
+                pass
+            if attempt < max_retries - 1:
+                print(f"[WEAVIATE] {delay}초 후 재시도...")
+                await asyncio.sleep(delay)
+
+    raise Exception(f"Weaviate 연결 실패: {max_retries}회 시도 후 실패")
+
+
+async def reconnect(max_retries: int = WEAVIATE_CONNECT_RETRIES, delay: float = WEAVIATE_RETRY_DELAY, force: bool = True):
+    global _client
+    async with _connect_lock:
+        # 다른 요청이 먼저 재연결에 성공했다면 그대로 사용
+        if not force and _client is not None and _client.is_connected():
+            return
+        if _client is not None:
+            try:
+                await _client.close()
+            except Exception:
+                pass
+            _client = None
+        _client = await _connect(max_retries, delay)
+
+
+async def get_client() -> weaviate.WeaviateAsyncClient:
+    """연결된 클라이언트를 반환. 연결이 끊겨 있으면 한 번만 다시 연결 시도 (요청이 오래 묶이지 않도록)"""
+    if _client is None or not _client.is_connected():
+        await reconnect(max_retries=1, force=False)
+    return _client
+
+
+async def get_collection(name: str):
+    client = await get_client()
+    return client.collections.get(name)
+
+
+async def health_check() -> bool:
+    if _client is None or not _client.is_connected():
+        return False
+    try:
+        return await _client.is_ready()
+    except Exception as e:
+        print(f"[WEAVIATE] 헬스 체크 실패: {e}")
+        return False
+
+
+async def _health_loop():
+    while True:
+        await asyncio.sleep(WEAVIATE_HEALTH_INTERVAL)
+        if not await health_check():
+            print("[WEAVIATE] 연결 상태 이상, 재연결 시도")
+            try:
+                await reconnect(max_retries=1)
+            except Exception as e:
+                print(f"[WEAVIATE] 재연결 실패: {e}")
+
+
+async def init_client():
+    """FastAPI lifespan 시작 시 호출. 연결에 실패해도 서버는 띄우고 요청 시 재연결"""
+    global _health_task
+    try:
+        await reconnect()
+    except Exception as e:
+        print(f"⚠️ Weaviate 초기 연결 실패, 요청 시 재연결합니다: {e}")
+
+    if _health_task is None or _health_task.done():
+        _health_task = asyncio.create_task(_health_loop())
+
+
+async def close_client():
+    global _client, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        try:
+            await _health_task
+        except asyncio.CancelledError:
+            pass
+        _health_task = None
+
+    if _client is not None:
+        await _client.close()
+        _client = None
+        print("[WEAVIATE] 연결 종료")
+
+
+def _normalized_key(values) -> str:
+    return "\x00".join(" ".join(str(v).split()) for v in values)
+
+
+def content_uuid(collection: str, *values: str) -> str:
+    """
+    컬렉션 이름 + 식별 텍스트(공백 정규화)로 만든 고정 uuid.
+    식별 텍스트는 검색 / 임베딩 대상(SingleCounsel.input, MultiCounsel.patient)만 사용
+    -> 같은 상담 내용은 답변이 바뀌어도 같은 id로 교체됨 (vector_db_settings/db_setting.py와 공유)
+    """
+    return str(uuid.uuid5(COUNSEL_UUID_NAMESPACE, f"{collection}\x00{_normalized_key(values)}"))
+
+
+def content_hash(*values: str) -> str:
+    """객체 전체 내용(공백 정규화)의 해시. content_hash property로 저장해서 --sync 때 바뀐 객체만 교체"""
+    return hashlib.sha256(_normalized_key(values).encode("utf-8")).hexdigest()
+
+
+async def upsert(name: str, properties: dict, vector: list, object_id: str) -> str:
+    """object_id 객체가 있으면 내용 / 벡터를 교체, 없으면 새로 생성"""
+    col = await get_collection(name)
+    if await col.data.exists(object_id):
+        await col.data.replace(uuid=object_id, properties=properties, vector=vector)
+    else:
+        await col.data.insert(properties=properties, vector=vector, uuid=object_id)
+    return object_id
@@ -0,0 +1,19 @@
+import os
+
+import httpx
+
+# 작업 완료 알림(webhook)을 보낼 수 있는 호스트 / 스킴 (쉼표 구분, ".example.com"은 하위 도메인 포함)
+# 목록에 없는 주소(내부망 등)로는 작업 결과를 보내지 않음
+JOB_WEBHOOK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "gatewaytohand.store").split(",") if h.strip()]
+JOB_WEBHOOK_ALLOWED_SCHEMES = [s.strip().lower() for s in os.getenv("JOB_WEBHOOK_ALLOWED_SCHEMES", "https").split(",") if s.strip()]
+
+
+def webhook_url_allowed(url: str) -> bool:
+    parsed = httpx.URL(url)
+    host = (parsed.host or "").lower()
+    if parsed.scheme.lower() not in JOB_WEBHOOK_ALLOWED_SCHEMES or not host:
+        return False
+    return any(
+        host == allowed.lstrip(".") or (allowed.startswith(".") and host.endswith(allowed))
+        for allowed in JOB_WEBHOOK_ALLOWED_HOSTS
+    )
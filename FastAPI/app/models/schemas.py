@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, HttpUrl
+from typing import List, Dict, Any, Optional
 
 # 감정 분석 후 요약본 제공
 class DiaryInput(BaseModel):
@@ -97,4 +97,30 @@ class ManageAdviceInput(BaseModel):
 class ManageAdviceOutput(BaseModel):
     user_id : int
     report : str
-    advice : str
\ No newline at end of file
+    advice : str
+
+# 비동기 작업(job) 전용
+# 작업이 끝나면 webhook_url로 결과를 POST (없으면 조회 API로 확인)
+# webhook_url 허용 주소 검사(JOB_WEBHOOK_ALLOWED_HOSTS / SCHEMES)는 route에서 처리
+class ManageAdviceJobInput(ManageAdviceInput):
+    webhook_url: Optional[HttpUrl] = None
+
+class PersonalAdviceJobInput(PersonalAdviceInput):
+    webhook_url: Optional[HttpUrl] = None
+
+class JobSubmitOutput(BaseModel):
+    job_id: str
+    status: str
+    deduplicated: bool
+
+class JobStatusOutput(BaseModel):
+    job_id: str
+    kind: str
+    user_id: Optional[int] = None
+    status: str
+    attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    webhook_status: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -1,53 +1,29 @@
 import os
-import time
-import weaviate
-import httpx
+import asyncio
 import json
 import re
+import time
 from fastapi import HTTPException
 from dotenv import load_dotenv
+from app.core import gms_client
+from app.core.response_cache import response_cache
 from app.core.vector_embedding import embed
+from app.core import weaviate_client
+from app.core.local_retriever import local_retriever
 from app.services.report import create_report
+from app.services.reranker import reranker, log_retrieval, RERANK_TOP_K
 
 load_dotenv()
 
-WEAVIATE_URL = os.getenv("WEAVIATE_URL")
 ADVICE_URL = os.getenv("COUNSELING_GMS_URL")
 ADVICE_MODEL = os.getenv("COUNSELING_MODEL")
 GMS_KEY = os.getenv("GMS_KEY")
-WEAVIATE_HOST = os.getenv("WEAVIATE_HOST", "localhost")
-WEAVIATE_HTTP_PORT = int(os.getenv("WEAVIATE_PORT", "8080"))
-WEAVIATE_GRPC_PORT = int(os.getenv("WEAVIATE_GRPC_PORT", "50051"))
-
-print("="*50)
-print(f"DEBUG: Attempting to connect to Weaviate with host: '{WEAVIATE_HOST}'")
-print("="*50)
-
-# Weaviate 연결 with retry logic
-def connect_weaviate_with_retry(max_retries=5, delay=2):
-    """Weaviate 연결을 재시도하는 함수"""
-    for attempt in range(max_retries):
-        try:
-            print(f"[WEAVIATE] 연결 시도 {attempt + 1}/{max_retries}...")
-            client = weaviate.connect_to_custom(
-                http_host=WEAVIATE_HOST,
-                http_port=WEAVIATE_HTTP_PORT,
-                grpc_host=WEAVIATE_HOST,
-                grpc_port=WEAVIATE_GRPC_PORT,
-                http_secure=False,
-                grpc_secure=False,
-            )
-            print(f"[WEAVIATE] 연결 성공: {WEAVIATE_HOST}:{WEAVIATE_HTTP_PORT}")
-            return client
-        except Exception as e:
-            print(f"[WEAVIATE] 연결 실패 (시도 {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                print(f"[WEAVIATE] {delay}초 후 재시도...")
-                time.sleep(delay)
-            else:
-                raise Exception(f"Weaviate 연결 실패: {max_retries}회 시도 후 실패")
+# 유사 상담 검색 경로 (weaviate / local / hedged), hedged일 때 Weaviate 응답을 기다리는 시간
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "weaviate")
+RETRIEVAL_HEDGE_MS = float(os.getenv("RETRIEVAL_HEDGE_MS", "300"))
 
-client = connect_weaviate_with_retry()
+# 프롬프트를 수정하면 버전을 올려서 캐시에 남아 있는 이전 결과를 무효화
+DAILY_ADVICE_PROMPT_VERSION = "v1"
 
 # json 아닌거 터지는 경우 방지
 def safe_load_json(text: str):
@@ -133,17 +109,17 @@ async def rerank(summary: str, single_retrieval: list, multi_retrieval:list):
         ## 출력 형식 (JSON)
         아래 형식을 반드시 지켜주세요:
         
-        {
+        {{
         "ranked_items": [
-            {
+            {{
             "type": "single" | "multi",
             "content": "원문 상담 내용"
-            }
+            }}
         ],
         "top_k_final": [
             "상위 3개의 상담 내용만 원문 그대로"
         ]
-        }
+        }}
 
         주의:  
         - score는 0~1 실수  
@@ -181,10 +157,7 @@ async def rerank(summary: str, single_retrieval: list, multi_retrieval:list):
     }
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30.0) as cli:
-            response = await cli.post(ADVICE_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+        result = await gms_client.post(ADVICE_URL, headers=headers, json=payload, timeout=30.0)
             
         advice = result["choices"][0]["message"]["content"].strip()
         
@@ -193,10 +166,23 @@ async def rerank(summary: str, single_retrieval: list, multi_retrieval:list):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GMS 요청 중 오류 발생: {e}")
 
-# 유사 상담내용 검색
-async def retrieve_similar_cases(query: str, info: dict, top_k: int = 5):
-    try:
-        prompt = f"""
+def weaviate_vector(obj):
+    # weaviate v4는 named vector dict({"default": [...]})로 반환
+    vector = getattr(obj, "vector", None)
+    if isinstance(vector, dict):
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return list(vector) if vector else None
+
+# 검색 대상 컬렉션별 (후보 type, 반환할 property)
+RETRIEVAL_COLLECTIONS = [("SingleCounsel", "single", "output"), ("MultiCounsel", "multi", "counselor")]
+RETRIEVAL_ALPHA = 0.5
+
+def build_retrieval_prompt(query: str, info) -> str:
+    # route에서는 pydantic 모델(BM25User)로 넘어오므로 dict로 맞춰줌
+    if hasattr(info, "model_dump"):
+        info = info.model_dump()
+
+    return f"""
         {query}
         사용자 정보
         나이 : {info["age"]}
@@ -205,59 +191,149 @@ async def retrieve_similar_cases(query: str, info: dict, top_k: int = 5):
         성별 : {info['gender']}
         거주 형태 : {info['family']}
         """
-        # 쿼리 임베딩 생성
-        query_vector = embed(prompt)
-        
-        # 뭔가 오류가 터지는데 뭔지 몰라서 찍어보는 것.
-        if query_vector is None or not isinstance(query_vector, list):
-            raise ValueError("Embedding 함수가 벡터를 반환하지 않았습니다.")
 
-        # 단일 상담 검색
-        single_col = client.collections.get("SingleCounsel")
-        single_res = single_col.query.hybrid(
+async def weaviate_candidates(prompt: str, query_vector: list, top_k: int, include_vector: bool):
+    # 단일 상담 / 멀티턴 상담 검색을 동시에 실행
+    # include_vector: 로컬 재정렬(mmr)에서 쓸 후보 벡터도 같이 받음 (임베딩 API 재호출 없음)
+    async def search(name: str, kind: str, prop: str):
+        collection = await weaviate_client.get_collection(name)
+        res = await collection.query.hybrid(
             query=prompt,
             vector=query_vector,
-            alpha=0.5,
+            alpha=RETRIEVAL_ALPHA,
             limit=top_k,
-            return_properties=["output"],
+            return_properties=[prop],
+            include_vector=include_vector,
+            return_metadata=["score"],
         )
+        return [
+            {
+                "type": kind,
+                "content": o.properties.get(prop, ""),
+                "vector": weaviate_vector(o) if include_vector else None,
+                "score": getattr(getattr(o, "metadata", None), "score", None),
+            }
+            for o in res.objects
+        ]
 
-        # 멀티턴 상담 검색
-        multi_coll = client.collections.get("MultiCounsel")
-        multi_res = multi_coll.query.hybrid(
-            query=prompt,
-            vector=query_vector,
-            alpha = 0.5,
-            limit=top_k,
-            return_properties=["counselor"],
-        )
+    single, multi = await asyncio.gather(*(search(*c) for c in RETRIEVAL_COLLECTIONS))
+    return single, multi
+
+def _local_search(prompt: str, query_vector, top_k: int, include_vector: bool):
+    results = []
+    for name, kind, prop in RETRIEVAL_COLLECTIONS:
+        results.append([
+            {
+                "type": kind,
+                "content": hit["properties"].get(prop, ""),
+                "vector": hit["vector"].tolist() if include_vector else None,
+                "score": hit["score"],
+            }
+            for hit in local_retriever.hybrid(name, prompt, query_vector, RETRIEVAL_ALPHA, top_k)
+        ])
+    return results[0], results[1]
+
+async def local_candidates(prompt: str, query_vector, top_k: int, include_vector: bool, reason: str):
+    # 계산은 수 ms지만 이벤트 루프를 막지 않도록 스레드에서 실행
+    start = time.perf_counter()
+    single, multi = await asyncio.to_thread(_local_search, prompt, query_vector, top_k, include_vector)
+    local_retriever.served[reason] += 1
+    print(f"[RETRIEVAL] 로컬 인덱스 검색 ({reason}) {(time.perf_counter() - start) * 1000:.1f}ms")
+    return single, multi
+
+async def hedged_candidates(prompt: str, query_vector: list, top_k: int, include_vector: bool):
+    """
+    Weaviate 먼저 요청하고 RETRIEVAL_HEDGE_MS 안에 응답이 없으면 로컬 인덱스 결과로 응답.
+    (Weaviate 요청은 취소, 평소에는 Weaviate 결과를 그대로 사용)
+    """
+    task = asyncio.create_task(weaviate_candidates(prompt, query_vector, top_k, include_vector))
+    done, _ = await asyncio.wait({task}, timeout=RETRIEVAL_HEDGE_MS / 1000)
+    if not done:
+        task.cancel()
+        return await local_candidates(prompt, query_vector, top_k, include_vector, "hedge")
+    try:
+        return task.result()
+    except Exception as e:
+        # 대기 시간 안에 바로 실패한 경우(연결 거부, gRPC 오류 등)도 weaviate 경로와 같이 로컬 인덱스로 대체
+        print(f"⚠️ Weaviate 검색 실패, 로컬 인덱스로 대체: {e}")
+        return await local_candidates(prompt, query_vector, top_k, include_vector, "weaviate_error")
+
+# 유사 상담내용 검색 (재정렬용 후보: type, content, vector, score)
+# RETRIEVAL_BACKEND: weaviate(기본) / local(항상 로컬 인덱스) / hedged(Weaviate가 늦으면 로컬 인덱스)
+# 로컬 인덱스가 로드되어 있으면 Weaviate / 임베딩 오류 시에도 빈 결과 대신 로컬 검색 결과 사용
+async def retrieve_candidates(query: str, info: dict, top_k: int = 5, include_vector: bool = False):
+    try:
+        prompt = build_retrieval_prompt(query, info)
 
-        # 결과만 텍스트로 추출
-        single_texts = [o.properties.get("output", "") for o in single_res.objects]
-        multi_texts = [o.properties.get("counselor", "") for o in multi_res.objects]
+        try:
+            # 쿼리 임베딩 생성
+            query_vector = await embed(prompt)
 
-        return single_texts or [], multi_texts or []
+            # 뭔가 오류가 터지는데 뭔지 몰라서 찍어보는 것.
+            if query_vector is None or not isinstance(query_vector, list):
+                raise ValueError("Embedding 함수가 벡터를 반환하지 않았습니다.")
+        except Exception as e:
+            if not local_retriever.ready:
+                raise
+            # 임베딩이 안 되면 로컬 BM25 검색만이라도 사용
+            print(f"⚠️ 쿼리 임베딩 실패, 로컬 BM25 검색으로 대체: {e}")
+            single, multi = await local_candidates(prompt, None, top_k, include_vector, "embedding_error")
+            return None, single, multi
+
+        if local_retriever.ready and RETRIEVAL_BACKEND == "local":
+            single, multi = await local_candidates(prompt, query_vector, top_k, include_vector, "local")
+        elif local_retriever.ready and RETRIEVAL_BACKEND == "hedged":
+            single, multi = await hedged_candidates(prompt, query_vector, top_k, include_vector)
+        else:
+            try:
+                single, multi = await weaviate_candidates(prompt, query_vector, top_k, include_vector)
+            except Exception as e:
+                if not local_retriever.ready:
+                    raise
+                print(f"⚠️ Weaviate 검색 실패, 로컬 인덱스로 대체: {e}")
+                single, multi = await local_candidates(prompt, query_vector, top_k, include_vector, "weaviate_error")
+
+        return query_vector, single, multi
 
     except Exception as e:
         print(f"❌ 상담 검색 중 오류: {e}")
-        return [], []
+        return None, [], []
 
-# 관리자 조언 생성 함수
-async def manager_advice(report: str, summary: str, info: dict):
-    single, multi = await retrieve_similar_cases(summary, info)
+async def retrieve_similar_cases(query: str, info: dict, top_k: int = 5):
+    _, single, multi = await retrieve_candidates(query, info, top_k)
+
+    # 결과만 텍스트로 추출
+    return [c["content"] for c in single], [c["content"] for c in multi]
+
+# 조언 생성 전 단계: 1) 유사 상담 검색 -> 2) 리랭크
+async def build_advice_context(summary: str, info: dict) -> str:
+    """
+    검색(retrieve)과 리랭크(rerank) 단계를 실행해서 조언 프롬프트에 넣을 상담 사례 텍스트를 반환.
+    입력이 같으면 결과도 같으므로 요청당 한 번만 실행하고, 조언 생성 재시도에서는 재사용.
+    리랭크 방식은 RERANKER 환경변수로 선택 (llm / mmr / cross_encoder, app/services/reranker.py)
+    """
+    query_vector, single, multi = await retrieve_candidates(summary, info, include_vector=reranker.needs_vectors)
 
     # 리랭크 실행
-    rerank_result = await rerank(summary, single, multi)
-    rerank_data = safe_load_json(rerank_result)
+    start = time.perf_counter()
+    top3 = await reranker.rerank(summary, query_vector, single + multi, top_k=RERANK_TOP_K)
+    await log_retrieval(summary, query_vector, single + multi, top3, (time.perf_counter() - start) * 1000)
 
-    top3 = rerank_data.get("top_k_final", [])
     if not top3:
-        reranked_text = "\n".join(single) if single else "유사 상담 데이터를 찾지 못했습니다."
+        reranked_text = "\n".join(c["content"] for c in single) if single else "유사 상담 데이터를 찾지 못했습니다."
     else:
         # 리랭크 된 애들을 합쳐서 하나의 텍스트로 변환
-        top3 = rerank_data["top_k_final"]
         reranked_text = "\n".join(top3)
-    
+
+    return reranked_text
+
+# 관리자 조언 생성 함수 (3단계: generate)
+async def manager_advice(report: str, summary: str, info: dict, context: str | None = None, temperature: float = 0.6, on_token=None):
+    # 재시도마다 검색/리랭크를 반복하지 않도록 route에서 만든 context를 그대로 사용
+    if context is None:
+        context = await build_advice_context(summary, info)
+    reranked_text = context
+
     prompt = f"""
         당신은 팀장으로서 팀원의 상태를 보고 조언을 제시하는 역할입니다.
         - 팀장만 할 수 있는 조언을 위주로 작성할 것. 개인에게도 추천할 수 있는 방법보다는 관리자 입장에서의 조언을 만들어야 함.
@@ -314,16 +390,12 @@ async def manager_advice(report: str, summary: str, info: dict):
         "model": ADVICE_MODEL,
         "messages": messages,
         "max_tokens": 500,
-        "temperature": 0.6,
+        "temperature": temperature,
     }
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30.0) as cli:
-            response = await cli.post(ADVICE_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            
-        advice = result["choices"][0]["message"]["content"].strip()
+        # on_token이 있으면 stream으로 받아서 조각마다 전달 (SSE 엔드포인트용)
+        advice = await gms_client.complete(ADVICE_URL, headers=headers, json=payload, timeout=30.0, on_token=on_token)
         
         return advice
 
@@ -332,22 +404,13 @@ async def manager_advice(report: str, summary: str, info: dict):
     
 
 
-# 개인용 조언 생성 함수
-async def private_advice(report: str, summary: str, info: dict):
-    single, multi = await retrieve_similar_cases(summary, info=info)
-
-    # 리랭크 실행
-    rerank_result = await rerank(summary, single, multi)
-    rerank_data = safe_load_json(rerank_result)
+# 개인용 조언 생성 함수 (3단계: generate)
+async def private_advice(report: str, summary: str, info: dict, context: str | None = None, temperature: float = 0.6, on_token=None):
+    # 재시도마다 검색/리랭크를 반복하지 않도록 route에서 만든 context를 그대로 사용
+    if context is None:
+        context = await build_advice_context(summary, info)
+    reranked_text = context
 
-    top3 = rerank_data.get("top_k_final", [])
-    if not top3:
-        reranked_text = "\n".join(single) if single else "유사 상담 데이터를 찾지 못했습니다."
-    else:
-        # 리랭크 된 애들을 합쳐서 하나의 텍스트로 변환
-        top3 = rerank_data["top_k_final"]
-        reranked_text = "\n".join(top3)
-    
     prompt = f"""
         당신은 정서적으로 불안정할 수 있는 사람에게 작은 조언을 주는 역할입니다.
         - 존댓말로 조언 작성
@@ -397,23 +460,25 @@ async def private_advice(report: str, summary: str, info: dict):
         "model": ADVICE_MODEL,
         "messages": messages,
         "max_tokens": 500,
-        "temperature": 0.6,
+        "temperature": temperature,
     }
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=20.0) as cli:
-            response = await cli.post(ADVICE_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            
-        advice = result["choices"][0]["message"]["content"].strip()
+        # on_token이 있으면 stream으로 받아서 조각마다 전달 (SSE 엔드포인트용)
+        advice = await gms_client.complete(ADVICE_URL, headers=headers, json=payload, timeout=20.0, on_token=on_token)
         return advice
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GMS 요청 중 오류 발생: {e}")
 
 # 개인용 조언 생성 함수
+# 같은 다이어리 내용이면 GMS 호출 없이 캐시된 조언을 반환
 async def daily_advice(text: str):
+    return await response_cache.get_or_call(
+        "daily_advice", ADVICE_MODEL, DAILY_ADVICE_PROMPT_VERSION, text, lambda: _daily_advice(text)
+    )
+
+async def _daily_advice(text: str):
     prompt = f"""
         당신은 정서적으로 불안정할 수 있는 사람에게 매우 짧은 조언을 주는 역할입니다. 아래의 조건을 참고하세요.
 
@@ -464,10 +529,7 @@ async def daily_advice(text: str):
     }
 
     try:
-        async with httpx.AsyncClient(verify=False, timeout=20.0) as cli:
-            response = await cli.post(ADVICE_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+        result = await gms_client.post(ADVICE_URL, headers=headers, json=payload, timeout=20.0)
             
         advice = result["choices"][0]["message"]["content"].strip()
         return advice
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+# sequential : 생성 -> 평가를 기준 점수를 넘을 때까지 순서대로 반복 (기존 방식)
+# best_of_n  : 후보 N개를 동시에 생성/평가하고, 기준을 넘는 후보가 나오면 나머지는 취소
+ADVICE_SELECTION_MODE = os.getenv("ADVICE_SELECTION_MODE", "sequential").lower()
+ADVICE_MAX_ATTEMPTS = int(os.getenv("ADVICE_MAX_ATTEMPTS", "3"))
+ADVICE_SCORE_THRESHOLD = float(os.getenv("ADVICE_SCORE_THRESHOLD", "0.85"))
+# sequential 모드의 temperature (기존 조언 생성 temperature)
+ADVICE_BASE_TEMPERATURE = float(os.getenv("ADVICE_BASE_TEMPERATURE", "0.6"))
+# best_of_n 모드에서 후보별로 사용할 temperature (후보 수보다 적으면 순환해서 사용)
+ADVICE_CANDIDATE_TEMPERATURES = [
+    float(t) for t in os.getenv("ADVICE_CANDIDATE_TEMPERATURES", "0.6,0.8,0.4").split(",") if t.strip()
+]
+
+
+async def _select_sequential(generate, evaluate, attempts: int, threshold: float, tag: str):
+    best_advice, best_score, best_eval = None, 0, {}
+
+    for attempt in range(attempts):
+        advice = await generate(ADVICE_BASE_TEMPERATURE)
+        final_score, eval_result = await evaluate(advice)
+        print(f"👉 {tag}Attempt {attempt+1} Score: {final_score}")
+
+        # 최고 점수 기록
+        if final_score > best_score:
+            best_score, best_advice, best_eval = final_score, advice, eval_result
+
+        # 기준 통과하면 즉시 종료
+        if final_score >= threshold:
+            break
+
+    return best_advice, best_score, best_eval
+
+
+async def _select_best_of_n(generate, evaluate, candidates: int, threshold: float, tag: str):
+    temperatures = ADVICE_CANDIDATE_TEMPERATURES or [ADVICE_BASE_TEMPERATURE]
+
+    async def run_candidate(temperature: float):
+        advice = await generate(temperature)
+        final_score, eval_result = await evaluate(advice)
+        return advice, final_score, eval_result, temperature
+
+    tasks = [
+        asyncio.create_task(run_candidate(temperatures[i % len(temperatures)]))
+        for i in range(candidates)
+    ]
+    best_advice, best_score, best_eval = None, 0, {}
+    last_error = None
+
+    try:
+        for done in asyncio.as_completed(tasks):
+            try:
+                advice, final_score, eval_result, temperature = await done
+            except Exception as e:
+                # 후보 하나가 실패해도 나머지 후보로 진행
+                last_error = e
+                print(f"⚠️ {tag}조언 후보 생성/평가 실패: {e}")
+                continue
+
+            print(f"👉 {tag}Candidate(temperature={temperature}) Score: {final_score}")
+
+            if best_advice is None or final_score > best_score:
+                best_score, best_advice, best_eval = final_score, advice, eval_result
+
+            # 기준을 넘는 후보가 나오면 남은 후보는 기다리지 않음
+            if final_score >= threshold:
+                break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if best_advice is None and last_error is not None:
+        raise last_error
+
+    return best_advice, best_score, best_eval
+
+
+async def select_advice(generate, evaluate, tag: str = ""):
+    """
+    조언 생성/평가 루프를 실행하고 (최고 점수 조언, 점수, 상세 평가 결과)를 반환.
+    - generate(temperature) -> advice
+    - evaluate(advice) -> (final_score, eval_result)
+    ADVICE_SELECTION_MODE에 따라 순차 재시도 또는 동시 후보 생성(best-of-N)으로 동작.
+    """
+    if ADVICE_SELECTION_MODE == "best_of_n":
+        return await _select_best_of_n(generate, evaluate, ADVICE_MAX_ATTEMPTS, ADVICE_SCORE_THRESHOLD, tag)
+    return await _select_sequential(generate, evaluate, ADVICE_MAX_ATTEMPTS, ADVICE_SCORE_THRESHOLD, tag)
@@ -1,29 +1,12 @@
-<<<<<<< HEAD
-=======
-from model_loader import model, tokenizer
->>>>>>> 1c0419e150ea1f5bf9bf98ccbd8708b2bc14ae22
-from transformers import pipeline
-import torch
-import re
-import emoji
-from soynlp.normalizer import repeat_normalize
-from model_loader import session, tokenizer
+import os
+import hashlib
+import threading
+from model_loader import session, tokenizer, pad_token_id, model_max_length, ONNX_MODEL_VARIANT
 import numpy as np
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
-
-emojis = ''.join(emoji.EMOJI_DATA.keys())
-pattern = re.compile(f'[^ .,?!/@$%~％·∼()\x00-\x7Fㄱ-ㅣ가-힣{emojis}]+')
-url_pattern = re.compile(
-    r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)')
-
-# 문장을 더 깔끔하게 가공하는 함수
-def clean(x):
-    x = pattern.sub(' ', x)
-    x = emoji.replace_emoji(x, replace='') #emoji 삭제
-    x = url_pattern.sub('', x)
-    x = x.strip()
-    x = repeat_normalize(x, num_repeats=2)
-    return x
+from app.core.text_normalizer import clean
+from app.core.inference_executor import InferenceQueueFull
+from app.core.micro_batcher import MicroBatcher, MICRO_BATCH_ENABLED, MICRO_BATCH_WINDOW_MS, MICRO_BATCH_MAX_SIZE
+from app.core.cache import TTLCache, SQLiteStore
 
 # 감정 라벨 매핑
 id2label = {
@@ -37,24 +20,101 @@ id2label = {
 label2id = {v: k for k, v in id2label.items()}
 
 
+# 한 번의 session.run에 넣을 최대 문장 수
+CLASSIFY_BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", "32"))
+# 한 번에 모델에 넣을 최대 토큰 수 (이보다 긴 문장은 여러 구간으로 나눠서 추론)
+CLASSIFY_MAX_LENGTH = min(int(os.getenv("CLASSIFY_MAX_LENGTH", str(model_max_length))), model_max_length)
+# 나눈 구간끼리 겹치는 토큰 수 (구간 경계에서 문맥이 끊기지 않도록)
+CLASSIFY_CHUNK_OVERLAP = int(os.getenv("CLASSIFY_CHUNK_OVERLAP", "32"))
+# 문장 하나당 최대 구간 수 (넘으면 문장 전체에서 고르게 골라서 사용 -> 아무리 길어도 추론 시간이 일정 수준을 넘지 않음)
+CLASSIFY_MAX_CHUNKS = int(os.getenv("CLASSIFY_MAX_CHUNKS", "8"))
+
+# 문장별 감정 확률 캐시 (정규화된 문장 해시 -> float32 6개)
+# 프로세스 내 LRU 개수 / 유지 시간(초)
+EMOTION_CACHE_SIZE = int(os.getenv("EMOTION_CACHE_SIZE", "20000"))
+EMOTION_CACHE_TTL = float(os.getenv("EMOTION_CACHE_TTL", str(7 * 24 * 3600)))
+# 워커끼리 공유하는 SQLite 파일 경로 (비어 있으면 프로세스 내 캐시만 사용)
+EMOTION_CACHE_DB = os.getenv("EMOTION_CACHE_DB", "")
+EMOTION_CACHE_DB_MAX_ROWS = int(os.getenv("EMOTION_CACHE_DB_MAX_ROWS", "1000000"))
+
 # onnx로 바꾸면서 softmax가 풀렸으므로 다시 numpy를 사용해 만들어줌
 def softmax(x):
     x = np.array(x)
-    e_x = np.exp(x - np.max(x))
+    e_x = np.exp(x - np.max(x, axis=-1, keepdims=True))
     return e_x / e_x.sum(axis=-1, keepdims=True)
 
-def predict(text: str):
-    text = clean(text)
+def split_windows(ids: list[int]) -> list[list[int]]:
+    """
+    토큰 id를 최대 CLASSIFY_MAX_LENGTH 길이의 구간으로 나눔.
+    - 구간끼리 CLASSIFY_CHUNK_OVERLAP 만큼 겹치고, 마지막 구간은 문장 끝에 맞춤
+    - 구간이 CLASSIFY_MAX_CHUNKS개를 넘으면 처음 / 끝을 포함해 고르게 골라냄
+    """
+    if len(ids) <= CLASSIFY_MAX_LENGTH:
+        return [ids]
+
+    step = max(1, CLASSIFY_MAX_LENGTH - CLASSIFY_CHUNK_OVERLAP)
+    starts = list(range(0, len(ids) - CLASSIFY_MAX_LENGTH, step)) + [len(ids) - CLASSIFY_MAX_LENGTH]
+    if len(starts) > CLASSIFY_MAX_CHUNKS:
+        picks = np.linspace(0, len(starts) - 1, CLASSIFY_MAX_CHUNKS).round().astype(int)
+        starts = [starts[i] for i in picks]
+    return [ids[s:s + CLASSIFY_MAX_LENGTH] for s in starts]
+
+def predict_batch(texts: list[str]) -> np.ndarray:
+    """
+    여러 문장을 묶어서 한 번에 추론하고 (문장 수, 6) 확률 배열을 반환.
+    - texts는 clean()을 거친 문장이어야 함
+    - 모델 최대 길이보다 긴 문장은 겹치는 구간으로 나누고, 구간별 확률을 토큰 수로 가중 평균
+    - 토큰 길이 순으로 정렬한 뒤 비슷한 길이끼리 묶어(bucket) padding 낭비를 줄임
+    - 묶음마다 session.run은 한 번만 호출 (onnx 변환 시 batch_size, sequence_length가 dynamic axis)
+    - 반환 순서는 입력 순서와 동일
+    """
+    probs = np.zeros((len(texts), len(id2label)), dtype=np.float32)
+    if not texts:
+        return probs
+
+    # 문장 -> 구간 목록 (owners[k]: k번째 구간이 속한 문장 번호)
+    windows, owners = [], []
+    for i, encoding in enumerate(tokenizer.encode_batch(texts)):
+        for window in split_windows(encoding.ids):
+            windows.append(window)
+            owners.append(i)
+
+    window_probs = np.zeros((len(windows), len(id2label)), dtype=np.float32)
+    order = sorted(range(len(windows)), key=lambda k: len(windows[k]))
+    pad_id = pad_token_id or 0
+
+    for start in range(0, len(order), CLASSIFY_BATCH_SIZE):
+        bucket = order[start:start + CLASSIFY_BATCH_SIZE]
+        max_len = max(len(windows[k]) for k in bucket)
+
+        input_ids = np.full((len(bucket), max_len), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(bucket), max_len), dtype=np.int64)
+        for row, k in enumerate(bucket):
+            ids = windows[k]
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+
+        ort_inputs = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask
+        }
 
-    inputs = tokenizer(text, return_tensors="np")
+        logits = session.run(["logits"], ort_inputs)[0]  # (bucket, 6)
+        window_probs[bucket] = softmax(logits)
 
-    ort_inputs = {
-        "input_ids": inputs["input_ids"],
-        "attention_mask": inputs["attention_mask"]
-    }
+    # 구간이 하나뿐인 문장은 그대로, 여러 개면 토큰 수로 가중 평균
+    if len(windows) == len(texts):
+        probs[owners] = window_probs
+        return probs
+
+    weights = np.array([max(1, len(w)) for w in windows], dtype=np.float32)
+    weight_sums = np.zeros(len(texts), dtype=np.float32)
+    np.add.at(probs, owners, window_probs * weights[:, None])
+    np.add.at(weight_sums, owners, weights)
+    return probs / weight_sums[:, None]
 
-    logits = session.run(["logits"], ort_inputs)[0]  # (1, 6)
-    probs = softmax(logits)[0]  # shape: (6,)
+def predict(text: str):
+    probs = predict_batch([clean(text)])[0]  # shape: (6,)
 
     result = {id2label[i]: float(probs[i]) for i in range(6)}
     return result
@@ -69,41 +129,124 @@ emotion_weights = {
     "슬픔": -1.7
 }
 
+# executor 스레드 여러 개가 같이 쓰므로 LRU 접근은 lock으로 보호
+prob_cache = TTLCache(max_size=EMOTION_CACHE_SIZE, ttl=EMOTION_CACHE_TTL)
+prob_cache_lock = threading.Lock()
+prob_store = SQLiteStore(EMOTION_CACHE_DB, "emotion_probs", ttl=EMOTION_CACHE_TTL, max_rows=EMOTION_CACHE_DB_MAX_ROWS) if EMOTION_CACHE_DB else None
+
+# 모델 / 구간 설정이 바뀌면 확률도 달라지므로 key에 같이 넣음
+_CACHE_NAMESPACE = f"{ONNX_MODEL_VARIANT}|{CLASSIFY_MAX_LENGTH}|{CLASSIFY_CHUNK_OVERLAP}|{CLASSIFY_MAX_CHUNKS}\0"
+
+def prob_cache_key(sentence: str) -> bytes:
+    return hashlib.sha256((_CACHE_NAMESPACE + sentence).encode("utf-8")).digest()[:16]
+
+def clean_and_predict(texts: list[str]) -> np.ndarray:
+    """
+    정규화 + 캐시 조회 + 추론. (문장 수, 6) 확률 배열을 반환.
+    - 정규화도 CPU 작업이므로 추론과 함께 executor 스레드에서 처리
+    - 프로세스 내 LRU -> SQLite(설정 시) 순서로 조회하고, 둘 다 없는 문장만 ONNX로 추론
+    - 같은 요청 안에서 반복된 문장도 한 번만 추론
+    """
+    cleaned = [clean(text) for text in texts]
+    keys = [prob_cache_key(sentence) for sentence in cleaned]
+    probs = np.zeros((len(texts), len(id2label)), dtype=np.float32)
+
+    missing = []
+    with prob_cache_lock:
+        for i, key in enumerate(keys):
+            cached = prob_cache.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                probs[i] = cached
+
+    if missing and prob_store is not None:
+        stored = prob_store.get_many(list({keys[i] for i in missing}))
+        still_missing = []
+        with prob_cache_lock:
+            for i in missing:
+                blob = stored.get(keys[i])
+                if blob is None:
+                    still_missing.append(i)
+                    continue
+                probs[i] = np.frombuffer(blob, dtype=np.float32)
+                prob_cache.set(keys[i], probs[i].copy())
+        missing = still_missing
+
+    if missing:
+        # 새로 들어온 / 바뀐 문장만 추론
+        unique = {}
+        for i in missing:
+            unique.setdefault(keys[i], cleaned[i])
+        new_probs = dict(zip(unique, predict_batch(list(unique.values()))))
+
+        for i in missing:
+            probs[i] = new_probs[keys[i]]
+        with prob_cache_lock:
+            for key, value in new_probs.items():
+                prob_cache.set(key, value)
+        if prob_store is not None:
+            prob_store.set_many({key: value.astype(np.float32).tobytes() for key, value in new_probs.items()})
+
+    return probs
+
+# 동시에 들어온 요청들의 문장을 모아서 한 번에 추론
+classify_batcher = MicroBatcher(
+    clean_and_predict,
+    window_ms=MICRO_BATCH_WINDOW_MS,
+    max_size=MICRO_BATCH_MAX_SIZE,
+    enabled=MICRO_BATCH_ENABLED,
+)
+
+def score_probs(probs: np.ndarray) -> dict:
+    """문장별 확률 (문장 수, 6) -> 평균 감정 분포 + 가중치 반영 점수"""
+    # 전체 평균
+    mean_probs = probs.mean(axis=0, dtype=np.float64)
+    all_scores = {id2label[i]: float(mean_probs[i]) for i in range(len(id2label))}
+
+    # 가중치 반영
+    weighted_sum = sum(
+        all_scores[e] * emotion_weights[e] for e in all_scores
+    )
+
+    base_score = 70
+    scale = 30
+    final_score = base_score + (weighted_sum * scale)
+
+    # 0~100 constrain
+    final_score = max(0, min(100, final_score))
+    final_score = round(final_score, 3)
+
+    return {
+        "sentiment": {k: round(v, 5) for k, v in all_scores.items()},
+        "score": final_score,
+        "type": "emotion_score",
+    }
+
 # 들어온 텍스트를 onnx 변환 된 감정 분류 모델로 판정 내림.
 def emotionClassifying(texts: list[str]) -> dict:
     try:
-        all_scores = {label: 0.0 for label in id2label.values()}
-
-        for text in texts:
-            preds = predict(clean(text))  # ← dict 형태
-
-            # preds = {"분노":0.12, "슬픔":0.22 ...} 형태
-            for label, score in preds.items():
-                all_scores[label] += score
-
-        # 전체 평균
-        for k in all_scores:
-            all_scores[k] /= len(texts)
+        if not texts:
+            raise ValueError("분석할 문장이 없습니다.")
 
-        # 가중치 반영
-        weighted_sum = sum(
-            all_scores[e] * emotion_weights[e] for e in all_scores
-        )
+        # 문장마다 정규화는 한 번만 하고, session.run은 묶어서 배치 추론
+        return score_probs(clean_and_predict(texts))
 
-        base_score = 70
-        scale = 30
-        final_score = base_score + (weighted_sum * scale)
+    except Exception as e:
+        print(f'"error": 감정 분석 중 오류 : {str(e)}')
+        return { "sentiment": {}, "score": 60, "type": "error" }
 
-        # 0~100 constrain
-        final_score = max(0, min(100, final_score))
-        final_score = round(final_score, 3)
+# emotionClassifying의 비동기 버전. 다른 요청의 문장과 묶어서(micro-batch) 추론 executor에서 실행
+async def emotionClassifyingBatched(texts: list[str]) -> dict:
+    try:
+        if not texts:
+            raise ValueError("분석할 문장이 없습니다.")
 
-        return {
-            "sentiment": {k: round(v, 5) for k, v in all_scores.items()},
-            "score": final_score,
-            "type": "emotion_score",
-        }
+        return score_probs(await classify_batcher.submit(texts))
 
+    except InferenceQueueFull:
+        # 대기열 초과는 라우터에서 503으로 응답
+        raise
     except Exception as e:
         print(f'"error": 감정 분석 중 오류 : {str(e)}')
-        return { "sentiment": {}, "score": 60, "type": "error" }
\ No newline at end of file
+        return { "sentiment": {}, "score": 60, "type": "error" }
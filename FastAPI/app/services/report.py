@@ -1,13 +1,15 @@
 import os
 import httpx
 from dotenv import load_dotenv
+from app.core import gms_client
 load_dotenv()
 
 GMS_API_KEY = os.getenv("GMS_KEY")
 GMS_URL = os.getenv("SUMMARY_GMS_URL")
 MODEL = os.getenv("REPORT_MODEL")
 
-async def create_report(diary: dict, biodata: dict, total_summary: str) -> str:
+async def create_report(diary: dict, biodata: dict, total_summary: str, on_token=None) -> str:
+    # on_token(delta)을 넘기면 보고서를 stream으로 받아서 조각마다 호출 (SSE 엔드포인트용)
     system_prompt = f"""
         당신은 사용자의 정서 변화와 생체 데이터 패턴을 종합 분석하는 심리·생체 데이터 분석가입니다.
         입력으로는 사용자의 감정 일기 요약(diaries), 생체 데이터(biometrics), 이상 징후(anomalies), 개인 정보(userInfo)가 주어집니다.
@@ -76,12 +78,7 @@ async def create_report(diary: dict, biodata: dict, total_summary: str) -> str:
         "temperature": 0.7,
     }
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30.0) as client:
-            response = await client.post(GMS_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-
-        reason = result["choices"][0]["message"]["content"].strip()
+        reason = await gms_client.complete(GMS_URL, headers=headers, json=payload, timeout=30.0, on_token=on_token)
         return reason
 
     except httpx.HTTPError as e:
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.core.inference_executor import inference_executor
+
+# 검색된 상담 사례 재정렬 방식
+# llm           : GMS(gpt-4.1-nano)에 후보 전체를 보내서 상위 3개를 고르게 함 (기존 방식)
+# mmr           : Weaviate가 돌려준 벡터로 쿼리와의 cosine 유사도 재계산 + MMR로 비슷한 사례 중복 제거 (네트워크 호출 없음)
+# cross_encoder : 로컬 ONNX cross-encoder로 (요약, 사례) 쌍 점수 계산 (RERANK_CROSS_ENCODER_DIR 필요)
+RERANKER = os.getenv("RERANKER", "llm").lower()
+# 최종으로 조언 프롬프트에 넣을 사례 수
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+# MMR 관련도 / 다양성 비율 (1이면 관련도만, 0이면 다양성만)
+RERANK_MMR_LAMBDA = float(os.getenv("RERANK_MMR_LAMBDA", "0.7"))
+# 이미 고른 사례와 cosine 유사도가 이 값 이상이면 같은 사례로 보고 제외
+RERANK_DEDUP_THRESHOLD = float(os.getenv("RERANK_DEDUP_THRESHOLD", "0.95"))
+# cross-encoder 모델 디렉토리 (model.onnx + tokenizer.json)
+RERANK_CROSS_ENCODER_DIR = os.getenv("RERANK_CROSS_ENCODER_DIR", "")
+RERANK_CROSS_ENCODER_MAX_LENGTH = int(os.getenv("RERANK_CROSS_ENCODER_MAX_LENGTH", "512"))
+# 설정하면 검색 후보(벡터 포함) / 재정렬 결과를 jsonl로 기록 (benchmarks/bench_reranker.py 입력)
+RETRIEVAL_LOG_PATH = os.getenv("RETRIEVAL_LOG_PATH", "")
+
+# 후보 형식: {"type": "single" | "multi", "content": 원문, "vector": list | None, "score": hybrid 점수 | None}
+
+
+def dedup_texts(candidates: list) -> list:
+    # 싱글턴 / 멀티턴 검색 결과에 같은 문장이 겹쳐 나오는 경우 첫 번째만 남김
+    seen, unique = set(), []
+    for c in candidates:
+        text = (c.get("content") or "").strip()
+        if text and text not in seen:
+            seen.add(text)
+            unique.append(c)
+    return unique
+
+
+class LLMReranker:
+    """기존 GMS rerank 호출. JSON 파싱에 실패하면 빈 결과를 반환 (build_advice_context가 검색 순서로 대체)"""
+
+    name = "llm"
+    needs_vectors = False
+
+    async def rerank(self, summary: str, query_vector, candidates: list, top_k: int = RERANK_TOP_K) -> list[str]:
+        # advice가 이 모듈을 import 하므로 순환 import를 피하기 위해 호출 시점에 가져옴
+        from app.services.advice import rerank, safe_load_json
+
+        single = [c["content"] for c in candidates if c["type"] == "single"]
+        multi = [c["content"] for c in candidates if c["type"] == "multi"]
+        result = await rerank(summary, single, multi)
+        try:
+            data = safe_load_json(result)
+        except ValueError:
+            return []
+        top = data.get("top_k_final", []) if isinstance(data, dict) else []
+        return [str(t) for t in top if str(t).strip()][:top_k]
+
+
+class EmbeddingMMRReranker:
+    """
+    Weaviate 검색 결과에 포함된 벡터로 쿼리 벡터와의 cosine 유사도를 다시 계산하고 MMR로 선택.
+    - 싱글턴 / 멀티턴 후보를 같은 기준(cosine)으로 합쳐서 정렬
+    - 이미 고른 사례와 너무 비슷한 후보(dedup_threshold 이상)는 제외
+    - 벡터가 없는 후보만 있으면 hybrid 점수 순서를 그대로 사용
+    """
+
+    name = "mmr"
+    needs_vectors = True
+
+    def __init__(self, mmr_lambda: float = RERANK_MMR_LAMBDA, dedup_threshold: float = RERANK_DEDUP_THRESHOLD):
+        self.mmr_lambda = mmr_lambda
+        self.dedup_threshold = dedup_threshold
+
+    @staticmethod
+    def _normalize(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=-1, keepdims=True)
+        return m / np.maximum(norms, 1e-12)
+
+    def select(self, query_vector, candidates: list, top_k: int) -> list[str]:
+        candidates = dedup_texts(candidates)
+        with_vec = [c for c in candidates if c.get("vector")]
+        if query_vector is None or not with_vec:
+            ordered = sorted(candidates, key=lambda c: -(c.get("score") or 0.0))
+            return [c["content"] for c in ordered[:top_k]]
+
+        vectors = self._normalize(np.asarray([c["vector"] for c in with_vec], dtype=np.float32))
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        relevance = vectors @ query
+        similarity = vectors @ vectors.T
+
+        selected: list[int] = []
+        remaining = list(range(len(with_vec)))
+        while remaining and len(selected) < top_k:
+            if selected:
+                redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+            else:
+                redundancy = np.zeros(len(remaining), dtype=np.float32)
+            mmr = self.mmr_lambda * relevance[remaining] - (1 - self.mmr_lambda) * redundancy
+
+            best = int(np.argmax(mmr))
+            index = remaining.pop(best)
+            if selected and redundancy[best] >= self.dedup_threshold:
+                continue
+            selected.append(index)
+
+        return [with_vec[i]["content"] for i in selected]
+
+    async def rerank(self, summary: str, query_vector, candidates: list, top_k: int = RERANK_TOP_K) -> list[str]:
+        # 후보 10개 수준이라 이벤트 루프에서 바로 계산 (수십 µs)
+        return self.select(query_vector, candidates, top_k)
+
+
+class CrossEncoderReranker:
+    """
+    로컬 ONNX cross-encoder로 (요약, 사례) 쌍마다 관련도 점수를 계산.
+    - model_dir에 model.onnx, tokenizer.json 필요 (출력 logits가 1개면 그 값, 2개 이상이면 마지막 class를 관련도로 사용)
+    - 추론은 inference_executor에서 실행 (감정 분석과 같은 스레드 풀 / 대기열 제한)
+    """
+
+    name = "cross_encoder"
+    needs_vectors = False
+
+    def __init__(self, model_dir: str, max_length: int = RERANK_CROSS_ENCODER_MAX_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from model_loader import build_session_options
+
+        if not model_dir:
+            raise ValueError("RERANKER=cross_encoder는 RERANK_CROSS_ENCODER_DIR 설정이 필요합니다.")
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=build_session_options(),
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        pad_token = next((t for t in ("[PAD]", "<pad>") if self.tokenizer.token_to_id(t) is not None), None)
+        self.tokenizer.enable_truncation(max_length=max_length, strategy="longest_first")
+        self.tokenizer.enable_padding(
+            pad_id=self.tokenizer.token_to_id(pad_token) if pad_token else 0,
+            pad_token=pad_token or "[PAD]",
+        )
+
+    def score(self, query: str, texts: list[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch([(query, t) for t in texts])
+        feed = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encoded], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encoded], dtype=np.int64)
+
+        logits = self.session.run(None, feed)[0].astype(np.float32)
+        return logits[:, 0] if logits.shape[-1] == 1 else logits[:, -1]
+
+    async def rerank(self, summary: str, query_vector, candidates: list, top_k: int = RERANK_TOP_K) -> list[str]:
+        candidates = dedup_texts(candidates)
+        if not candidates:
+            return []
+        texts = [c["content"] for c in candidates]
+        scores = await inference_executor.run(self.score, summary, texts)
+        order = np.argsort(-scores)[:top_k]
+        return [texts[i] for i in order]
+
+
+def create_reranker(name: str):
+    if name == "llm":
+        return LLMReranker()
+    if name == "mmr":
+        return EmbeddingMMRReranker()
+    if name == "cross_encoder":
+        return CrossEncoderReranker(RERANK_CROSS_ENCODER_DIR)
+    raise ValueError(f"RERANKER는 llm, mmr, cross_encoder 중 하나여야 합니다: {name}")
+
+
+reranker = create_reranker(RERANKER)
+print(f"[RERANK] 검색 결과 재정렬 방식: {reranker.name}")
+
+
+# ---------------- 검색 로그 ----------------
+
+_log_lock = threading.Lock()
+
+
+def _append_log(record: dict):
+    with _log_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(RETRIEVAL_LOG_PATH)), exist_ok=True)
+        with open(RETRIEVAL_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def log_retrieval(summary: str, query_vector, candidates: list, selected: list[str], latency_ms: float):
+    if not RETRIEVAL_LOG_PATH:
+        return
+    record = {
+        "ts": time.time(),
+        "summary": summary,
+        "query_vector": query_vector,
+        "candidates": candidates,
+        "reranker": reranker.name,
+        "selected": selected,
+        "latency_ms": round(latency_ms, 3),
+    }
+    try:
+        await asyncio.to_thread(_append_log, record)
+    except Exception as e:
+        print(f"⚠️ 검색 로그 기록 실패: {e}")
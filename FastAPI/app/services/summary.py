@@ -1,6 +1,9 @@
 import os
-import httpx
+import asyncio
 from dotenv import load_dotenv
+from app.core import gms_client
+from app.core.response_cache import response_cache
+from app.services.advice import safe_load_json, daily_advice
 from fastapi import HTTPException
 
 load_dotenv()
@@ -10,7 +13,22 @@ SHORT_SUMMARY_MODEL = os.getenv("SHORT_SUMMARY_MODEL")
 LONG_SUMMARY_MODEL = os.getenv("LONG_SUMMARY_MODEL")
 SUMMARY_URL = os.getenv("SUMMARY_GMS_URL")
 
-async def shortSummarize(text:str):
+# 프롬프트를 수정하면 버전을 올려서 캐시에 남아 있는 이전 결과를 무효화
+SHORT_SUMMARY_PROMPT_VERSION = "v1"
+LONG_SUMMARY_PROMPT_VERSION = "v1"
+
+# 같은 다이어리 내용이면 GMS 호출 없이 캐시된 요약을 반환
+async def shortSummarize(text: str):
+    return await response_cache.get_or_call(
+        "short_summary", SHORT_SUMMARY_MODEL, SHORT_SUMMARY_PROMPT_VERSION, text, lambda: _shortSummarize(text)
+    )
+
+async def longSummarize(text: str):
+    return await response_cache.get_or_call(
+        "long_summary", LONG_SUMMARY_MODEL, LONG_SUMMARY_PROMPT_VERSION, text, lambda: _longSummarize(text)
+    )
+
+async def _shortSummarize(text:str):
     prompt = f"""
     아래의 내용이 입력받은 다이어리의 내용입니다.
     해당 내용을 최대 20글자 내로 중요한 내용만 뽑아서 요약해주세요.
@@ -47,10 +65,7 @@ async def shortSummarize(text:str):
     }
     
     try:
-        async with httpx.AsyncClient(verify=False, timeout=30.0) as client:
-            response = await client.post(SUMMARY_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+        result = await gms_client.post(SUMMARY_URL, headers=headers, json=payload, timeout=30.0)
             
         reason = result["choices"][0]["message"]["content"].strip()
         return reason
@@ -60,7 +75,7 @@ async def shortSummarize(text:str):
 
 
 
-async def longSummarize(text):
+async def _longSummarize(text):
     prompt = f"""
     아래의 내용이 입력받은 다이어리의 내용입니다.
     해당 내용을 중요한 내용을 뽑아서 요약해주세요.
@@ -98,13 +113,94 @@ async def longSummarize(text):
     }
     
     try:
-        async with httpx.AsyncClient(verify=False, timeout=20.0) as client:
-            response = await client.post(SUMMARY_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+        result = await gms_client.post(SUMMARY_URL, headers=headers, json=payload, timeout=20.0)
             
         reason = result["choices"][0]["message"]["content"].strip()
         return reason
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"오류 코드는 {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"오류 코드는 {e}")
+
+# ---------------- 요약 + 일간 조언 한 번에 생성 (fused) ----------------
+# separate : 짧은 요약 / 긴 요약 / 일간 조언을 각각 GMS 호출 (기존 방식)
+# fused    : 한 번의 호출로 세 가지를 JSON으로 받고, 실패하면 separate로 다시 처리
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "separate")
+FUSED_SUMMARY_MODEL = os.getenv("FUSED_SUMMARY_MODEL", LONG_SUMMARY_MODEL or "")
+FUSED_SUMMARY_PROMPT_VERSION = "v1"
+FUSED_SUMMARY_KEYS = ("short_summary", "long_summary", "short_advice")
+
+async def summarizeDiary(text: str) -> tuple[str, str, str]:
+    """다이어리 -> (짧은 요약, 긴 요약, 일간 조언)"""
+    if SUMMARY_MODE == "fused":
+        try:
+            result = await response_cache.get_or_call(
+                "fused_summary", FUSED_SUMMARY_MODEL, FUSED_SUMMARY_PROMPT_VERSION, text, lambda: _fusedSummarize(text)
+            )
+            return tuple(result[key] for key in FUSED_SUMMARY_KEYS)
+        except Exception as e:
+            print(f"⚠️ fused 요약 실패, 개별 호출로 전환: {e}")
+
+    return tuple(await asyncio.gather(shortSummarize(text), longSummarize(text), daily_advice(text)))
+
+async def _fusedSummarize(text: str) -> dict:
+    prompt = f"""
+    아래의 내용이 입력받은 다이어리의 내용입니다.
+    다이어리를 읽고 아래 세 가지를 작성해서 JSON 객체 하나로만 답변해주세요. JSON 외의 설명은 쓰지 마세요.
+
+    1. short_summary
+    - 최대 20글자 내로 중요한 내용만 뽑아서 요약
+    - 특별한 사건이 일어났다면 해당 사건과 관련해서 감정적인 요약을 해줘도 좋음
+    - 마지막은 반드시 "~한 날"로 끝날 것
+
+    2. long_summary
+    - 중요한 내용을 뽑아서 요약 (내부적으로 사용하는 요약이므로 불필요한 내용은 없애되, 중요한 내용은 모두 남길 것)
+    - 특별한 사건이 일어났다면 해당 사건과 관련해서 감정적인 요약을 해줘도 좋음
+    - 길이는 상관 없음
+
+    3. short_advice
+    - 정서적으로 불안정할 수 있는 사람에게 주는 매우 짧은 조언, 존댓말로 작성
+    - 불필요한 감정 표현은 피하고, 현실적이고 따뜻하게 조언할 것
+    - 상담 전문가가 아니므로 보다 안전하고 조심스러운 접근 방법을 제시할 것
+    - 공감 한 문장 + 조언 2개, 각 조언 당 50글자를 넘지 않을 것
+
+    [예시]
+    Input : 오늘 버스를 타고 집에 가다가 어떤 사람이 내 발을 밟아서 너무 짜증났어.
+    Response :
+    {{
+        "short_summary": "발을 밟혀 기분이 나쁜 날.",
+        "long_summary": "버스를 타고 집에 가다가 발을 밟혀 짜증이 남.",
+        "short_advice": "오늘 버스에서 발을 밟혀 기분이 좋지 않으시군요. 이렇게 해보는건 어떠신가요?\\n\\n조언 1 : 가볍게 산책하며 머리를 비우기.\\n조언 2 : 따듯하고 맛있는 음식 먹으며 소소한 행복 찾기."
+    }}
+
+    Input : {text}
+    """
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {API_KEY}",
+    }
+
+    messages = [
+            {"role": "system", "content": "당신은 다이어리를 요약하고 짧은 조언을 주는 AI입니다. 반드시 JSON 형식으로, 한국어로 대답해주세요."},
+            {"role": "user", "content": prompt},
+        ]
+
+    payload = {
+        "model": FUSED_SUMMARY_MODEL,
+        "messages": messages,
+        "max_tokens": 2500,
+        "temperature": 0.4,
+    }
+
+    result = await gms_client.post(SUMMARY_URL, headers=headers, json=payload, timeout=30.0)
+    content = result["choices"][0]["message"]["content"]
+    parsed = safe_load_json(content)
+
+    # 세 항목이 모두 비어 있지 않은 문자열이어야 사용 (아니면 예외 -> 개별 호출로 전환)
+    if not isinstance(parsed, dict):
+        raise ValueError("fused 요약 응답이 JSON 객체가 아닙니다.")
+    missing = [key for key in FUSED_SUMMARY_KEYS if not isinstance(parsed.get(key), str) or not parsed[key].strip()]
+    if missing:
+        raise ValueError(f"fused 요약 응답에 빠진 항목: {missing}")
+
+    return {key: parsed[key].strip() for key in FUSED_SUMMARY_KEYS}
@@ -0,0 +1,95 @@
+import asyncio
+from app.services.report import create_report
+from app.services.advice import build_advice_context
+from app.services.advice import manager_advice as generate_manager_advice
+from app.services.advice import private_advice as generate_private_advice
+from app.services.advice_selection import select_advice, ADVICE_SCORE_THRESHOLD
+from app.core.vector_embedding import embed
+from app.core import weaviate_client
+from RAGAS_eval.ragas import AdviceQualityEvaluator
+
+# 주간 보고서 + 조언 생성 파이프라인
+# 동기 엔드포인트(/manager/advice, /individual-users/report)와 job queue 워커가 같이 사용
+
+
+async def store_counsel_case(total_summary: str, advice: str, score: float, eval_result=None):
+    """평가 점수가 기준 이상인 조언만 Weaviate에 저장(upsert)해서 다음 검색에 활용"""
+    if score < ADVICE_SCORE_THRESHOLD:
+        print(f"평가 점수가 낮아 Weaviate에 저장은 하지 않음. 점수 : {score}")
+        return None
+
+    data_object = {
+        "input": total_summary,
+        "output": advice,
+        "content_hash": weaviate_client.content_hash(total_summary, advice),
+    }
+    # 저장 벡터는 input(요약)만 임베딩 (적재 데이터의 input 벡터와 같은 기준)
+    # 검색 쿼리 벡터는 요약 + 사용자 정보 프롬프트라서 텍스트가 달라 임베딩 캐시로 합쳐지지 않음 (의도된 차이)
+    embedding_advice = await embed(total_summary)
+    # 같은 요약(input)은 적재 스크립트와 같은 id -> 재시도 / 재제출로 비슷한 객체가 쌓이지 않고 최신 조언으로 교체
+    uuid = await weaviate_client.upsert(
+        "SingleCounsel",
+        properties=data_object,
+        vector=embedding_advice,
+        object_id=weaviate_client.content_uuid("SingleCounsel", total_summary),
+    )
+
+    print(f"벡터 DB에 새로운 상담 데이터 저장. UUID : {uuid}, 백터는 : {embedding_advice[:5]}")
+    if eval_result is not None:
+        print(f"평가 점수는 : {score}, 평가된 조언은 : {advice}, 상세 점수는 : {eval_result}")
+    return uuid
+
+
+async def weekly_report_and_advice(data, generate_advice, tag: str = "") -> dict:
+    """
+    data: ManageAdviceInput / PersonalAdviceInput
+    1) 보고서 생성 + 유사 상담 검색/리랭크 (서로 독립적이므로 동시에 실행)
+    2) 조언 생성 + 평가 (순차 재시도 또는 best-of-N, 검색/리랭크 결과는 후보 간 재사용)
+    3) 기준 점수 이상이면 Weaviate에 저장
+    """
+    total_summary = data.total_summary
+    user_info = data.user_info
+
+    report, context = await asyncio.gather(
+        create_report(
+            diary=data.diaries,
+            biodata=data.biometrics,
+            total_summary=total_summary
+        ),
+        build_advice_context(total_summary, user_info),
+    )
+
+    evaluator = AdviceQualityEvaluator()
+
+    async def generate(temperature: float):
+        return await generate_advice(
+            report=report, summary=total_summary, info=user_info, context=context, temperature=temperature
+        )
+
+    async def evaluate(advice: str):
+        # 평가
+        eval_result = await evaluator.evaluate(
+            summary=total_summary,
+            report=report,
+            advice=advice
+        )
+        return evaluator.calc_final_score(eval_result), eval_result
+
+    best_advice, best_score, eval_result = await select_advice(generate, evaluate, tag=tag)
+
+    # 최종 조언을 Weaviate에 집어넣어서 나중에 쓸 수 있도록.
+    await store_counsel_case(total_summary, best_advice, best_score, eval_result)
+
+    return {
+        "user_id": data.user_id,
+        "report": report,
+        "advice": best_advice,
+    }
+
+
+async def manager_weekly_advice(data) -> dict:
+    return await weekly_report_and_advice(data, generate_manager_advice)
+
+
+async def personal_weekly_advice(data) -> dict:
+    return await weekly_report_and_advice(data, generate_private_advice, tag="[IND] ")
@@ -0,0 +1,100 @@
+"""
+감정 분석 서빙 경로의 콜드 스타트 시간 / 메모리(RSS) 측정.
+
+- lean   : 현재 서빙 경로 (onnxruntime + tokenizers만 로드)
+- legacy : 예전 서빙 경로처럼 torch / transformers를 먼저 import 하고 AutoTokenizer를 로드한 뒤 같은 세션을 사용
+
+모드마다 새 프로세스를 --repeat번 띄워서 중앙값을 출력.
+- process_s : 프로세스 시작부터 warm-up 추론이 끝날 때까지 (인터프리터 기동 포함)
+- import_s  : 모델 / 토크나이저 로드까지
+- warmup_s  : 첫 추론(predict_batch) 시간
+- rss_mb    : warm-up 후 RSS / peak_rss_mb : 최대 RSS
+
+실행 (FastAPI 디렉토리에서):
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --modes lean --repeat 10
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def child(mode: str):
+    start = time.perf_counter()
+    if mode == "legacy":
+        import torch  # noqa: F401
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline  # noqa: F401
+        AutoTokenizer.from_pretrained(os.path.join(FASTAPI_DIR, "Classifier_Model"))
+
+    from app.core.text_normalizer import clean
+    from app.services.emotion_classify import predict_batch
+    import_s = time.perf_counter() - start
+
+    t = time.perf_counter()
+    predict_batch([clean("오늘 해가 나와서 기분 좋아.")])
+    warmup_s = time.perf_counter() - t
+
+    print(json.dumps({
+        "import_s": import_s,
+        "warmup_s": warmup_s,
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "torch_loaded": "torch" in sys.modules,
+        "transformers_loaded": "transformers" in sys.modules,
+    }))
+
+
+def measure(mode: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", mode],
+            cwd=FASTAPI_DIR, capture_output=True, text=True,
+        )
+        process_s = time.perf_counter() - start
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            return {"mode": mode, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "unknown"}
+        runs.append({**json.loads(lines[-1]), "process_s": process_s})
+
+    result = {"mode": mode, "torch_loaded": runs[0]["torch_loaded"], "transformers_loaded": runs[0]["transformers_loaded"]}
+    for key in ["process_s", "import_s", "warmup_s", "rss_mb", "peak_rss_mb"]:
+        result[key] = round(statistics.median(r[key] for r in runs), 3)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", choices=["lean", "legacy"], help=argparse.SUPPRESS)
+    parser.add_argument("--modes", default="legacy,lean")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child)
+        sys.exit(0)
+
+    for mode in args.modes.split(","):
+        result = measure(mode, args.repeat)
+        if "error" in result:
+            print(f"{mode:>7}: 측정 실패 ({result['error']})")
+            continue
+        print(f"{mode:>7}: process {result['process_s']}s / import {result['import_s']}s / warm-up {result['warmup_s']}s / "
+              f"RSS {result['rss_mb']:.0f}MB (peak {result['peak_rss_mb']:.0f}MB) / "
+              f"torch {result['torch_loaded']}, transformers {result['transformers_loaded']}")
@@ -0,0 +1,123 @@
+"""
+검색 결과 재정렬(rerank) 방식별 지연시간 / 선택 결과 비교.
+
+입력은 RETRIEVAL_LOG_PATH로 기록한 검색 로그 (jsonl, 한 줄에 요청 하나):
+    {"summary": ..., "query_vector": [...], "candidates": [{"type", "content", "vector", "score"}, ...], "selected": [...]}
+mmr은 후보 벡터가 필요하므로 RERANKER=mmr (include_vector) 상태에서 쌓은 로그를 사용.
+사람이 고른 정답이 있으면 "relevant": ["상담 원문", ...] 필드를 추가 (precision / recall 계산).
+
+- p50_ms / p95_ms : 요청 하나 재정렬 시간
+- agreement@k     : 기준(--reference) 결과와 겹치는 비율 (기준이 고른 사례 중 몇 개를 같이 골랐는지)
+- precision@k / recall@k : relevant 라벨이 있는 요청만
+- empty           : 결과가 비어서 검색 순서로 대체된 요청 수 (LLM JSON 파싱 실패 등)
+- pairwise_dup    : 고른 사례끼리 평균 cosine 유사도 (낮을수록 중복이 적음, 벡터가 있는 경우만)
+
+실행 (FastAPI 디렉토리에서):
+    python -m benchmarks.bench_reranker --log data/retrieval_log.jsonl --rerankers mmr,llm
+    RERANK_CROSS_ENCODER_DIR=onnx/cross_encoder python -m benchmarks.bench_reranker --log data/retrieval_log.jsonl \\
+        --rerankers mmr,cross_encoder,llm --reference llm --output rerank_report.json
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from app.services.reranker import create_reranker, RERANK_TOP_K
+
+
+def load_log(path: str, limit: int) -> list[dict]:
+    cases = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                cases.append(json.loads(line))
+            if limit and len(cases) >= limit:
+                break
+    return cases
+
+
+def pairwise_dup(selected: list[str], candidates: list[dict]) -> float | None:
+    vectors = {c["content"]: c.get("vector") for c in candidates}
+    rows = [vectors.get(t) for t in selected]
+    if len(rows) < 2 or any(r is None for r in rows):
+        return None
+    m = np.asarray(rows, dtype=np.float32)
+    m /= np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+    sim = m @ m.T
+    return float(sim[np.triu_indices(len(rows), k=1)].mean())
+
+
+async def run_reranker(name: str, cases: list[dict], top_k: int) -> dict:
+    reranker = create_reranker(name)
+    outputs, latencies = [], []
+    for case in cases:
+        start = time.perf_counter()
+        try:
+            selected = await reranker.rerank(case["summary"], case.get("query_vector"), case["candidates"], top_k=top_k)
+        except Exception as e:
+            print(f"⚠️ {name} 실패: {e}")
+            selected = []
+        latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(selected)
+    return {"outputs": outputs, "latencies": latencies}
+
+
+def summarize(name: str, run: dict, cases: list[dict], reference: list[list[str]] | None, top_k: int) -> dict:
+    outputs, latencies = run["outputs"], run["latencies"]
+    row = {
+        "reranker": name,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "empty": sum(1 for o in outputs if not o),
+    }
+
+    if reference is not None:
+        scores = [len(set(o) & set(ref)) / len(ref) for o, ref in zip(outputs, reference) if ref]
+        row[f"agreement@{top_k}"] = round(float(np.mean(scores)), 4) if scores else None
+
+    labelled = [(o, case["relevant"]) for o, case in zip(outputs, cases) if case.get("relevant")]
+    if labelled:
+        row[f"precision@{top_k}"] = round(float(np.mean([len(set(o) & set(rel)) / top_k for o, rel in labelled])), 4)
+        row[f"recall@{top_k}"] = round(float(np.mean([len(set(o) & set(rel)) / len(rel) for o, rel in labelled])), 4)
+
+    dups = [d for d in (pairwise_dup(o, case["candidates"]) for o, case in zip(outputs, cases)) if d is not None]
+    row["pairwise_dup"] = round(float(np.mean(dups)), 4) if dups else None
+    return row
+
+
+async def main(args):
+    cases = load_log(args.log, args.limit)
+    print(f"요청 {len(cases)}개, 후보 평균 {np.mean([len(c['candidates']) for c in cases]):.1f}개")
+
+    names = args.rerankers.split(",")
+    runs = {name: await run_reranker(name, cases, args.top_k) for name in names}
+
+    # 기준: 다른 재정렬 방식 이름 또는 로그에 기록된 실제 선택(selected)
+    if args.reference == "selected":
+        reference = [case.get("selected", []) for case in cases]
+    elif args.reference in runs:
+        reference = runs[args.reference]["outputs"]
+    else:
+        reference = None
+
+    rows = [summarize(name, runs[name], cases, reference, args.top_k) for name in names]
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"log": args.log, "num_cases": len(cases), "reference": args.reference, "results": rows},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log", required=True, help="RETRIEVAL_LOG_PATH로 기록한 검색 로그 (jsonl)")
+    parser.add_argument("--rerankers", default="mmr,llm", help="비교할 방식 (llm, mmr, cross_encoder)")
+    parser.add_argument("--reference", default="selected", help="agreement 기준: selected(로그 기록) 또는 방식 이름")
+    parser.add_argument("--top-k", type=int, default=RERANK_TOP_K)
+    parser.add_argument("--limit", type=int, default=0, help="앞에서부터 사용할 요청 수 (0이면 전체)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,131 @@
+"""
+ONNX Runtime 세션 설정(model_loader의 ORT_* 환경변수)별 감정 분석 추론 성능 비교.
+
+설정 조합마다 자식 프로세스를 --processes개 동시에 띄워서 (= uvicorn 워커 수) 측정.
+model_loader는 import 시점에 환경변수를 읽어 세션을 만들기 때문에 조합마다 새 프로세스가 필요함.
+
+- load_s         : model_loader import(세션 생성)까지 걸린 시간 (프로세스 중 최대값)
+- single_p50/p95 : 문장 1개 predict_batch 지연시간 (ms, 프로세스 평균)
+- batch_sps      : CLASSIFY_BATCH_SIZE 단위 배치 추론 처리량 (문장/초, 프로세스 합계)
+
+실행 (FastAPI 디렉토리에서):
+    python -m benchmarks.bench_session_options
+    python -m benchmarks.bench_session_options --processes 4 \\
+        --grid ORT_INTRA_OP_THREADS=1,2,4 ORT_EXECUTION_MODE=sequential,parallel ORT_ALLOW_SPINNING=true,false
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "normalizer_golden.jsonl")
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_GRID = [
+    "ORT_INTRA_OP_THREADS=1,2,4",
+    "ORT_EXECUTION_MODE=sequential,parallel",
+    "ORT_GRAPH_OPT_LEVEL=basic,all",
+]
+
+
+def child(repeat: int, rounds: int):
+    start = time.perf_counter()
+    import model_loader
+    load_s = time.perf_counter() - start
+
+    from app.core.text_normalizer import clean
+    from app.services.emotion_classify import predict_batch
+
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        texts = [clean(json.loads(line)["input"]) for line in f if line.strip()]
+    texts = [t for t in texts if t]
+
+    predict_batch(texts)  # warm-up
+
+    single = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        predict_batch([texts[i % len(texts)]])
+        single.append((time.perf_counter() - t) * 1000)
+
+    batch = texts * rounds
+    t = time.perf_counter()
+    predict_batch(batch)
+    batch_sec = time.perf_counter() - t
+
+    print(json.dumps({
+        "session_config": model_loader.session_config,
+        "load_s": load_s,
+        "single_p50_ms": float(np.percentile(single, 50)),
+        "single_p95_ms": float(np.percentile(single, 95)),
+        "batch_sps": len(batch) / batch_sec,
+    }))
+
+
+def run_config(env_overrides: dict, processes: int, repeat: int, rounds: int) -> dict:
+    env = {**os.environ, **env_overrides, "WEB_CONCURRENCY": str(processes)}
+    cmd = [sys.executable, "-m", "benchmarks.bench_session_options", "--child", "--repeat", str(repeat), "--rounds", str(rounds)]
+    procs = [
+        subprocess.Popen(cmd, cwd=FASTAPI_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        for _ in range(processes)
+    ]
+
+    results = []
+    for p in procs:
+        out, _ = p.communicate()
+        lines = [line for line in out.splitlines() if line.startswith("{")]
+        if p.returncode != 0 or not lines:
+            raise RuntimeError(f"측정 실패 ({env_overrides}): {out[-500:]}")
+        results.append(json.loads(lines[-1]))
+
+    return {
+        "config": env_overrides,
+        "session_config": results[0]["session_config"],
+        "load_s": round(max(r["load_s"] for r in results), 3),
+        "single_p50_ms": round(float(np.mean([r["single_p50_ms"] for r in results])), 3),
+        "single_p95_ms": round(float(np.mean([r["single_p95_ms"] for r in results])), 3),
+        "batch_sps": round(sum(r["batch_sps"] for r in results), 1),
+    }
+
+
+def parse_grid(items: list[str]) -> list[dict]:
+    keys, values = [], []
+    for item in items:
+        key, _, vals = item.partition("=")
+        keys.append(key)
+        values.append(vals.split(","))
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--grid", nargs="*", default=DEFAULT_GRID, help="ENV=값1,값2 형태, 조합 전체를 측정")
+    parser.add_argument("--processes", type=int, default=1, help="동시에 띄울 프로세스 수 (uvicorn 워커 수)")
+    parser.add_argument("--repeat", type=int, default=200, help="문장 1개 추론 반복 횟수")
+    parser.add_argument("--rounds", type=int, default=20, help="배치 추론에 쓸 샘플 문장 반복 횟수")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.repeat, args.rounds)
+        sys.exit(0)
+
+    rows = []
+    for overrides in parse_grid(args.grid):
+        row = run_config(overrides, args.processes, args.repeat, args.rounds)
+        rows.append(row)
+        print(f"{json.dumps(row['config']):<90} load {row['load_s']:>7}s  "
+              f"p50 {row['single_p50_ms']:>8}ms  p95 {row['single_p95_ms']:>8}ms  batch {row['batch_sps']:>9}/s")
+
+    best = max(rows, key=lambda r: r["batch_sps"])
+    print(f"\n🏆 처리량 최고: {best['config']} ({best['batch_sps']}/s)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"processes": args.processes, "results": rows}, f, ensure_ascii=False, indent=2)
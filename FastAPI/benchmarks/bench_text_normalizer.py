@@ -0,0 +1,112 @@
+"""
+text_normalizer.clean 검증 + 마이크로벤치마크.
+
+- golden set(benchmarks/data/normalizer_golden.jsonl)의 기대 출력과 새 clean()의 출력이 완전히 같은지 확인
+- 무작위로 섞은 문장(fuzz)에서 기존 파이프라인과 새 clean()의 출력이 같은지 확인
+- 같은 문장 묶음에 대해 기존 clean() 1회 / 기존 파이프라인(clean 2회) / 새 clean()의 처리 시간을 비교
+
+기존 파이프라인은 emotionClassifying에서 clean -> predict에서 다시 clean, 즉 문장마다 clean을 두 번 적용했음.
+
+실행 (FastAPI 디렉토리에서):
+    python -m benchmarks.bench_text_normalizer
+    python -m benchmarks.bench_text_normalizer --update-golden   # 기존 파이프라인 기준으로 golden 재생성
+"""
+import argparse
+import json
+import os
+import random
+import re
+import timeit
+
+import emoji
+from soynlp.normalizer import repeat_normalize
+
+from app.core.text_normalizer import clean
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "normalizer_golden.jsonl")
+
+# 기존 emotion_classify.clean (비교 기준)
+emojis = ''.join(emoji.EMOJI_DATA.keys())
+legacy_pattern = re.compile(f'[^ .,?!/@$%~％·∼()\x00-\x7Fㄱ-ㅣ가-힣{emojis}]+')
+legacy_url_pattern = re.compile(
+    r'https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*)')
+
+
+def legacy_clean(x):
+    x = legacy_pattern.sub(' ', x)
+    x = emoji.replace_emoji(x, replace='') #emoji 삭제
+    x = legacy_url_pattern.sub('', x)
+    x = x.strip()
+    x = repeat_normalize(x, num_repeats=2)
+    return x
+
+
+def legacy_pipeline(x):
+    # emotionClassifying: predict(clean(text)) -> predict: text = clean(text)
+    return legacy_clean(legacy_clean(x))
+
+
+def load_golden():
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def fuzz_cases(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    pool = (
+        list("오늘 회사에서 너무 힘들었다 그래도 괜찮아") + list("ㅋㅋㅋㅋㅠㅠㅠㅎㅎ") + list("abcXYZ 0123 #*.,?!/@$%~()")
+        + list("％·∼…「」♥★☆→") + list("日本語漢字") + ["‍", "️", "⃣", "\t", "\n", "  "]
+        + rng.sample(list(emoji.EMOJI_DATA.keys()), 200)
+        + ["https://example.com/a?b=1", "http://www.naver.com", "1️⃣", "👨‍👩‍👧"]
+    )
+    return ["".join(rng.choice(pool) for _ in range(rng.randint(1, 40))) for _ in range(n)]
+
+
+def check_golden() -> int:
+    failures = 0
+    for case in load_golden():
+        out = clean(case["input"])
+        if out != case["expected"]:
+            failures += 1
+            print(f"❌ golden 불일치: {case['input']!r} -> {out!r} (기대값 {case['expected']!r})")
+    return failures
+
+
+def check_fuzz(n: int) -> int:
+    failures = 0
+    for text in fuzz_cases(n):
+        if clean(text) != legacy_pipeline(text):
+            failures += 1
+            print(f"❌ fuzz 불일치: {text!r} -> {clean(text)!r} / 기존 {legacy_pipeline(text)!r}")
+    return failures
+
+
+def bench(number: int):
+    texts = [case["input"] for case in load_golden()]
+    for name, fn in [("legacy_clean", legacy_clean), ("legacy_pipeline", legacy_pipeline), ("clean", clean)]:
+        sec = timeit.timeit(lambda: [fn(t) for t in texts], number=number)
+        per_sentence = sec / (number * len(texts)) * 1e6
+        print(f"{name:>15}: {per_sentence:8.2f} µs/문장 ({len(texts)}문장 x {number}회)")
+
+
+def update_golden():
+    cases = [case["input"] for case in load_golden()]
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        for text in cases:
+            f.write(json.dumps({"input": text, "expected": legacy_pipeline(text)}, ensure_ascii=False) + "\n")
+    print(f"golden {len(cases)}건 갱신: {GOLDEN_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update-golden", action="store_true")
+    parser.add_argument("--fuzz", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden()
+    else:
+        failures = check_golden() + check_fuzz(args.fuzz)
+        print("✅ 출력 동일" if failures == 0 else f"❌ 불일치 {failures}건")
+        bench(args.number)
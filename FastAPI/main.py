@@ -1,28 +1,42 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import route
-from model_loader import model, tokenizer
+from app.core.inference_executor import inference_executor
+from app.core import gms_client
+from app.core import weaviate_client
+from app.core.job_queue import job_queue
+from app.core.local_retriever import local_retriever
+from RAGAS_eval.metric_sink import metric_sink
+from app.services.emotion_classify import predict_batch
+from app.core.text_normalizer import clean
 from contextlib import asynccontextmanager
-import torch
+import asyncio
 import os
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # 감정 분석 추론용 스레드 풀
+    inference_executor.start()
+    # GMS 호출 공용 커넥션 풀 (HTTP/2, keep-alive)
+    await gms_client.init_client()
+    # 평가 결과 MLflow 백그라운드 기록
+    await metric_sink.start()
+    # Weaviate 비동기 클라이언트 (연결 유지 + 헬스 체크)
+    await weaviate_client.init_client()
+    # 유사 상담 로컬 검색 인덱스 (LOCAL_RETRIEVER_STORE 스냅샷, Weaviate 장애 / 지연 시 대체 경로)
+    try:
+        await asyncio.to_thread(local_retriever.load)
+    except Exception as e:
+        print(f"❌ 로컬 검색 인덱스 로드 실패 (Weaviate만 사용): {e}")
+    # 주간 보고서 / 조언 비동기 작업 워커 (이전에 끝나지 않은 작업도 이어서 처리)
+    await job_queue.start()
+
     try:
         print("🚀 서버 시작 중… 모델 Warm-up 중입니다.")
-        
-        # 토크나이저 입력 준비
-        inputs = tokenizer("오늘 해가 나와서 기분 좋아.", return_tensors="pt")
-        
-        # 디바이스 설정 및 이동
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        model.to(device)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        # gradient 비활성화 후 모델 실행
-        model.eval()
-        with torch.no_grad():
-            _ = model(**inputs)
+
+        # 서빙과 같은 경로(토크나이저 -> ONNX 세션)로 한 번 추론해서 세션 초기화 비용을 미리 치름
+        # 길이가 다른 문장을 묶어서 padding이 들어간 배치까지 한 번 거치게 함
+        predict_batch([clean("오늘 해가 나와서 기분 좋아."), clean("오늘 회사에서 너무 힘들었는데 그래도 집에 와서 쉬니까 좀 괜찮아졌다.")])
         
         print("✅ 모델 로드 및 Warm-up 완료")
 
@@ -33,11 +47,12 @@ async def lifespan(app: FastAPI):
     yield
 
     # 서버 종료 시 리소스 정리
-    try:
-        torch.cuda.empty_cache()
-        print("🛑 서버 종료 중… GPU 캐시 정리 완료.")
-    except Exception as e:
-        print(f"⚠️ 종료 중 문제 발생: {e}")
+    await job_queue.stop()
+    inference_executor.shutdown()
+    await gms_client.close_client()
+    await metric_sink.stop()
+    await weaviate_client.close_client()
+    print("🛑 서버 종료 중… 리소스 정리 완료.")
 
 
 app = FastAPI(lifespan=lifespan, title="AI Server")
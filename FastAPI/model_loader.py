@@ -1,23 +1,129 @@
-from transformers import (
-    AutoTokenizer,
-)
-import torch
 import os
+import json
 import onnxruntime as ort
+from tokenizers import Tokenizer
+from app.core.onnx_variants import ONNX_VARIANTS, variant_path
 
 print("[ONNX MODEL LOADER] 모델 로드 중...")
 
-onnx_model_path = os.path.join(os.path.dirname(__file__), "onnx", "model.onnx")
-tokenizer_path = os.path.join(os.path.dirname(__file__), "Classifier_Model")
-Device = "cuda" if torch.cuda.is_available() else "cpu"
+# 서빙할 모델 변형 선택 (Classifier_Model/build_variants.py로 생성, 변형 목록은 app.core.onnx_variants)
+ONNX_MODEL_VARIANT = os.getenv("ONNX_MODEL_VARIANT", "fp")
+if ONNX_MODEL_VARIANT not in ONNX_VARIANTS:
+    raise ValueError(f"ONNX_MODEL_VARIANT는 {list(ONNX_VARIANTS)} 중 하나여야 합니다: {ONNX_MODEL_VARIANT}")
 
-session = ort.InferenceSession(
-    onnx_model_path,
-    providers=["CPUExecutionProvider"]
-)
-tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+onnx_model_path = variant_path(ONNX_MODEL_VARIANT)
+tokenizer_path = os.path.join(os.path.dirname(__file__), "Classifier_Model", "tokenizer.json")
+
+# ---------------- ONNX Runtime 세션 설정 ----------------
+# uvicorn 워커가 여러 개면 워커마다 세션이 하나씩 생기므로, 기본값은 코어를 워커 수로 나눠서 사용
+UVICORN_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+# 연산 하나(MatMul 등)를 나눠서 처리하는 스레드 수
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // UVICORN_WORKERS))))
+# 서로 독립적인 노드를 동시에 실행하는 스레드 수 (parallel 모드에서만 사용)
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+# sequential / parallel (encoder 모델은 노드가 거의 직렬이라 sequential이 기본)
+ORT_EXECUTION_MODE = os.getenv("ORT_EXECUTION_MODE", "sequential")
+# disable / basic / extended / all
+ORT_GRAPH_OPT_LEVEL = os.getenv("ORT_GRAPH_OPT_LEVEL", "all")
+# 최적화된 그래프를 저장해 두고 다음 기동부터 재사용할 디렉토리 (비어 있으면 사용 안 함)
+ORT_OPTIMIZED_MODEL_DIR = os.getenv("ORT_OPTIMIZED_MODEL_DIR", "")
+# 메모리 arena / 메모리 패턴 재사용 (입력 길이가 매번 달라도 켜두는 편이 할당이 적음)
+ORT_ENABLE_CPU_MEM_ARENA = os.getenv("ORT_ENABLE_CPU_MEM_ARENA", "true").lower() == "true"
+ORT_ENABLE_MEM_PATTERN = os.getenv("ORT_ENABLE_MEM_PATTERN", "true").lower() == "true"
+# 작업이 없을 때 intra-op 스레드가 busy-wait 할지
+# 기본값: uvicorn 워커가 하나일 때만 true (여러 워커가 코어를 나눠 쓰면 쉬는 동안에도 CPU를 태우므로 false)
+ORT_ALLOW_SPINNING = os.getenv("ORT_ALLOW_SPINNING", "true" if UVICORN_WORKERS == 1 else "false").lower() == "true"
+# intra-op 스레드 코어 고정 (ex. "1,2;3,4" -> 스레드 1은 1,2번 코어, 스레드 2는 3,4번 코어. 비어 있으면 OS에 맡김)
+ORT_INTRA_OP_THREAD_AFFINITIES = os.getenv("ORT_INTRA_OP_THREAD_AFFINITIES", "")
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+GRAPH_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+if ORT_EXECUTION_MODE not in EXECUTION_MODES:
+    raise ValueError(f"ORT_EXECUTION_MODE는 {list(EXECUTION_MODES)} 중 하나여야 합니다: {ORT_EXECUTION_MODE}")
+if ORT_GRAPH_OPT_LEVEL not in GRAPH_OPT_LEVELS:
+    raise ValueError(f"ORT_GRAPH_OPT_LEVEL은 {list(GRAPH_OPT_LEVELS)} 중 하나여야 합니다: {ORT_GRAPH_OPT_LEVEL}")
+
+# 로그 / 벤치마크에서 확인할 수 있도록 실제 적용된 설정을 남겨둠
+session_config = {
+    "variant": ONNX_MODEL_VARIANT,
+    "intra_op_threads": ORT_INTRA_OP_THREADS,
+    "inter_op_threads": ORT_INTER_OP_THREADS,
+    "execution_mode": ORT_EXECUTION_MODE,
+    "graph_opt_level": ORT_GRAPH_OPT_LEVEL,
+    "optimized_model_dir": ORT_OPTIMIZED_MODEL_DIR,
+    "cpu_mem_arena": ORT_ENABLE_CPU_MEM_ARENA,
+    "mem_pattern": ORT_ENABLE_MEM_PATTERN,
+    "allow_spinning": ORT_ALLOW_SPINNING,
+    "intra_op_thread_affinities": ORT_INTRA_OP_THREAD_AFFINITIES,
+}
+
+
+def build_session_options(graph_opt_level: str = ORT_GRAPH_OPT_LEVEL, optimized_model_path: str = "") -> ort.SessionOptions:
+    sess_options = ort.SessionOptions()
+    sess_options.intra_op_num_threads = ORT_INTRA_OP_THREADS
+    sess_options.inter_op_num_threads = ORT_INTER_OP_THREADS
+    sess_options.execution_mode = EXECUTION_MODES[ORT_EXECUTION_MODE]
+    sess_options.graph_optimization_level = GRAPH_OPT_LEVELS[graph_opt_level]
+    sess_options.enable_cpu_mem_arena = ORT_ENABLE_CPU_MEM_ARENA
+    sess_options.enable_mem_pattern = ORT_ENABLE_MEM_PATTERN
+    sess_options.add_session_config_entry("session.intra_op.allow_spinning", "1" if ORT_ALLOW_SPINNING else "0")
+    if ORT_INTRA_OP_THREAD_AFFINITIES:
+        sess_options.add_session_config_entry("session.intra_op_thread_affinities", ORT_INTRA_OP_THREAD_AFFINITIES)
+    if optimized_model_path:
+        sess_options.optimized_model_filepath = optimized_model_path
+    return sess_options
+
+
+def create_session(model_path: str) -> ort.InferenceSession:
+    """
+    설정대로 세션 생성.
+    ORT_OPTIMIZED_MODEL_DIR이 있으면 (모델 변형 + 최적화 레벨별로 파일 하나)
+    - 원본보다 최신인 최적화 파일이 있으면 그래프 최적화 없이 바로 로드
+    - 없으면 원본을 최적화하면서 파일로 저장 (워커 여러 개가 동시에 써도 되도록 임시 파일 -> rename)
+    .ort 변형은 이미 최적화된 상태로 저장된 파일이라 그대로 로드
+    """
+    if not ORT_OPTIMIZED_MODEL_DIR or model_path.endswith(".ort"):
+        return ort.InferenceSession(model_path, build_session_options(), providers=["CPUExecutionProvider"])
+
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    cache_path = os.path.join(ORT_OPTIMIZED_MODEL_DIR, f"{name}.{ORT_GRAPH_OPT_LEVEL}.optimized.onnx")
+
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(model_path):
+        print(f"최적화된 모델 재사용: {cache_path}")
+        return ort.InferenceSession(cache_path, build_session_options("disable"), providers=["CPUExecutionProvider"])
+
+    os.makedirs(ORT_OPTIMIZED_MODEL_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    sess = ort.InferenceSession(model_path, build_session_options(optimized_model_path=tmp_path), providers=["CPUExecutionProvider"])
+    os.replace(tmp_path, cache_path)
+    print(f"최적화된 모델 저장: {cache_path}")
+    return sess
+
+
+session = create_session(onnx_model_path)
+
+# torch / transformers 없이 tokenizers(Rust)만 사용
+# tokenizer.json에 저장된 고정 길이 padding / truncation(64)은 끄고 AutoTokenizer 기본 호출과 같은 결과를 냄
+# (padding은 emotion_classify.predict_batch에서 배치마다 직접 처리)
+tokenizer = Tokenizer.from_file(tokenizer_path)
+tokenizer.no_padding()
+tokenizer.no_truncation()
+pad_token_id = tokenizer.token_to_id("[PAD]")
+
+# 모델이 받을 수 있는 최대 토큰 길이 (ELECTRA position embedding 수)
+with open(os.path.join(os.path.dirname(__file__), "Classifier_Model", "config.json"), "r", encoding="utf-8") as f:
+    model_max_length = json.load(f)["max_position_embeddings"]
 
 if session:
-    print(f"모델 로드 완료")
+    print(f"모델 로드 완료 {session_config}")
 else:
     print(f"모델 로드 실패")
\ No newline at end of file
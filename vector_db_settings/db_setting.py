@@ -1,10 +1,42 @@
-import numpy as np
-import os
+"""
+상담 데이터(jsonl) -> 임베딩 -> Weaviate 적재.
+
+- jsonl은 한 줄씩 읽어서 처리 (전체를 메모리에 올리지 않음)
+- 임베딩 API는 input 리스트를 한 번에 보낼 수 있으므로 --batch-size개씩 묶어서 요청
+- 임베딩 요청은 최대 --concurrency개까지 동시에 진행, 429 / 5xx / 네트워크 오류는 backoff 후 재시도
+- Weaviate에는 batch.dynamic()으로 기록
+- 진행 상황(파일 위치)을 --checkpoint 파일에 저장 -> 중간에 죽어도 다시 실행하면 이어서 진행
+- 끝까지 실패한 행은 <checkpoint>.failed.jsonl에 기록
+- 객체 id는 임베딩 텍스트(input / patient)로 만든 고정 uuid (app.core.weaviate_client.content_uuid)
+  -> 다시 적재하거나 답변이 바뀌어도 같은 객체를 덮어씀 (서버에서 저장하는 조언과 같은 규칙)
+- 객체마다 전체 내용 해시(content_hash property)를 같이 저장
+- --sync: 같은 id에 같은 content_hash가 있는 행은 건너뛰고, 새로 생기거나 내용이 바뀐 행만 임베딩 / 교체
+  (건너뛴 행도 --store에는 Weaviate의 벡터로 기록 -> 저장소가 비어 있거나 일부만 있어도 sync 한 번으로 채워짐)
+- 받은 임베딩은 --store(모델별 memmap 저장소, app.core.embedding_store)에 보관하고, 같은 텍스트는 API를 다시 호출하지 않음
+  (저장소만으로 Weaviate 복원 / 모델 비교: embeddings.py)
+
+실행 (vector_db_settings 디렉토리에서):
+    python db_setting.py
+    python db_setting.py --datasets single --batch-size 128 --concurrency 8
+    python db_setting.py --restart          # 체크포인트 무시하고 처음부터
+    python db_setting.py --sync --restart   # 전체를 다시 훑으면서 바뀐 행만 임베딩
+"""
+import argparse
+import asyncio
+import itertools
 import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+import httpx
+import numpy as np
 from dotenv import load_dotenv
-import requests
 import weaviate
 import weaviate.classes as wvc
+from weaviate.classes.query import Filter
 load_dotenv()
 
 API_KEY = os.getenv("GMS_KEY")
@@ -16,181 +48,498 @@ WEAVIATE_HOST = os.getenv("WEAVIATE_HOST", "localhost")
 WEAVIATE_HTTP_PORT = int(os.getenv("WEAVIATE_PORT", "8080"))
 WEAVIATE_GRPC_PORT = int(os.getenv("WEAVIATE_GRPC_PORT", "50051"))
 
-print(f"🔗 Weaviate 연결: {WEAVIATE_HOST}:{WEAVIATE_HTTP_PORT}")
-
-client = weaviate.connect_to_custom(
-    http_host=WEAVIATE_HOST,
-    http_port=WEAVIATE_HTTP_PORT,
-    grpc_host=WEAVIATE_HOST,
-    grpc_port=WEAVIATE_GRPC_PORT,
-    http_secure=False,
-    grpc_secure=False,
-    )
-
-# Class 생성 및 필드 설정
-existing = client.collections.list_all()
-
-if "SingleCounsel" not in existing:
-    single_collection = client.collections.create(
-        name="SingleCounsel",
-        description="단일 상담 데이터",
-        vector_config=wvc.config.Configure.Vectors.self_provided(),
-        properties=[
-            wvc.config.Property(name="input", data_type=wvc.config.DataType.TEXT),
-            wvc.config.Property(name="output", data_type=wvc.config.DataType.TEXT),
-        ],
-    )
-    print("✅ SingleCounsel 컬렉션 생성 완료")
-else:
-    print("✅ SingleCounsel 이미 존재. 생성 생략.")
-
-if "MultiCounsel" not in existing:
-    client.collections.create(
-        name="MultiCounsel",
-        description="멀티턴 상담 데이터",
-        vector_config=wvc.config.Configure.Vectors.self_provided(),
-        properties=[
-            wvc.config.Property(name="patient", data_type=wvc.config.DataType.TEXT),
-            wvc.config.Property(name="counselor", data_type=wvc.config.DataType.TEXT),
-        ],
-    )
-    print("✅ MultiCounsel 컬렉션 생성 완료")
-else:
-    print("✅ MultiCounsel 이미 존재. 생성 생략.")
-
-# jsonl 파일 가공을 위한 함수
-def load_jsonl(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return [json.loads(line) for line in f if line.strip()]
-class Embedding():
-    def __init__(self):
+# 적재 설정 (명령행 인자로도 변경 가능)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+INGEST_TIMEOUT = float(os.getenv("INGEST_TIMEOUT", "60"))
+# 이 개수만큼 묶음을 기록할 때마다 Weaviate flush + 체크포인트 저장
+INGEST_CHECKPOINT_EVERY = int(os.getenv("INGEST_CHECKPOINT_EVERY", "10"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BASE_DIR), "FastAPI"))
+
+# 서버(route)에서 저장하는 객체와 같은 규칙으로 id / 내용 해시 생성
+from app.core.weaviate_client import content_uuid, content_hash  # noqa: E402
+from app.core.embedding_store import EmbeddingStore, text_hash  # noqa: E402
+
+# 임베딩 저장소 위치 (모델 이름별 하위 디렉토리)
+INGEST_EMBEDDING_STORE = os.getenv("INGEST_EMBEDDING_STORE", os.path.join(BASE_DIR, "embeddings"))
+
+
+# ---------------- 데이터 변환 ----------------
+
+# 임베딩할 텍스트는 저장하는 property 값과 같은 형태(strip)로 반환
+# -> 임베딩 저장소 해시(text_hash)가 embeddings.py snapshot(Weaviate property 기준)과 같은 행을 가리킴
+def single_row(d: dict):
+    """단일 상담: input을 임베딩, (임베딩할 텍스트, properties)"""
+    props = {
+        "input": d["input"].strip(),
+        "output": d["output"].strip(),
+    }
+    return props["input"], props
+
+
+def multi_row(turns: list):
+    """멀티턴 상담: 내담자 발화를 이어 붙여서 임베딩"""
+    patient = ""
+    counselor = ""
+    for t in turns:
+        if t['speaker'] == "내담자":
+            patient += t['utterance']
+        elif t['speaker'] == "상담사":
+            counselor += t['utterance']
+    props = {
+        "patient": patient.strip(),
+        "counselor": counselor.strip(),
+    }
+    return props["patient"], props
+
+
+DATASETS = {
+    "single": {
+        "collection": "SingleCounsel",
+        "path": os.path.join(BASE_DIR, "total_kor_counsel_bot.jsonl"),
+        "convert": single_row,
+        # 객체 id를 만들 때 쓰는 properties (임베딩 텍스트가 같으면 같은 id)
+        "key": ("input",),
+    },
+    "multi": {
+        "collection": "MultiCounsel",
+        "path": os.path.join(BASE_DIR, "total_kor_multiturn_counsel_bot.jsonl"),
+        "convert": multi_row,
+        "key": ("patient",),
+    },
+}
+
+
+def iter_jsonl(path: str, offset: int = 0, line_no: int = 0):
+    """jsonl을 한 줄씩 읽어서 (줄 번호, 다음 줄 시작 위치, 파싱 결과 또는 예외) 반환"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            raw = f.readline()
+            if not raw:
+                break
+            line_no += 1
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except json.JSONDecodeError as e:
+                row = e
+            yield line_no, f.tell(), row
+
+
+def iter_chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# 벡터 검증 및 변환 함수
+def validate_and_convert_vector(vector):
+    """벡터를 list[float]로 변환"""
+    if vector is None:
+        return None
+
+    # numpy 배열 → list 변환
+    if isinstance(vector, np.ndarray):
+        vector = vector.tolist()
+
+    # list로 변환 확인
+    if not isinstance(vector, list):
+        raise TypeError(f"Vector must be list, got {type(vector)}")
+
+    # 차원 확인
+    if len(vector) == 0:
+        raise ValueError("Vector cannot be empty")
+
+    # float 검증
+    return [float(v) for v in vector]
+
+
+# ---------------- 임베딩 ----------------
+
+class Embedding:
+    """임베딩 API 비동기 호출 (input 리스트 한 번에 요청, 동시 요청 수 제한, backoff 재시도)"""
+
+    def __init__(self, concurrency: int, max_retries: int = INGEST_MAX_RETRIES):
         self.api_key = API_KEY
         self.emb_model = EMB_MODEL
         self.emb_url = EMB_URL
-    # 임베딩
-    def embed(self, text: str) -> list:
+        self.max_retries = max_retries
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._client = httpx.AsyncClient(timeout=INGEST_TIMEOUT)
+        self.requests = 0
+        self.retries = 0
+        # 저장소에서 가져와서 API를 호출하지 않은 행 수
+        self.reused = 0
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def embed_batch(self, texts: list[str]) -> list[list[float]]:
         headers = {
             "Content-type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
-        payload = {"model": self.emb_model, "input": text}
-
-        res = requests.post(self.emb_url, headers=headers, json=payload)
-        res.raise_for_status()
-        
-        result = res.json()["data"][0]["embedding"]
-
-        return [float(v) for v in result]  # 1536 or 3072 dim
-
-
-    # 벡터 검증 및 변환 함수
-    def validate_and_convert_vector(self, vector):
-        """벡터를 list[float]로 변환"""
-        if vector is None:
-            return None
-
-        # numpy 배열 → list 변환
-        if isinstance(vector, np.ndarray):
-            vector = vector.tolist()
-
-        # list로 변환 확인
-        if not isinstance(vector, list):
-            raise TypeError(f"Vector must be list, got {type(vector)}")
-
-        # 차원 확인
-        if len(vector) == 0:
-            raise ValueError("Vector cannot be empty")
-
-        # float 검증
-        vector = [float(v) for v in vector]
-
-        return vector
+        payload = {"model": self.emb_model, "input": texts}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._slots:
+                    self.requests += 1
+                    res = await self._client.post(self.emb_url, headers=headers, json=payload)
+                if res.status_code == 429 or res.status_code >= 500:
+                    raise httpx.HTTPStatusError(f"{res.status_code}", request=res.request, response=res)
+                res.raise_for_status()
+
+                # 응답 순서가 입력 순서와 다를 수 있으므로 index 기준으로 정렬
+                data = sorted(res.json()["data"], key=lambda d: d.get("index", 0))
+                if len(data) != len(texts):
+                    raise ValueError(f"임베딩 개수 불일치: {len(data)} != {len(texts)}")
+                return [validate_and_convert_vector(d["embedding"]) for d in data]
+
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                # 4xx(429 제외)는 재시도해도 같은 결과
+                if status is not None and status != 429 and status < 500:
+                    raise
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"⚠️ 임베딩 요청 실패 ({e}), {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+
+# ---------------- 체크포인트 ----------------
+
+class Checkpoint:
+    """데이터셋별 진행 위치 저장 (임시 파일에 쓰고 rename -> 중간에 죽어도 파일이 깨지지 않음)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.failed_path = os.path.splitext(path)[0] + ".failed.jsonl"
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def get(self, name: str, source: str) -> dict:
+        state = self.state.get(name)
+        size = os.path.getsize(source)
+        if state is None:
+            return {"offset": 0, "line": 0, "written": 0, "skipped": 0, "failed": 0, "size": size}
+        if state.get("size", 0) > size:
+            raise RuntimeError(f"{source} 파일이 체크포인트 이후 줄어들었습니다. --restart로 처음부터 다시 실행하세요.")
+        return {**state, "size": size}
+
+    def save(self, name: str, state: dict):
+        self.state[name] = state
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        self.state = {}
+        for path in [self.path, self.failed_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def record_failure(self, name: str, line_no: int, error: str):
+        with open(self.failed_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"dataset": name, "line": line_no, "error": error}, ensure_ascii=False) + "\n")
+
+
+# ---------------- Weaviate ----------------
+
+def connect():
+    print(f"🔗 Weaviate 연결: {WEAVIATE_HOST}:{WEAVIATE_HTTP_PORT}")
+    return weaviate.connect_to_custom(
+        http_host=WEAVIATE_HOST,
+        http_port=WEAVIATE_HTTP_PORT,
+        grpc_host=WEAVIATE_HOST,
+        grpc_port=WEAVIATE_GRPC_PORT,
+        http_secure=False,
+        grpc_secure=False,
+    )
 
-    def validated_embed(self, text):
-        vect = self.embed(text)
-        validated_vector = self.validate_and_convert_vector(vect)
 
-        return validated_vector
-emb = Embedding()
+def content_hash_property():
+    # 해시 값은 BM25(hybrid) 검색 대상에서 제외, id 비교용으로만 사용
+    return wvc.config.Property(
+        name="content_hash",
+        data_type=wvc.config.DataType.TEXT,
+        tokenization=wvc.config.Tokenization.FIELD,
+        index_searchable=False,
+    )
 
-# 수정된 코드
-single_data = load_jsonl("./total_kor_counsel_bot.jsonl")
-single_collection = client.collections.get("SingleCounsel")
 
-for idx, d in enumerate(single_data):
-    try:
-        # 1. 임베딩 생성 (에러 처리 포함)
-        vector_embedding = emb.validated_embed(d["input"])
-        # 2. 벡터 검증
-        if not vector_embedding or len(vector_embedding) == 0:
-            print(f"❌ Row {idx}: 벡터가 비어있습니다")
-            continue
-        # 3. 데이터 객체 생성
-        data_object = {
-            "input": d["input"].strip(),
-            "output": d["output"].strip()
-        }
-        # 4. Insert 및 반환값 확인
-        uuid = single_collection.data.insert(
-            properties=data_object,
-            vector=vector_embedding
+def ensure_collections(client):
+    # Class 생성 및 필드 설정
+    existing = client.collections.list_all()
+
+    # 이전 버전으로 만든 컬렉션에는 content_hash property 추가 (자동 스키마로 검색 대상에 들어가지 않도록)
+    for name in ("SingleCounsel", "MultiCounsel"):
+        if name in existing and "content_hash" not in {p.name for p in existing[name].properties}:
+            client.collections.get(name).config.add_property(content_hash_property())
+            print(f"✅ {name}에 content_hash property 추가")
+
+    if "SingleCounsel" not in existing:
+        client.collections.create(
+            name="SingleCounsel",
+            description="단일 상담 데이터",
+            vector_config=wvc.config.Configure.Vectors.self_provided(),
+            properties=[
+                wvc.config.Property(name="input", data_type=wvc.config.DataType.TEXT),
+                wvc.config.Property(name="output", data_type=wvc.config.DataType.TEXT),
+                content_hash_property(),
+            ],
         )
-        print(f"✅ Single {idx}: 저장 완료 (UUID: {uuid})")
-
-    except Exception as e:
-        print(f"❌ Row {idx} 에러: {str(e)}")
-        continue
-
-print("✅ SingleCounsel 업로드 완료")
-
-multi_data = load_jsonl("./total_kor_multiturn_counsel_bot.jsonl")
-multi_collection = client.collections.get("MultiCounsel")
-
-for idx, d in enumerate(multi_data):
+        print("✅ SingleCounsel 컬렉션 생성 완료")
+    else:
+        print("✅ SingleCounsel 이미 존재. 생성 생략.")
+
+    if "MultiCounsel" not in existing:
+        client.collections.create(
+            name="MultiCounsel",
+            description="멀티턴 상담 데이터",
+            vector_config=wvc.config.Configure.Vectors.self_provided(),
+            properties=[
+                wvc.config.Property(name="patient", data_type=wvc.config.DataType.TEXT),
+                wvc.config.Property(name="counselor", data_type=wvc.config.DataType.TEXT),
+                content_hash_property(),
+            ],
+        )
+        print("✅ MultiCounsel 컬렉션 생성 완료")
+    else:
+        print("✅ MultiCounsel 이미 존재. 생성 생략.")
+
+
+def object_vector(obj):
+    # weaviate v4는 named vector dict({"default": [...]})로 반환
+    vector = obj.vector
+    if isinstance(vector, dict):
+        vector = vector.get("default") or next(iter(vector.values()), None)
+    return vector or None
+
+
+def existing_objects(collection, ids: list[str], include_vector: bool = False) -> dict[str, tuple]:
+    """id -> (저장된 content_hash, 벡터) (content_hash가 없는 예전 객체는 None, include_vector=False면 벡터 None)"""
+    res = collection.query.fetch_objects(
+        filters=Filter.by_id().contains_any(ids),
+        limit=len(ids),
+        return_properties=["content_hash"],
+        include_vector=include_vector,
+    )
+    return {
+        str(o.uuid): (o.properties.get("content_hash"), object_vector(o) if include_vector else None)
+        for o in res.objects
+    }
+
+
+def verify(client):
+    # 제대로 들어가있는지 확인
+    for name in ["SingleCounsel", "MultiCounsel"]:
+        col = client.collections.get(name)
+        res = col.query.fetch_objects(limit=1, include_vector=True)
+        total = col.aggregate.over_all(total_count=True).total_count
+
+        for i, obj in enumerate(res.objects, start=1):
+            print(f"\n=== {name} (총 {total}개) Object {i} ===")
+            print("ID:", obj.uuid)
+            print("properties:", obj.properties)
+            print("vector exists:", obj.vector is not None)
+            print("vector length:", obj.vector.get("default")[:5])
+
+
+# ---------------- 적재 ----------------
+
+async def ingest(client, name: str, emb: Embedding, checkpoint: Checkpoint, store: EmbeddingStore | None, args):
+    spec = DATASETS[name]
+    state = checkpoint.get(name, spec["path"])
+    collection = client.collections.get(spec["collection"])
+    if state["line"]:
+        print(f"↪️ {name}: {state['line']}번째 줄부터 이어서 진행 (기록 {state['written']}개)")
+
+    def prepare(chunk):
+        # 파싱 / 변환 실패한 행은 바로 실패로 기록, 나머지만 임베딩
+        rows = []
+        for line_no, offset, row in chunk:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                text, props = spec["convert"](row)
+                if not text or not text.strip():
+                    raise ValueError("임베딩할 텍스트가 비어있습니다")
+                object_id = content_uuid(spec["collection"], *(props[k] for k in spec["key"]))
+                props["content_hash"] = content_hash(*props.values())
+                rows.append((line_no, text, props, object_id))
+            except Exception as e:
+                checkpoint.record_failure(name, line_no, str(e))
+                state["failed"] += 1
+        return rows
+
+    async def embed_chunk(rows):
+        """(행, text_hash, 벡터, Weaviate에 기록할지) 목록 반환"""
+        # 같은 묶음 안에 같은 내용이 여러 번 있으면 한 번만 임베딩
+        unique = list({row[3]: row for row in rows}.values())
+        unchanged = []
+        if args.sync and unique:
+            # 같은 id에 같은 내용(content_hash)이 이미 있는 행은 Weaviate 기록을 건너뜀, 답변 등이 바뀐 행은 같은 id로 교체
+            # 저장소를 쓰면 건너뛴 행도 저장소에는 기록 (저장소만으로 복원 / 로컬 검색이 가능하도록, 벡터는 Weaviate에서 받아옴)
+            existing = await asyncio.to_thread(existing_objects, collection, [row[3] for row in unique], store is not None)
+            changed = []
+            for row in unique:
+                content_hash_, vector = existing.get(row[3], ("", None))
+                if content_hash_ != row[2]["content_hash"]:
+                    changed.append(row)
+                elif store is not None:
+                    h = text_hash(row[1])
+                    if store.get(h) is None:
+                        if vector is None:
+                            # 벡터가 없는 객체는 새로 임베딩해서 같이 교체
+                            changed.append(row)
+                            continue
+                        store.add_vectors([h], [vector])
+                    unchanged.append((row, h, None, False))
+            unique = changed
+        if not unique:
+            return unchanged
+
+        # 저장소에 있는 텍스트는 저장된 벡터 사용, 없는 것만 API 호출
+        hashes = [text_hash(row[1]) for row in unique]
+        vectors = [store.get(h) if store is not None else None for h in hashes]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            embedded = await emb.embed_batch([unique[i][1] for i in missing])
+            if store is not None:
+                store.add_vectors([hashes[i] for i in missing], embedded)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        emb.reused += len(unique) - len(missing)
+        return unchanged + [
+            (row, h, [float(v) for v in vector], True) for row, h, vector in zip(unique, hashes, vectors)
+        ]
+
+    start = time.perf_counter()
+    written_at_start = state["written"]
+    chunks_since_checkpoint = 0
+    window = deque()
+    # Weaviate에서 거절된 객체를 원본 줄 번호로 기록하기 위해 (이번 실행분만)
+    line_of = {}
+
+    def save_checkpoint(batch, offset: int, line_no: int):
+        # flush까지 끝난 위치만 체크포인트에 기록
+        batch.flush()
+        if store is not None:
+            store.save_manifest()
+        state.update(offset=offset, line=line_no)
+        checkpoint.save(name, state)
+        rate = (state["written"] - written_at_start) / max(1e-6, time.perf_counter() - start)
+        print(f"💾 {name}: {line_no}줄 / 기록 {state['written']}개 / 변경 없음 {state.get('skipped', 0)}개 / "
+              f"실패 {state['failed']}개 ({rate:.1f}개/s)")
+
+    async def write_oldest(batch):
+        # 순서대로 기록해야 체크포인트 위치 이전의 행이 모두 처리된 상태가 보장됨
+        nonlocal chunks_since_checkpoint
+        chunk, rows, task = window.popleft()
+        try:
+            pairs = await task
+        except Exception as e:
+            for line_no, _, _, _ in rows:
+                checkpoint.record_failure(name, line_no, f"embedding: {e}")
+            state["failed"] += len(rows)
+            print(f"❌ {name} {chunk[0][0]}~{chunk[-1][0]}줄 임베딩 실패: {e}")
+        else:
+            # 같은 id로 다시 기록하면 Weaviate batch가 기존 객체를 덮어씀 (upsert)
+            written = 0
+            for (line_no, _, props, object_id), h, vector, write in pairs:
+                if write:
+                    batch.add_object(properties=props, vector=vector, uuid=object_id)
+                    line_of[object_id] = line_no
+                    written += 1
+                if store is not None:
+                    store.add_object(object_id, spec["collection"], h, props)
+            state["written"] += written
+            state["skipped"] = state.get("skipped", 0) + len(rows) - written
+
+        chunks_since_checkpoint += 1
+        if chunks_since_checkpoint >= INGEST_CHECKPOINT_EVERY:
+            chunks_since_checkpoint = 0
+            save_checkpoint(batch, chunk[-1][1], chunk[-1][0])
+
+    last = None
+    with collection.batch.dynamic() as batch:
+        rows_iter = iter_jsonl(spec["path"], state["offset"], state["line"])
+        if args.limit:
+            rows_iter = itertools.takewhile(lambda r: r[0] <= args.limit, rows_iter)
+        for chunk in iter_chunks(rows_iter, args.batch_size):
+            rows = prepare(chunk)
+            window.append((chunk, rows, asyncio.create_task(embed_chunk(rows))))
+            last = chunk[-1]
+            # 동시에 진행 중인 임베딩 요청이 concurrency개를 넘지 않도록 가장 오래된 묶음부터 기록
+            if len(window) >= args.concurrency:
+                await write_oldest(batch)
+
+        while window:
+            await write_oldest(batch)
+        if last is not None and chunks_since_checkpoint:
+            save_checkpoint(batch, last[1], last[0])
+
+    # batch가 끝난 뒤 서버에서 거절된 객체
+    failed_objects = collection.batch.failed_objects
+    for obj in failed_objects:
+        checkpoint.record_failure(name, line_of.get(str(obj.object_.uuid), -1), f"weaviate: {obj.message}")
+    if failed_objects:
+        state["written"] -= len(failed_objects)
+        state["failed"] += len(failed_objects)
+        checkpoint.save(name, state)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ {spec['collection']} 업로드 완료: 기록 {state['written']}개, 변경 없음 {state.get('skipped', 0)}개, "
+          f"실패 {state['failed']}개 ({elapsed:.1f}s)")
+
+
+async def main(args):
+    client = connect()
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.reset()
+
+    emb = Embedding(concurrency=args.concurrency)
+    store = None if args.no_store else EmbeddingStore(args.store, EMB_MODEL)
     try:
-        patient = ""
-        counselor = ""
-        for t in d:
-            if t['speaker'] == "내담자":
-                patient += t['utterance']
-            elif t['speaker'] == "상담사":
-                counselor += t['utterance']
-
-        # 1. 임베딩 생성 (에러 처리 포함)
-        vector_embedding = emb.validated_embed(patient)
-
-        # 2. 벡터 검증
-        if not vector_embedding or len(vector_embedding) == 0:
-            print(f"❌ Row {idx}: 벡터가 비어있습니다")
-            continue
-        # 3. 데이터 객체 생성
-        data_object = {
-            "patient": patient.strip(),
-            "counselor" : counselor.strip()
-        }
-        # 계속 안돼서 DataObject를 사용하여 삽입 시도.
-        obj = multi_collection.data.insert(
-            properties=data_object,
-            vector=vector_embedding
-            )
-
-        # 4. Insert 및 반환값 확인
-        print(f"✅ Multi {idx}: 저장 완료 (UUID: {uuid})")
-
-    except Exception as e:
-        print(f"❌ Multi {idx} 에러: {str(e)}")
-        continue
-
-print("✅ MultiCounsel 업로드 완료")
-
-# 제대로 들어가있는지 확인
-for name in ["SingleCounsel", "MultiCounsel"]:
-    col = client.collections.get(name)
-    res = col.query.fetch_objects(limit = 1, include_vector=True)
-
-    for i, obj in enumerate(res.objects, start=1):
-        print(f"\n=== Object {i} ===")
-        print("ID:", obj.uuid)
-        print("properties:", obj.properties)
-        print("vector exists:", obj.vector is not None)
-        print("vector length:", obj.vector.get("default")[:5])
\ No newline at end of file
+        ensure_collections(client)
+        for name in args.datasets.split(","):
+            await ingest(client, name, emb, checkpoint, store, args)
+        print(f"임베딩 요청 {emb.requests}회 (재시도 {emb.retries}회), 저장소 재사용 {emb.reused}개")
+        verify(client)
+    finally:
+        await emb.close()
+        if store is not None:
+            store.close()
+            print(f"💾 임베딩 저장소: {store.path} (벡터 {store.rows}개, 객체 {len(store)}개)")
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", default="single,multi", help="적재할 데이터셋 (single, multi)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="임베딩 요청 하나에 넣을 행 수")
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY, help="동시에 보낼 임베딩 요청 수")
+    parser.add_argument("--checkpoint", default=os.path.join(BASE_DIR, "ingest_checkpoint.json"))
+    parser.add_argument("--restart", action="store_true", help="체크포인트를 지우고 처음부터 적재")
+    parser.add_argument("--sync", action="store_true", help="이미 있는 내용은 건너뛰고 새로 생기거나 바뀐 행만 임베딩 / 기록")
+    parser.add_argument("--store", default=INGEST_EMBEDDING_STORE, help="임베딩 저장소 디렉토리")
+    parser.add_argument("--no-store", action="store_true", help="임베딩 저장소를 쓰지 않음")
+    parser.add_argument("--limit", type=int, default=0, help="데이터셋마다 앞에서부터 이 줄 수까지만 적재 (0이면 전체)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,174 @@
+"""
+db_setting.py가 저장한 임베딩 저장소(app.core.embedding_store) 관리 도구. 임베딩 API를 호출하지 않음.
+
+    info    : 저장소 manifest 출력 (모델, 차원, 컬렉션별 객체 수 / 내용 해시)
+    restore : 저장소의 객체 / 벡터로 Weaviate 컬렉션 다시 채우기 (같은 id로 upsert)
+    compare : 임베딩 모델 두 개의 저장소를 비교 (같은 텍스트 기준 최근접 이웃 일치율)
+    snapshot: Weaviate 컬렉션의 현재 객체 / 벡터를 저장소로 내보내기 (서버에서 저장한 조언 포함)
+              -> FastAPI 로컬 검색 인덱스(LOCAL_RETRIEVER_STORE)가 시작할 때 읽는 스냅샷
+
+실행 (vector_db_settings 디렉토리에서):
+    python embeddings.py info --model text-embedding-3-small
+    python embeddings.py restore --model text-embedding-3-small --collections SingleCounsel,MultiCounsel
+    python embeddings.py compare --models text-embedding-3-small,text-embedding-3-large --collection SingleCounsel --k 10
+    python embeddings.py --store snapshots snapshot --model text-embedding-3-small
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from db_setting import INGEST_EMBEDDING_STORE, EMB_MODEL, connect, ensure_collections
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "FastAPI"))
+from app.core.embedding_store import EmbeddingStore, text_hash  # noqa: E402
+from app.core.local_retriever import LOCAL_COLLECTIONS  # noqa: E402
+
+
+def cmd_info(args):
+    store = EmbeddingStore(args.store, args.model, readonly=True)
+    print(json.dumps(store.manifest, ensure_ascii=False, indent=2))
+    print(f"vectors.f32: {os.path.getsize(store.vectors_path) / 1024 / 1024:.1f}MB")
+
+
+def cmd_restore(args):
+    store = EmbeddingStore(args.store, args.model, readonly=True)
+    client = connect()
+    try:
+        ensure_collections(client)
+        for name in args.collections.split(","):
+            collection = client.collections.get(name)
+            start = time.perf_counter()
+            count = 0
+            with collection.batch.dynamic() as batch:
+                for object_id, properties, vector in store.iter_objects(name):
+                    batch.add_object(properties=properties, vector=vector.tolist(), uuid=object_id)
+                    count += 1
+            failed = len(collection.batch.failed_objects)
+            total = collection.aggregate.over_all(total_count=True).total_count
+            print(f"✅ {name}: {count}개 복원, 실패 {failed}개, 컬렉션 전체 {total}개 ({time.perf_counter() - start:.1f}s)")
+    finally:
+        client.close()
+
+
+def cmd_snapshot(args):
+    store = EmbeddingStore(args.store, args.model)
+    client = connect()
+    try:
+        for name in args.collections.split(","):
+            spec = LOCAL_COLLECTIONS[name]
+            collection = client.collections.get(name)
+            start = time.perf_counter()
+            count = skipped = 0
+            for obj in collection.iterator(include_vector=True, return_properties=spec["properties"]):
+                vector = obj.vector
+                if isinstance(vector, dict):
+                    vector = vector.get("default") or next(iter(vector.values()), None)
+                if not vector:
+                    skipped += 1
+                    continue
+                properties = {p: obj.properties.get(p) or "" for p in spec["properties"]}
+                # 임베딩한 텍스트 기준 해시 (db_setting.py 적재 결과와 같은 텍스트면 같은 행을 재사용)
+                h = text_hash(properties[spec["text"]])
+                store.add_vectors([h], [vector])
+                store.add_object(str(obj.uuid), name, h, properties)
+                count += 1
+            print(f"✅ {name}: {count}개 저장, 벡터 없음 {skipped}개 ({time.perf_counter() - start:.1f}s)")
+    finally:
+        store.close()
+        client.close()
+
+
+def normalized(m: np.ndarray) -> np.ndarray:
+    m = np.asarray(m, dtype=np.float32)
+    return m / np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+
+
+def top_k_neighbors(vectors: np.ndarray, sample: np.ndarray, k: int) -> list:
+    scores = vectors[sample] @ vectors.T
+    # 자기 자신 제외
+    scores[np.arange(len(sample)), sample] = -np.inf
+    top = np.argpartition(-scores, kth=k - 1, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def cmd_compare(args):
+    model_a, model_b = args.models.split(",")
+    store_a = EmbeddingStore(args.store, model_a, readonly=True)
+    store_b = EmbeddingStore(args.store, model_b, readonly=True)
+
+    # 두 저장소에 모두 있는 텍스트만 비교 (객체가 아니라 임베딩한 텍스트 기준)
+    hashes = sorted(
+        {e["text_hash"] for e in store_a.collection_entries(args.collection)}
+        & {e["text_hash"] for e in store_b.collection_entries(args.collection)}
+    )
+    if len(hashes) <= args.k:
+        raise SystemExit(f"공통 텍스트가 너무 적습니다: {len(hashes)}개")
+
+    a = normalized(store_a.matrix()[[store_a.offsets[h] for h in hashes]])
+    b = normalized(store_b.matrix()[[store_b.offsets[h] for h in hashes]])
+
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(hashes), size=min(args.sample, len(hashes)), replace=False)
+
+    start = time.perf_counter()
+    neighbors_a = top_k_neighbors(a, sample, args.k)
+    neighbors_b = top_k_neighbors(b, sample, args.k)
+    elapsed = time.perf_counter() - start
+
+    overlap = [len(x & y) / args.k for x, y in zip(neighbors_a, neighbors_b)]
+    # 같은 쌍의 유사도 순위가 모델 간에 얼마나 비슷한지 (샘플 쌍 cosine의 상관계수)
+    pairs = rng.integers(0, len(hashes), size=(min(20000, len(hashes) ** 2), 2))
+    cos_a = np.einsum("ij,ij->i", a[pairs[:, 0]], a[pairs[:, 1]])
+    cos_b = np.einsum("ij,ij->i", b[pairs[:, 0]], b[pairs[:, 1]])
+
+    report = {
+        "collection": args.collection,
+        "common_texts": len(hashes),
+        "sample": len(sample),
+        "k": args.k,
+        model_a: {"dim": store_a.dim, "size_mb": round(os.path.getsize(store_a.vectors_path) / 1024 / 1024, 1)},
+        model_b: {"dim": store_b.dim, "size_mb": round(os.path.getsize(store_b.vectors_path) / 1024 / 1024, 1)},
+        f"neighbor_overlap@{args.k}": round(float(np.mean(overlap)), 4),
+        "pair_cosine_corr": round(float(np.corrcoef(cos_a, cos_b)[0, 1]), 4),
+        "search_s": round(elapsed, 3),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--store", default=INGEST_EMBEDDING_STORE, help="임베딩 저장소 디렉토리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("info")
+    p.add_argument("--model", default=EMB_MODEL)
+    p.set_defaults(func=cmd_info)
+
+    p = sub.add_parser("restore")
+    p.add_argument("--model", default=EMB_MODEL)
+    p.add_argument("--collections", default="SingleCounsel,MultiCounsel")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("compare")
+    p.add_argument("--models", required=True, help="비교할 모델 두 개 (쉼표 구분)")
+    p.add_argument("--collection", default="SingleCounsel")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--sample", type=int, default=500, help="이웃을 비교할 기준 텍스트 수")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", help="결과 JSON 저장 경로")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("snapshot")
+    p.add_argument("--model", default=EMB_MODEL)
+    p.add_argument("--collections", default="SingleCounsel,MultiCounsel")
+    p.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args()
+    args.func(args)